@@ -7,13 +7,20 @@ import dash_ag_grid as dag
 from collections import defaultdict
 from .modules.components import KpiCard, GraphPaper, IconTooltip, build_portfolio_cards
 from .utils.formatting import format_kpi
-from .utils.setors_bv import SETOR_MAP, SETORIAL_B3
+from .utils.setors_bv import SETOR_MAP, SETORIAL_B3, raiz_ticker
+from .utils.payload import carregar_store, decodificar_store, serializar_store, quadro_store, serie_store
 from utils.serialization import orjson_dumps, orjson_loads
 from datetime import datetime, timedelta
 import pandas as pd
+import numpy as np
 from .services.portfolio_services import PortfolioService
+from .metrics.panel import PricePanel
+from .metrics.trading_calendar import fatiar
+from .metrics.incremental import atualizar_periodo
+from .metrics.indices import BENCHMARKS, BENCHMARK_PADRAO
 from flask import session, request, has_request_context
-from .callbacks import register_graph_callbacks, register_kpis_card, register_table_callbacks
+from .callbacks import register_graph_callbacks, register_kpis_card, register_table_callbacks, register_risk_callbacks, register_advanced_callbacks, register_screener_callbacks
+from .callbacks.screener import FAIXAS_SCREENER, COLUNAS_SCREENER
 from functools import partial
 
 
@@ -64,14 +71,15 @@ def serve_layout(empresas_redis=None):
         portfolio_data = {}  
         client_config = {} 
 
-    # Mesmo que vazio, serializa para log de tamanho
+    # Mesmo que vazio, serializa (formato colunar) para o Store e para o log de tamanho
     try:
-        json_bytes = orjson_dumps(portfolio_data)
-        tamanho_bytes = len(json_bytes)
+        store_json = serializar_store(portfolio_data)
+        tamanho_bytes = len(store_json.encode('utf-8'))
         tamanho_kb = tamanho_bytes / 1024
         print(f"Tamanho dos dados no Store: {tamanho_bytes} bytes ({tamanho_kb:.2f} KB)")
     except Exception as e:
         logger.warning(f"Erro ao serializar dados para log: {e}")
+        store_json = orjson_dumps(portfolio_data).decode("utf-8")
 
     # Extrair KPIs do portfolio_data
     kpis = portfolio_data.get("kpis", {})
@@ -88,111 +96,6 @@ def serve_layout(empresas_redis=None):
     portfolio_name = portfolio_data.get('portfolio_name', 'Portfólio 1')
     save_button_disabled = not is_registered or plan_type.lower() != 'registered'
 
-    # Montar tabela com KPIs por período (mensal por padrão) 
-    kpis_por_periodo = portfolio_data.get("kpis_por_periodo", {})
-    if kpis_por_periodo:
-        df_kpis_periodo = pd.DataFrame.from_dict(kpis_por_periodo, orient="index").round(2)
-        df_kpis_periodo.reset_index(inplace=True)
-        df_kpis_periodo.rename(columns={"index": "KPI"}, inplace=True)
-
-        # Adicionar coluna de sparklines
-        df_kpis_periodo["sparkline"] = ""
-        for i, row in df_kpis_periodo.iterrows():
-            kpi_name = row["KPI"]
-            values = row.drop(labels=["KPI", "sparkline"], errors="ignore").astype(float).values
-            fig = go.Figure(
-                go.Scatter(
-                    y=values,
-                    mode="lines+markers",
-                    line=dict(width=1, color="#1f77b4"),
-                    marker=dict(size=4),
-                    hovertemplate="%{y:.2f}<extra></extra>"
-                )
-            )
-            fig.update_layout(
-                showlegend=False,
-                margin=dict(l=0, r=0, t=0, b=0),
-                xaxis=dict(visible=False),
-                yaxis=dict(visible=False, showticklabels=False),
-                height=25,  # Altura compacta para sparkline
-                width=100,
-                paper_bgcolor="rgba(0,0,0,0)",
-                plot_bgcolor="rgba(0,0,0,0)"
-             
-            )
-            df_kpis_periodo.at[i, "sparkline"] = fig
-        
-        columnDefs = [
-            {
-                "field": "KPI",
-                "headerName": "Indicador",
-                "pinned": "left",
-                "sortable": True,
-                "filter": False,
-                "width": 120,
-                "headerClass": "center-header"
-            },
-        ]
-
-        for col in df_kpis_periodo.columns[1:-1]: # Exclui KPI e sparkline
-            columnDefs.append({
-                "field": col,
-                "headerName": col,
-                "sortable": True,
-                "filter": False,
-                "flex": 1,
-                "minWidth": 80,
-                "headerClass": "center-header",
-                "cellStyle": {
-                    "styleConditions": [
-                        # Sharpe
-                        {"condition": "params.data.KPI === 'sharpe' && params.value > 2.0", "style": {"backgroundColor": "#28a745", "color": "white"}},
-                        {"condition": "params.data.KPI === 'sharpe' && params.value >= 1.0 && params.value <= 2.0", "style": {"backgroundColor": "#ffc107", "color": "black"}},
-                        {"condition": "params.data.KPI === 'sharpe' && params.value < 1.0", "style": {"backgroundColor": "#dc3545", "color": "white"}},
-                        # Sortino
-                        {"condition": "params.data.KPI === 'sortino' && params.value > 3.0", "style": {"backgroundColor": "#28a745", "color": "white"}},
-                        {"condition": "params.data.KPI === 'sortino' && params.value >= 1.5 && params.value <= 3.0", "style": {"backgroundColor": "#ffc107", "color": "black"}},
-                        {"condition": "params.data.KPI === 'sortino' && params.value < 1.5", "style": {"backgroundColor": "#dc3545", "color": "white"}},
-                        # Volatilidade
-                        {"condition": "params.data.KPI === 'volatilidade' && params.value < 0.20", "style": {"backgroundColor": "#28a745", "color": "white"}},
-                        {"condition": "params.data.KPI === 'volatilidade' && params.value >= 0.20 && params.value <= 0.30", "style": {"backgroundColor": "#ffc107", "color": "black"}},
-                        {"condition": "params.data.KPI === 'volatilidade' && params.value > 0.30", "style": {"backgroundColor": "#dc3545", "color": "white"}},
-                        # Max Drawdown
-                        {"condition": "params.data.KPI === 'max_drawdown' && params.value > -0.10", "style": {"backgroundColor": "#28a745", "color": "white"}},
-                        {"condition": "params.data.KPI === 'max_drawdown' && params.value >= -0.20 && params.value <= -0.10", "style": {"backgroundColor": "#ffc107", "color": "black"}},
-                        {"condition": "params.data.KPI === 'max_drawdown' && params.value < -0.20", "style": {"backgroundColor": "#dc3545", "color": "white"}},
-                        # Retorno Médio Anual
-                        {"condition": "params.data.KPI === 'retorno_medio_anual' && params.value > 0.10", "style": {"backgroundColor": "#28a745", "color": "white"}},
-                        {"condition": "params.data.KPI === 'retorno_medio_anual' && params.value >= 0.0 && params.value <= 0.10", "style": {"backgroundColor": "#ffc107", "color": "black"}},
-                        {"condition": "params.data.KPI === 'retorno_medio_anual' && params.value < 0.0", "style": {"backgroundColor": "#dc3545", "color": "white"}},
-                        # Alpha
-                        {"condition": "params.data.KPI === 'alpha' && params.value > 0.0", "style": {"backgroundColor": "#28a745", "color": "white"}},
-                        {"condition": "params.data.KPI === 'alpha' && params.value >= -0.01 && params.value <= 0.01", "style": {"backgroundColor": "#ffc107", "color": "black"}},
-                        {"condition": "params.data.KPI === 'alpha' && params.value < -0.01", "style": {"backgroundColor": "#dc3545", "color": "white"}},
-                        # Beta
-                        {"condition": "params.data.KPI === 'beta' && params.value >= 0.8 && params.value <= 1.2", "style": {"backgroundColor": "#28a745", "color": "white"}},
-                        {"condition": "params.data.KPI === 'beta' && ((params.value >= 0.5 && params.value < 0.8) || (params.value > 1.2 && params.value <= 1.5))", "style": {"backgroundColor": "#ffc107", "color": "black"}},
-                        {"condition": "params.data.KPI === 'beta' && (params.value < 0.5 || params.value > 1.5)", "style": {"backgroundColor": "#dc3545", "color": "white"}}
-                    ]
-                }
-            })
-        # Adicionar a coluna de sparklines no final
-        columnDefs.append({
-            "field": "sparkline",
-            "headerName": "Tendência",
-            "cellRenderer": "DCC_Sparkline",
-            "width": 150,
-            "minWidth": 100,
-            "maxWidth": 200,
-            "cellStyle": {"padding": "0px", "display": "flex", "alignItems": "center"}
-        })
-
-        rowData = df_kpis_periodo.to_dict("records")
-    else:
-        df_kpis_periodo = pd.DataFrame(columns=["KPI"])  # define DataFrame vazio
-        columnDefs = [{"field": "KPI"}]
-        rowData = []
-
     return dmc.MantineProvider(
         id = "mantine-provider",
         forceColorScheme=theme,
@@ -207,7 +110,7 @@ def serve_layout(empresas_redis=None):
             children=[
                 dcc.Store(
                     id='data-store', 
-                    data=orjson_dumps(portfolio_data).decode("utf-8"),
+                    data=store_json,
                     storage_type='session',
                 ),
                 dcc.Store(
@@ -325,6 +228,7 @@ def serve_layout(empresas_redis=None):
                             dmc.TabsTab("Risco", value="risco"),
                             dmc.TabsTab("IA", value="ia"),
                             dmc.TabsTab("Avançado", value="avancado"),
+                            dmc.TabsTab("Screener", value="screener"),
                         ],
                     ),
                     # Aba Geral
@@ -495,6 +399,8 @@ def serve_layout(empresas_redis=None):
                                                     ),
                                                 ]
                                             ),
+                                            # Resumo do ticker escolhido (estatísticas pré-calculadas do universo)
+                                            dmc.Text(id='ticker-preview', size="xs", c="dimmed", style={'marginBottom': '5px'}),
                                             dash_table.DataTable(
                                                 id='price-table',
                                                 columns=[
@@ -604,7 +510,7 @@ def serve_layout(empresas_redis=None):
                                             dmc.Text("Evolução Temporal dos KPIs", fw=600, size="sm", mb=10),
                                             dmc.Group(
                                                 [
-                                                    dmc.Button("Mensal", id="btn-mensal", variant="outline", size="compact-xs"),
+                                                    dmc.Button("Mensal", id="btn-mensal", variant="filled", size="compact-xs"),
                                                     dmc.Button("Trimestral", id="btn-trimestral", variant="outline", size="compact-xs"),
                                                     dmc.Button("Semestral", id="btn-semestral", variant="outline", size="compact-xs"),
                                                     dmc.Button("Anual", id="btn-anual", variant="outline", size="compact-xs"),
@@ -614,8 +520,10 @@ def serve_layout(empresas_redis=None):
                                             ),
                                             dag.AgGrid(
                                                 id="kpi-temporal-grid",
-                                                columnDefs=columnDefs,
-                                                rowData=rowData,
+                                                # Colunas e linhas são montadas no navegador a partir de
+                                                # data-store (ver assets/kpi_temporal.js)
+                                                columnDefs=[],
+                                                rowData=[],
                                                 defaultColDef={
                                                     "resizable": True,
                                                     "sortable": True,
@@ -740,20 +648,6 @@ def serve_layout(empresas_redis=None):
                                                         children=[
                                                             dcc.Graph(
                                                                 id='drawdown-chart',
-                                                                figure={
-                                                                    "layout": {
-                                                                        "title": "Drawdown (em construção)",
-                                                                        "xaxis": {"visible": False},
-                                                                        "yaxis": {"visible": False},
-                                                                        "annotations": [{
-                                                                            "text": "Gráfico de Drawdown Placeholder",
-                                                                            "xref": "paper",
-                                                                            "yref": "paper",
-                                                                            "showarrow": False,
-                                                                            "font": {"size": 16}
-                                                                        }]
-                                                                    }
-                                                                },
                                                                 style={'width': '100%', 'height': '200px'}
                                                             )
                                                         ]
@@ -808,23 +702,168 @@ def serve_layout(empresas_redis=None):
                         )
                     ]
                 ),
-                # Aba de Risco - Placeholder
+                # Aba de Risco
                 dmc.TabsPanel(
                     value="risco",
                     children=[
                         dmc.Grid(
                             gutter="sm",
                             children=[
+                                # Métricas em janelas móveis (portfólio e tickers)
                                 dmc.GridCol(
-                                    span={"base": 12, "md": 12},
+                                    span=12,
+                                    style={
+                                        "marginTop": "20px",
+                                        "backgroundColor": "#ffffff",
+                                        "border": "1px solid #dee2e6",
+                                        "padding": "12px",
+                                        "borderRadius": "8px",
+                                    },
                                     children=[
-                                        dmc.Text(
-                                            "Funcionalidades de Rsico em desenvolvimento.",
-                                            size="lg",
-                                            style={"textAlign": "center", "marginTop": "20px"}
-                                        )
+                                        dmc.Text("Métricas Móveis", fw=600, size="sm", mb=10),
+                                        dmc.Group(
+                                            [
+                                                dmc.Select(
+                                                    id="rolling-metric-select",
+                                                    data=[
+                                                        {"label": "Sharpe", "value": "sharpe"},
+                                                        {"label": "Sortino", "value": "sortino"},
+                                                        {"label": "Volatilidade", "value": "volatilidade"},
+                                                        {"label": "Retorno Médio Anual", "value": "retorno_medio_anual"},
+                                                        {"label": "Beta (IBOV)", "value": "beta"},
+                                                        {"label": "Alpha (IBOV)", "value": "alpha"},
+                                                    ],
+                                                    value="sharpe",
+                                                    size="xs",
+                                                    allowDeselect=False,
+                                                    style={"width": "200px"},
+                                                ),
+                                                dmc.SegmentedControl(
+                                                    id="rolling-window",
+                                                    data=[
+                                                        {"label": "21d", "value": "21"},
+                                                        {"label": "63d", "value": "63"},
+                                                        {"label": "252d", "value": "252"},
+                                                    ],
+                                                    value="63",
+                                                    size="xs",
+                                                ),
+                                            ],
+                                            justify="flex-start",
+                                            mb=10,
+                                        ),
+                                        dcc.Graph(
+                                            id="rolling-risk-chart",
+                                            style={'width': '100%', 'height': '320px'}
+                                        ),
                                     ]
-                                )
+                                ),
+                                # Comparação com benchmarks (o primeiro selecionado também é usado no alpha/beta móveis)
+                                dmc.GridCol(
+                                    span=12,
+                                    style={
+                                        "marginTop": "10px",
+                                        "backgroundColor": "#ffffff",
+                                        "border": "1px solid #dee2e6",
+                                        "padding": "12px",
+                                        "borderRadius": "8px",
+                                    },
+                                    children=[
+                                        dmc.Text("Comparação com Benchmarks", fw=600, size="sm", mb=10),
+                                        dmc.MultiSelect(
+                                            id="benchmark-select",
+                                            data=[
+                                                {"label": f"{codigo} - {info['nome']}", "value": codigo}
+                                                for codigo, info in BENCHMARKS.items()
+                                            ],
+                                            value=[BENCHMARK_PADRAO, "CDI"],
+                                            size="xs",
+                                            clearable=False,
+                                            style={"maxWidth": "520px"},
+                                            mb=10,
+                                        ),
+                                        dmc.Grid(
+                                            gutter="sm",
+                                            children=[
+                                                dmc.GridCol(
+                                                    span={"base": 12, "md": 8},
+                                                    children=[
+                                                        dcc.Graph(
+                                                            id="benchmark-comparison-chart",
+                                                            style={'width': '100%', 'height': '300px'}
+                                                        )
+                                                    ]
+                                                ),
+                                                dmc.GridCol(
+                                                    span={"base": 12, "md": 4},
+                                                    children=[
+                                                        dmc.Table(
+                                                            id="benchmark-kpis-table",
+                                                            striped=True,
+                                                            highlightOnHover=True,
+                                                            fz="xs",
+                                                        )
+                                                    ]
+                                                ),
+                                            ]
+                                        ),
+                                    ]
+                                ),
+                                # VaR e CVaR (histórico, paramétrico e Monte Carlo) com os pesos atuais
+                                dmc.GridCol(
+                                    span=12,
+                                    style={
+                                        "marginTop": "10px",
+                                        "backgroundColor": "#ffffff",
+                                        "border": "1px solid #dee2e6",
+                                        "padding": "12px",
+                                        "borderRadius": "8px",
+                                    },
+                                    children=[
+                                        dmc.Group(
+                                            [
+                                                dmc.Text("Value at Risk (VaR) e CVaR", fw=600, size="sm"),
+                                                dmc.SegmentedControl(
+                                                    id="var-horizon",
+                                                    data=[
+                                                        {"label": "1 dia", "value": "1"},
+                                                        {"label": "10 dias", "value": "10"},
+                                                        {"label": "21 dias", "value": "21"},
+                                                    ],
+                                                    value="1",
+                                                    size="xs",
+                                                ),
+                                            ],
+                                            justify="space-between",
+                                            mb=10,
+                                        ),
+                                        dmc.Grid(
+                                            gutter="sm",
+                                            children=[
+                                                dmc.GridCol(
+                                                    span={"base": 12, "md": 7},
+                                                    children=[
+                                                        dcc.Graph(
+                                                            id="var-distribution-chart",
+                                                            style={'width': '100%', 'height': '300px'}
+                                                        )
+                                                    ]
+                                                ),
+                                                dmc.GridCol(
+                                                    span={"base": 12, "md": 5},
+                                                    children=[
+                                                        dmc.Table(
+                                                            id="var-table",
+                                                            striped=True,
+                                                            highlightOnHover=True,
+                                                            fz="xs",
+                                                        )
+                                                    ]
+                                                ),
+                                            ]
+                                        ),
+                                    ]
+                                ),
                             ]
                         )
                     ]
@@ -850,23 +889,230 @@ def serve_layout(empresas_redis=None):
                         )
                     ]
                 ),
-                # Aba Avançado - Placeholder
+                # Aba Avançado
                 dmc.TabsPanel(
                     value="avancado",
                     children=[
                         dmc.Grid(
                             gutter="sm",
                             children=[
+                                # Projeção do valor da carteira por Monte Carlo (quantidades atuais)
                                 dmc.GridCol(
-                                    span={"base": 12, "md": 12},
+                                    span=12,
+                                    style={
+                                        "marginTop": "20px",
+                                        "backgroundColor": "#ffffff",
+                                        "border": "1px solid #dee2e6",
+                                        "padding": "12px",
+                                        "borderRadius": "8px",
+                                    },
                                     children=[
-                                        dmc.Text(
-                                            "Funcionalidades de ferramentas avançadas em desenvolvimento.",
-                                            size="lg",
-                                            style={"textAlign": "center", "marginTop": "20px"}
-                                        )
+                                        dmc.Text("Projeção da Carteira (Monte Carlo)", fw=600, size="sm", mb=10),
+                                        dmc.Group(
+                                            [
+                                                dmc.SegmentedControl(
+                                                    id="projection-method",
+                                                    data=[
+                                                        {"label": "Browniano geométrico", "value": "gbm"},
+                                                        {"label": "Bootstrap histórico", "value": "bootstrap"},
+                                                    ],
+                                                    value="gbm",
+                                                    size="xs",
+                                                ),
+                                                dmc.SegmentedControl(
+                                                    id="projection-horizon",
+                                                    data=[
+                                                        {"label": "6m", "value": "126"},
+                                                        {"label": "1a", "value": "252"},
+                                                        {"label": "2a", "value": "504"},
+                                                        {"label": "5a", "value": "1260"},
+                                                    ],
+                                                    value="252",
+                                                    size="xs",
+                                                ),
+                                                dmc.NumberInput(
+                                                    id="projection-target",
+                                                    placeholder="Valor alvo (R$)",
+                                                    prefix="R$ ",
+                                                    thousandSeparator=".",
+                                                    decimalSeparator=",",
+                                                    min=0,
+                                                    size="xs",
+                                                    style={"width": "180px"},
+                                                ),
+                                            ],
+                                            justify="flex-start",
+                                            mb=10,
+                                        ),
+                                        dcc.Graph(
+                                            id="projection-chart",
+                                            style={'width': '100%', 'height': '360px'}
+                                        ),
+                                        dmc.Text(id="projection-summary", size="xs", c="dimmed", mt=5),
                                     ]
-                                )
+                                ),
+                                # Otimização média-variância dos tickers atuais
+                                dmc.GridCol(
+                                    span=12,
+                                    style={
+                                        "marginTop": "10px",
+                                        "backgroundColor": "#ffffff",
+                                        "border": "1px solid #dee2e6",
+                                        "padding": "12px",
+                                        "borderRadius": "8px",
+                                    },
+                                    children=[
+                                        dmc.Group(
+                                            [
+                                                dmc.Text("Fronteira Eficiente (Média-Variância)", fw=600, size="sm"),
+                                                dmc.Group(
+                                                    [
+                                                        dmc.SegmentedControl(
+                                                            id="optimization-target",
+                                                            data=[
+                                                                {"label": "Máximo Sharpe", "value": "max_sharpe"},
+                                                                {"label": "Mínima Variância", "value": "min_variancia"},
+                                                                {"label": "HRP", "value": "hrp"},
+                                                            ],
+                                                            value="max_sharpe",
+                                                            size="xs",
+                                                        ),
+                                                        dmc.Switch(
+                                                            id="hrp-sector-switch",
+                                                            label="HRP por setor",
+                                                            checked=False,
+                                                            size="xs",
+                                                        ),
+                                                    ],
+                                                    gap="sm",
+                                                ),
+                                            ],
+                                            justify="space-between",
+                                            mb=10,
+                                        ),
+                                        dmc.Grid(
+                                            gutter="sm",
+                                            children=[
+                                                dmc.GridCol(
+                                                    span={"base": 12, "md": 7},
+                                                    children=[
+                                                        dcc.Graph(
+                                                            id="efficient-frontier-chart",
+                                                            style={'width': '100%', 'height': '360px'}
+                                                        )
+                                                    ]
+                                                ),
+                                                dmc.GridCol(
+                                                    span={"base": 12, "md": 5},
+                                                    children=[
+                                                        dmc.ScrollArea(
+                                                            h=360,
+                                                            children=dmc.Table(
+                                                                id="optimization-table",
+                                                                striped=True,
+                                                                highlightOnHover=True,
+                                                                fz="xs",
+                                                            ),
+                                                        )
+                                                    ]
+                                                ),
+                                            ]
+                                        ),
+                                    ]
+                                ),
+                            ]
+                        )
+                    ]
+                ),
+                # Aba Screener: filtros sobre as estatísticas pré-calculadas do universo B3
+                dmc.TabsPanel(
+                    value="screener",
+                    children=[
+                        dmc.Grid(
+                            gutter="sm",
+                            children=[
+                                dmc.GridCol(
+                                    span=12,
+                                    style={
+                                        "marginTop": "20px",
+                                        "backgroundColor": "#ffffff",
+                                        "border": "1px solid #dee2e6",
+                                        "padding": "12px",
+                                        "borderRadius": "8px",
+                                    },
+                                    children=[
+                                        dmc.Text("Screener de Ações B3", fw=600, size="sm", mb=10),
+                                        dmc.Grid(
+                                            gutter="sm",
+                                            children=[
+                                                dmc.GridCol(
+                                                    span={"base": 12, "md": 4},
+                                                    children=dmc.Select(
+                                                        id=f"screener-{nivel}",
+                                                        label=rotulo,
+                                                        data=[],
+                                                        value=None,
+                                                        searchable=True,
+                                                        clearable=True,
+                                                        placeholder="Todos",
+                                                        size="xs",
+                                                    ),
+                                                )
+                                                for nivel, rotulo in (
+                                                    ("setor", "Setor"), ("subsetor", "Subsetor"), ("segmento", "Segmento")
+                                                )
+                                            ] + [
+                                                dmc.GridCol(
+                                                    span={"base": 12, "md": 4},
+                                                    children=[
+                                                        dmc.Text(rotulo, size="xs", mb=5),
+                                                        dmc.RangeSlider(
+                                                            id=f"screener-{coluna}",
+                                                            min=minimo,
+                                                            max=maximo,
+                                                            step=passo,
+                                                            value=[minimo, maximo],
+                                                            minRange=passo,
+                                                            size="xs",
+                                                            updatemode="mouseup",
+                                                        ),
+                                                    ],
+                                                )
+                                                for coluna, (rotulo, minimo, maximo, passo, _) in FAIXAS_SCREENER.items()
+                                            ] + [
+                                                dmc.GridCol(
+                                                    span={"base": 12, "md": 4},
+                                                    children=dmc.NumberInput(
+                                                        id="screener-liquidez",
+                                                        label="Liquidez mínima (R$ mi/dia)",
+                                                        min=0,
+                                                        step=1,
+                                                        decimalSeparator=",",
+                                                        size="xs",
+                                                    ),
+                                                ),
+                                            ]
+                                        ),
+                                        dmc.Text(id="screener-total", size="xs", c="dimmed", mt=10, mb=5),
+                                        dash_table.DataTable(
+                                            id='screener-table',
+                                            columns=[{'name': nome, 'id': coluna} for coluna, (nome, _) in COLUNAS_SCREENER.items()],
+                                            data=[],
+                                            page_action='custom',
+                                            page_current=0,
+                                            page_size=20,
+                                            sort_action='custom',
+                                            sort_mode='single',
+                                            sort_by=[{'column_id': 'liquidez', 'direction': 'desc'}],
+                                            style_table={'overflowX': 'auto', 'border': '1px solid #dee2e6'},
+                                            style_cell={'fontSize': '12px', 'textAlign': 'center', 'padding': '3px'},
+                                            style_header={'fontWeight': 'bold'},
+                                            style_data_conditional=[
+                                                {'if': {'column_id': 'ticker'}, 'cursor': 'pointer', 'fontWeight': 'bold'},
+                                            ],
+                                        ),
+                                    ]
+                                ),
                             ]
                         )
                     ]
@@ -891,12 +1137,16 @@ def init_dash(flask_app, portfolio_service, empresas_redis=None):
     )
     # dash_app.enable_dev_tools(debug=True, dev_tools_hot_reload=True)
     dash_app.portfolio_service = portfolio_service
+    dash_app.empresas_redis = empresas_redis
     dash_app.layout = partial(serve_layout, empresas_redis=empresas_redis)
     
     # Registrar callbacks modulares
     register_table_callbacks(dash_app)
     register_kpis_card(dash_app)
     register_graph_callbacks(dash_app)
+    register_risk_callbacks(dash_app)
+    register_advanced_callbacks(dash_app)
+    register_screener_callbacks(dash_app)
  
     
     # Configurar o Flask subjacente para usar orjson em respostas JSON
@@ -1106,7 +1356,7 @@ def init_dash(flask_app, portfolio_service, empresas_redis=None):
             dropdown_options = [{'label': portfolio_name, 'value': portfolio_name}]
             return (
                 dmc.Text('Portfólio salvo com sucesso', color='green'),
-                orjson_dumps(store_data).decode('utf-8'),
+                serializar_store(store_data),
                 dropdown_options,
                 portfolio_name,
                 False  # Fechar o modal após salvar
@@ -1125,19 +1375,18 @@ def init_dash(flask_app, portfolio_service, empresas_redis=None):
     @log_callback("update_period")
     def update_period(n_clicks, date_range, store_data):
         """
-        Atualiza o período do portfólio usando o PortfolioService.
+        Atualiza o período do portfólio recortando o histórico em cache (sem novo download).
         """
-        if store_data:
-            store_data = orjson_loads(store_data) if isinstance(store_data, (str, bytes)) else store_data
+        store_data = decodificar_store(carregar_store(store_data))
         if not n_clicks or not date_range or not store_data:
-            return orjson_dumps(store_data).decode('utf-8') if store_data else None
+            return serializar_store(store_data) if store_data else None
         try:
             start_date_formatted = date_range[0]
             end_date_formatted = date_range[1]
-            updated_portfolio = dash_app.portfolio_service.update_portfolio_period(store_data, start_date_formatted, end_date_formatted)
-            return orjson_dumps(updated_portfolio).decode('utf-8')
+            updated_portfolio = atualizar_periodo(store_data, start_date_formatted, end_date_formatted, dash_app.empresas_redis)
+            return serializar_store(updated_portfolio)
         except ValueError as e:
-            return orjson_dumps(store_data).decode('utf-8')
+            return serializar_store(store_data)
         
     @dash_app.callback(
         Output('sector-bar-charts', 'figure'),
@@ -1212,10 +1461,9 @@ def init_dash(flask_app, portfolio_service, empresas_redis=None):
         )
         return fig
     
-    import re
-    # Função para remover números e .SA
+    # Função para remover o sufixo de classe e .SA
     def normaliza_ticker(ticker):
-        return re.sub(r'\d+', '', ticker.replace('.SA', ''))
+        return raiz_ticker(ticker)
 
     @dash_app.callback(
         Output('financial-sunburst-chart', 'figure'),
@@ -1229,7 +1477,7 @@ def init_dash(flask_app, portfolio_service, empresas_redis=None):
         store_data = orjson_loads(store_data) if isinstance(store_data, (str, bytes)) else store_data
         tickers = store_data['tickers']
         quantities = store_data['quantities']
-        portfolio_values = store_data.get('portfolio_values', {})
+        portfolio_values = quadro_store(store_data, 'portfolio_values').ffill()
 
         labels, ids, parents, values, hover_texts = [], [], [], [], []
         inseridos = set()
@@ -1242,8 +1490,8 @@ def init_dash(flask_app, portfolio_service, empresas_redis=None):
             segmento = info.get("segmento", subsetor)
 
             valor_final = 0
-            if ticker in portfolio_values and portfolio_values[ticker]:
-                valor_final = list(portfolio_values[ticker].values())[-1] * quantity
+            if ticker in portfolio_values.columns and not portfolio_values.empty and not np.isnan(portfolio_values[ticker].iloc[-1]):
+                valor_final = portfolio_values[ticker].iloc[-1] * quantity
 
             setor_id = f"setor::{setor}"
             subsetor_id = f"{setor_id}|subsetor::{subsetor}"
@@ -1536,8 +1784,7 @@ def init_dash(flask_app, portfolio_service, empresas_redis=None):
         # ALTERAÇÃO: Desserializar store_data com orjson_loads
         # Motivo: Dados do dcc.Store foram serializados com orjson_dumps; convertemos para dict
         # Impacto: Permite acessar portfolio_values, dividends, etc. para gerar o gráfico
-        if store_data:
-            store_data = orjson_loads(store_data) if isinstance(store_data, (str, bytes)) else store_data
+        store_data = decodificar_store(carregar_store(store_data), chaves=['portfolio_values', 'dividends'])
 
         if not store_data or 'portfolio_values' not in store_data or 'tickers' not in store_data:
             return go.Figure()
@@ -1626,8 +1873,7 @@ def init_dash(flask_app, portfolio_service, empresas_redis=None):
         # ALTERAÇÃO: Desserializar store_data com orjson_loads
         # Motivo: Dados do dcc.Store foram serializados com orjson_dumps; convertemos para dict
         # Impacto: Permite acessar portfolio_values, dividends, etc. para gerar o gráfico
-        if store_data:
-            store_data = orjson_loads(store_data) if isinstance(store_data, (str, bytes)) else store_data
+        store_data = decodificar_store(carregar_store(store_data), chaves=['portfolio_values', 'dividends'])
 
         if not store_data or 'portfolio_values' not in store_data or 'tickers' not in store_data:
             return go.Figure()
@@ -1709,8 +1955,7 @@ def init_dash(flask_app, portfolio_service, empresas_redis=None):
         # ALTERAÇÃO: Desserializar store_data com orjson_loads
         # Motivo: Dados do dcc.Store foram serializados com orjson_dumps; convertemos para dict
         # Impacto: Permite acessar portfolio_values, dividends, etc. para gerar o gráfico
-        if store_data:
-            store_data = orjson_loads(store_data) if isinstance(store_data, (str, bytes)) else store_data
+        store_data = decodificar_store(carregar_store(store_data), chaves=['portfolio_values', 'dividends'])
 
         if not store_data or 'tickers' not in store_data or 'portfolio_values' not in store_data:
             return go.Figure().update_layout(
@@ -1725,28 +1970,23 @@ def init_dash(flask_app, portfolio_service, empresas_redis=None):
         start_date = store_data.get('start_date', '2024-01-01')
         end_date = store_data.get('end_date', '2025-04-23')
 
-        start = pd.to_datetime(start_date)
-        end = pd.to_datetime(end_date)
-
-        portfolio_df = pd.DataFrame()
-        for ticker in tickers:
-            if ticker in portfolio_values and portfolio_values[ticker]:
-                df = pd.DataFrame.from_dict(portfolio_values[ticker], orient='index', columns=[ticker])
-                df.index = pd.to_datetime(df.index)
-                portfolio_df = portfolio_df.join(df, how='outer') if not portfolio_df.empty else df
-        portfolio_df = portfolio_df.ffill().loc[start:end]
+        # Valores e dividendos alinhados num único eixo de dias; o período é recortado por busca binária
+        painel = PricePanel.from_dados(
+            {t: portfolio_values.get(t) or {} for t in tickers},
+            dividends={t: dividends.get(t) or {} for t in tickers},
+        )
+        periodo = fatiar(painel.dias, start_date, end_date)
+        valores = pd.DataFrame(painel.precos.T).ffill().to_numpy()[periodo]
 
-        if portfolio_df.empty:
+        if len(valores) == 0:
             return go.Figure().update_layout(
                 title="Retorno Total e DY Acumulados (%)",
                 annotations=[dict(text="Sem dados", x=0.5, y=0.5, showarrow=False)]
             )
 
-        total_portfolio = pd.DataFrame()
-        for ticker, qty in zip(tickers, quantities):
-            if ticker in portfolio_df.columns:
-                total_portfolio[ticker] = portfolio_df[ticker] * qty
-        portfolio_series = total_portfolio.sum(axis=1)
+        qtd = np.asarray(quantities, dtype=float)
+        datas = painel.indice_datetime()[periodo]
+        portfolio_series = pd.Series(np.nansum(valores * qtd, axis=1), index=datas)
 
         initial_value = portfolio_series.iloc[0]
         if initial_value == 0:
@@ -1757,23 +1997,10 @@ def init_dash(flask_app, portfolio_service, empresas_redis=None):
 
         gains_series = ((portfolio_series - initial_value) / initial_value) * 100
 
-        dividend_dates = []
-        dividend_totals = []
-        cumulative_dividends = 0
-        all_dates = pd.date_range(start=start, end=end, freq='D')
-        
-        for date in all_dates:
-            date_str = date.strftime('%Y-%m-%d')
-            daily_dividend = 0
-            for ticker, qty in zip(tickers, quantities):
-                if ticker in dividends and date_str in dividends[ticker]:
-                    daily_dividend += dividends[ticker][date_str] * qty
-            cumulative_dividends += daily_dividend
-            dividend_dates.append(date)
-            dividend_totals.append(cumulative_dividends)
-
-        dividend_series = pd.Series(dividend_totals, index=dividend_dates)
-        dividend_series = dividend_series.reindex(portfolio_series.index, method='ffill').fillna(0)
+        proventos_diarios = np.bincount(
+            painel.div_dia, weights=painel.div_valor * qtd[painel.div_ticker], minlength=len(painel.dias)
+        )[periodo]
+        dividend_series = pd.Series(np.cumsum(proventos_diarios), index=datas)
         dy_series = (dividend_series / initial_value) * 100
 
         total_return = gains_series + dy_series
@@ -1817,16 +2044,11 @@ def init_dash(flask_app, portfolio_service, empresas_redis=None):
         # ALTERAÇÃO: Desserializar store_data com orjson_loads
         # Motivo: Dados do dcc.Store foram serializados com orjson_dumps; convertemos para dict
         # Impacto: Permite acessar individual_returns para gerar o heatmap
-        if store_data:
-            store_data = orjson_loads(store_data) if isinstance(store_data, (str, bytes)) else store_data
-
-        if not store_data or 'individual_returns' not in store_data or not store_data['individual_returns']:
+        store_data = carregar_store(store_data)
+        if not store_data:
             return go.Figure()
 
-        individual_returns = store_data['individual_returns']
-        tickers = store_data['tickers']
-        returns_df = pd.DataFrame({ticker: individual_returns.get(ticker, {}) for ticker in tickers})
-        returns_df = returns_df.apply(pd.to_numeric, errors='coerce').dropna()
+        returns_df = quadro_store(store_data, 'individual_returns', store_data.get('tickers', [])).dropna()
 
         if returns_df.empty or len(returns_df.columns) < 2:
             return go.Figure()
@@ -1861,19 +2083,16 @@ def init_dash(flask_app, portfolio_service, empresas_redis=None):
         # ALTERAÇÃO: Desserializar store_data com orjson_loads
         # Motivo: Dados do dcc.Store foram serializados com orjson_dumps; convertemos para dict
         # Impacto: Permite acessar individual_daily_returns e portfolio_daily_return para gerar o gráfico
-        if store_data:
-            store_data = orjson_loads(store_data) if isinstance(store_data, (str, bytes)) else store_data
-
-        if not store_data or 'individual_daily_returns' not in store_data or 'portfolio_daily_return' not in store_data:
+        store_data = carregar_store(store_data)
+        if not store_data:
             return go.Figure()
 
-        individual_daily_returns = store_data['individual_daily_returns']
-        portfolio_daily_return = store_data['portfolio_daily_return']
-        tickers = store_data['tickers']
-        
-        returns_df = pd.DataFrame({ticker: individual_daily_returns.get(ticker, {}) for ticker in tickers})
-        returns_df = returns_df.apply(pd.to_numeric, errors='coerce').dropna()
-        returns_df['Portfolio'] = pd.Series(portfolio_daily_return).reindex(returns_df.index).fillna(0)
+        tickers = store_data.get('tickers', [])
+        returns_df = quadro_store(store_data, 'individual_daily_returns', tickers).dropna()
+        portfolio_daily_return = serie_store(store_data, 'portfolio_daily_return')
+        if returns_df.empty or portfolio_daily_return.empty:
+            return go.Figure()
+        returns_df['Portfolio'] = portfolio_daily_return.reindex(returns_df.index).fillna(0)
 
         volatilities = returns_df.std() * (252 ** 0.5)
 
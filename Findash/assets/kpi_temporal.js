@@ -0,0 +1,154 @@
+// Troca de período do grid "Evolução Temporal dos KPIs" sem ida ao servidor.
+// As tabelas dos quatro períodos já vêm calculadas em data-store.kpis_periodos
+// (formato colunar: {kpis: [...], periodos: {mensal: {colunas: [...], valores: [[...]]}}}).
+
+(function () {
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        findash: Object.assign({}, (window.dash_clientside || {}).findash, {
+            atualizarKpiTemporal: function (nMensal, nTrimestral, nSemestral, nAnual, storeData,
+                                            vMensal, vTrimestral, vSemestral, vAnual) {
+                var periodos = ['mensal', 'trimestral', 'semestral', 'anual'];
+                var variantes = [vMensal, vTrimestral, vSemestral, vAnual];
+
+                // Período ativo: botão clicado ou, se o store mudou, o botão que já estava ativo
+                var periodo = periodos[Math.max(0, variantes.indexOf('filled'))];
+                var ctx = window.dash_clientside.callback_context;
+                var disparo = ctx && ctx.triggered && ctx.triggered.length ? ctx.triggered[0].prop_id.split('.')[0] : '';
+                if (disparo.indexOf('btn-') === 0) {
+                    periodo = disparo.replace('btn-', '');
+                }
+                var novasVariantes = periodos.map(function (p) { return p === periodo ? 'filled' : 'outline'; });
+
+                var dados = typeof storeData === 'string' ? JSON.parse(storeData) : (storeData || {});
+                var tabela = montarTabela(dados, periodo);
+                if (!tabela) {
+                    return [[{field: 'KPI', headerName: 'Indicador'}], []].concat(novasVariantes);
+                }
+                return [colunasKpi(tabela.colunas), linhasKpi(tabela)].concat(novasVariantes);
+            }
+        })
+    });
+
+    function montarTabela(dados, periodo) {
+        var compacto = dados.kpis_periodos;
+        if (compacto && compacto.periodos && compacto.periodos[periodo]) {
+            return {
+                kpis: compacto.kpis,
+                colunas: compacto.periodos[periodo].colunas,
+                valores: compacto.periodos[periodo].valores
+            };
+        }
+        // Stores antigos têm só a tabela mensal em kpis_por_periodo ({kpi: {periodo: valor}})
+        var antigo = dados.kpis_por_periodo;
+        if (periodo !== 'mensal' || !antigo || !Object.keys(antigo).length) {
+            return null;
+        }
+        var kpis = Object.keys(antigo);
+        var colunas = Object.keys(antigo[kpis[0]]);
+        return {
+            kpis: kpis,
+            colunas: colunas,
+            valores: kpis.map(function (k) { return colunas.map(function (c) { return antigo[k][c]; }); })
+        };
+    }
+
+    function linhasKpi(tabela) {
+        return tabela.kpis.map(function (kpi, i) {
+            var linha = {KPI: kpi};
+            var valores = tabela.valores[i].map(function (v) {
+                return v === null || v === undefined ? null : Math.round(v * 100) / 100;
+            });
+            tabela.colunas.forEach(function (coluna, j) { linha[coluna] = valores[j]; });
+            linha.sparkline = {
+                data: [{
+                    type: 'scatter',
+                    y: valores,
+                    mode: 'lines+markers',
+                    line: {width: 1, color: '#1f77b4'},
+                    marker: {size: 4},
+                    hovertemplate: '%{y:.2f}<extra></extra>'
+                }],
+                layout: {
+                    showlegend: false,
+                    margin: {l: 0, r: 0, t: 0, b: 0},
+                    xaxis: {visible: false},
+                    yaxis: {visible: false, showticklabels: false},
+                    height: 25,
+                    width: 100,
+                    paper_bgcolor: 'rgba(0,0,0,0)',
+                    plot_bgcolor: 'rgba(0,0,0,0)'
+                }
+            };
+            return linha;
+        });
+    }
+
+    var VERDE = {backgroundColor: '#28a745', color: 'white'};
+    var AMARELO = {backgroundColor: '#ffc107', color: 'black'};
+    var VERMELHO = {backgroundColor: '#dc3545', color: 'white'};
+
+    var CONDICOES_KPI = [
+        // Sharpe
+        {condition: "params.data.KPI === 'sharpe' && params.value > 2.0", style: VERDE},
+        {condition: "params.data.KPI === 'sharpe' && params.value >= 1.0 && params.value <= 2.0", style: AMARELO},
+        {condition: "params.data.KPI === 'sharpe' && params.value < 1.0", style: VERMELHO},
+        // Sortino
+        {condition: "params.data.KPI === 'sortino' && params.value > 3.0", style: VERDE},
+        {condition: "params.data.KPI === 'sortino' && params.value >= 1.5 && params.value <= 3.0", style: AMARELO},
+        {condition: "params.data.KPI === 'sortino' && params.value < 1.5", style: VERMELHO},
+        // Volatilidade
+        {condition: "params.data.KPI === 'volatilidade' && params.value < 0.20", style: VERDE},
+        {condition: "params.data.KPI === 'volatilidade' && params.value >= 0.20 && params.value <= 0.30", style: AMARELO},
+        {condition: "params.data.KPI === 'volatilidade' && params.value > 0.30", style: VERMELHO},
+        // Max Drawdown
+        {condition: "params.data.KPI === 'max_drawdown' && params.value > -0.10", style: VERDE},
+        {condition: "params.data.KPI === 'max_drawdown' && params.value >= -0.20 && params.value <= -0.10", style: AMARELO},
+        {condition: "params.data.KPI === 'max_drawdown' && params.value < -0.20", style: VERMELHO},
+        // Retorno Médio Anual
+        {condition: "params.data.KPI === 'retorno_medio_anual' && params.value > 0.10", style: VERDE},
+        {condition: "params.data.KPI === 'retorno_medio_anual' && params.value >= 0.0 && params.value <= 0.10", style: AMARELO},
+        {condition: "params.data.KPI === 'retorno_medio_anual' && params.value < 0.0", style: VERMELHO},
+        // Alpha
+        {condition: "params.data.KPI === 'alpha' && params.value > 0.0", style: VERDE},
+        {condition: "params.data.KPI === 'alpha' && params.value >= -0.01 && params.value <= 0.01", style: AMARELO},
+        {condition: "params.data.KPI === 'alpha' && params.value < -0.01", style: VERMELHO},
+        // Beta
+        {condition: "params.data.KPI === 'beta' && params.value >= 0.8 && params.value <= 1.2", style: VERDE},
+        {condition: "params.data.KPI === 'beta' && ((params.value >= 0.5 && params.value < 0.8) || (params.value > 1.2 && params.value <= 1.5))", style: AMARELO},
+        {condition: "params.data.KPI === 'beta' && (params.value < 0.5 || params.value > 1.5)", style: VERMELHO}
+    ];
+
+    function colunasKpi(colunas) {
+        var defs = [{
+            field: 'KPI',
+            headerName: 'Indicador',
+            pinned: 'left',
+            sortable: true,
+            filter: false,
+            width: 120,
+            headerClass: 'center-header'
+        }];
+        colunas.forEach(function (coluna) {
+            defs.push({
+                field: coluna,
+                headerName: coluna,
+                sortable: true,
+                filter: false,
+                flex: 1,
+                minWidth: 80,
+                headerClass: 'center-header',
+                cellStyle: {styleConditions: CONDICOES_KPI}
+            });
+        });
+        defs.push({
+            field: 'sparkline',
+            headerName: 'Tendência',
+            cellRenderer: 'DCC_Sparkline',
+            width: 150,
+            minWidth: 100,
+            maxWidth: 200,
+            cellStyle: {padding: '0px', display: 'flex', alignItems: 'center'}
+        });
+        return defs;
+    }
+})();
@@ -0,0 +1,286 @@
+"""
+Benchmarks do pipeline de métricas do FinDash com portfólios sintéticos.
+
+Mede `obter_dados` (com o provedor offline, cache de preços vazio e cheio), `calcular_metricas`,
+`calcular_kpis` e `calcular_kpis_por_periodo` para cada tamanho de painel (tickers × anos),
+reportando p50/p95 do tempo e o pico de memória, e compara o resultado com um baseline salvo.
+
+Uso:
+    python -m Findash.benchmarks.run_benchmarks
+    python -m Findash.benchmarks.run_benchmarks --tamanhos 5x1,50x5 --repeticoes 10
+    python -m Findash.benchmarks.run_benchmarks --salvar-baseline
+
+Retorna código de saída 1 se algum caso ficar mais lento (p50) ou usar mais memória que o
+baseline além da tolerância.
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# O cache de preços dos benchmarks fica sempre num diretório temporário criado aqui (antes de
+# importar o price_store), nunca no cache da aplicação, mesmo com FINDASH_PRICE_CACHE_DIR definido
+_CACHE_PRECOS = tempfile.mkdtemp(prefix='findash_bench_')
+os.environ['FINDASH_PRICE_CACHE_DIR'] = _CACHE_PRECOS
+
+import numpy as np
+import pandas as pd
+import redis
+from redis.exceptions import RedisError
+from Findash.metrics.data_fetch import configurar_provedor, obter_dados, obter_painel
+from Findash.metrics.kpis_calc import calcular_kpis, calcular_kpis_por_periodo
+from Findash.metrics.metrics import calcular_metricas
+from Findash.metrics.price_store import price_store
+from Findash.metrics.returns import calcular_retorno_diario_ibov
+from Findash.metrics.trading_calendar import indice_datetime
+from .sintetico import ProvedorSintetico, gerar_historico, gerar_tickers, periodo
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+# Painéis medidos por padrão: (tickers, anos)
+TAMANHOS = [(n, anos) for n in (5, 50, 500) for anos in (1, 5, 20)]
+CASOS = ('obter_dados_frio', 'obter_dados', 'calcular_metricas', 'calcular_kpis', 'calcular_kpis_por_periodo')
+# Aumento relativo aceito em relação ao baseline antes de acusar regressão
+TOLERANCIA = 0.2
+
+
+@contextlib.contextmanager
+def _silencioso():
+    """Suprime os logs e os prints que ainda restam no pipeline (e.g., modules/metrics.py) durante as medições."""
+    logging.disable(logging.CRITICAL)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+def medir(funcao: Callable[[], Any], repeticoes: int, preparar: Optional[Callable[[], None]] = None) -> Dict[str, float]:
+    """
+    Mede o tempo de `funcao` em várias repetições e o pico de memória numa execução extra.
+
+    O pico é medido à parte porque o tracemalloc deixa a execução bem mais lenta.
+
+    Args:
+        funcao (callable): Função sem argumentos a ser medida.
+        repeticoes (int): Quantidade de execuções cronometradas (após uma de aquecimento).
+        preparar (callable, optional): Executada antes de cada execução, fora da medição.
+
+    Returns:
+        dict: p50 e p95 (segundos), pico_mb (MiB alocados no pico) e repeticoes.
+    """
+    def executar():
+        if preparar:
+            preparar()
+        with _silencioso():
+            inicio = time.perf_counter()
+            funcao()
+            return time.perf_counter() - inicio
+
+    executar()
+    tempos = [executar() for _ in range(repeticoes)]
+
+    if preparar:
+        preparar()
+    tracemalloc.start()
+    try:
+        with _silencioso():
+            funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'p50': float(np.percentile(tempos, 50)),
+        'p95': float(np.percentile(tempos, 95)),
+        'pico_mb': pico / 2 ** 20,
+        'repeticoes': repeticoes,
+    }
+
+
+def _limpar_cache_precos() -> None:
+    # Só apaga o diretório criado por este script
+    if os.path.realpath(price_store.diretorio) != os.path.realpath(_CACHE_PRECOS):
+        raise RuntimeError(f"Cache de preços fora do diretório temporário dos benchmarks: {price_store.diretorio}")
+    for nome in os.listdir(price_store.diretorio):
+        os.remove(os.path.join(price_store.diretorio, nome))
+
+
+def _retornos_diarios(painel, tickers: List[str], quantities: List[float]) -> Tuple[pd.Series, pd.Series]:
+    """Retornos diários (decimais) do portfólio e do IBOV, como em `agregar_portfolio`."""
+    valores = (painel.to_frame(tickers) * pd.Series(dict(zip(tickers, quantities)))).sum(axis=1, min_count=1)
+    retornos = valores.pct_change().dropna()
+    retornos.index = indice_datetime(retornos.index)
+    benchmark = calcular_retorno_diario_ibov(painel.serie_benchmark())
+    benchmark.index = indice_datetime(benchmark.index)
+    return retornos, benchmark.reindex(retornos.index)
+
+
+def executar_tamanho(n_tickers: int, anos: int, repeticoes: int, casos: Tuple[str, ...],
+                     empresas_redis: Optional[redis.Redis]) -> Dict[str, Dict[str, float]]:
+    """
+    Executa os casos de benchmark para um painel sintético de `n_tickers` × `anos`.
+
+    Returns:
+        dict: {caso: resultado de `medir`}; casos que não puderam rodar ficam de fora.
+    """
+    tickers = gerar_tickers(n_tickers)
+    start_date, end_date = periodo(anos)
+    quantities = [100] * n_tickers
+    configurar_provedor(ProvedorSintetico(gerar_historico(tickers, anos, seed=n_tickers * 100 + anos)))
+    resultados = {}
+    try:
+        if 'obter_dados_frio' in casos:
+            resultados['obter_dados_frio'] = medir(
+                lambda: obter_dados(tickers, start_date, end_date), repeticoes, preparar=_limpar_cache_precos
+            )
+        with _silencioso():
+            painel, _ = obter_painel(tickers, start_date, end_date)
+        if 'obter_dados' in casos:
+            resultados['obter_dados'] = medir(lambda: obter_dados(tickers, start_date, end_date), repeticoes)
+
+        if 'calcular_metricas' in casos and empresas_redis is not None:
+            resultados['calcular_metricas'] = medir(
+                lambda: calcular_metricas(painel, tickers, quantities, start_date, end_date, empresas_redis),
+                repeticoes
+            )
+
+        retornos, benchmark = _retornos_diarios(painel, tickers, quantities)
+        if 'calcular_kpis' in casos:
+            resultados['calcular_kpis'] = medir(lambda: calcular_kpis(retornos.copy(), benchmark.copy()), repeticoes)
+        if 'calcular_kpis_por_periodo' in casos:
+            resultados['calcular_kpis_por_periodo'] = medir(
+                lambda: calcular_kpis_por_periodo(retornos.copy(), 'mensal', benchmark.copy()), repeticoes
+            )
+    finally:
+        configurar_provedor(None)
+        _limpar_cache_precos()
+    return resultados
+
+
+def comparar(resultados: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+             tolerancia: float = TOLERANCIA) -> List[str]:
+    """
+    Compara os resultados com o baseline.
+
+    Args:
+        resultados (dict): {chave: medição} da execução atual.
+        baseline (dict): {chave: medição} salvo anteriormente.
+        tolerancia (float): Aumento relativo aceito (0.2 = 20%).
+
+    Returns:
+        list: Descrição de cada regressão encontrada (vazia se não houver).
+    """
+    regressoes = []
+    for chave, atual in resultados.items():
+        anterior = baseline.get(chave)
+        if not anterior:
+            continue
+        for metrica, unidade in (('p50', 's'), ('pico_mb', 'MiB')):
+            if anterior[metrica] > 0 and atual[metrica] > anterior[metrica] * (1 + tolerancia):
+                regressoes.append(
+                    f"{chave}: {metrica} {anterior[metrica]:.4f}{unidade} → {atual[metrica]:.4f}{unidade} "
+                    f"(+{atual[metrica] / anterior[metrica] - 1:.0%})"
+                )
+    return regressoes
+
+
+def _ler_tamanhos(texto: str) -> List[Tuple[int, int]]:
+    """Converte '5x1,50x5' em [(5, 1), (50, 5)]."""
+    tamanhos = []
+    for item in filter(None, (t.strip() for t in texto.split(','))):
+        n_tickers, anos = item.lower().split('x')
+        tamanhos.append((int(n_tickers), int(anos)))
+    return tamanhos
+
+
+def _conectar_empresas(url: str) -> Optional[redis.Redis]:
+    """Conexão com o Redis de empresas (DB3), usada pelo `calcular_metricas` para os setores."""
+    try:
+        cliente = redis.Redis.from_url(url)
+        cliente.ping()
+        return cliente
+    except RedisError as e:
+        print(f"Redis de empresas indisponível em {url} ({e}); calcular_metricas não será medido", file=sys.stderr)
+        return None
+
+
+def _imprimir(resultados: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]]) -> None:
+    print(f"{'caso':<45} {'p50 (s)':>10} {'p95 (s)':>10} {'pico (MiB)':>11} {'vs baseline':>12}")
+    for chave, medicao in resultados.items():
+        anterior = baseline.get(chave)
+        variacao = f"{medicao['p50'] / anterior['p50'] - 1:+.0%}" if anterior and anterior['p50'] > 0 else '-'
+        print(f"{chave:<45} {medicao['p50']:>10.4f} {medicao['p95']:>10.4f} {medicao['pico_mb']:>11.1f} {variacao:>12}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tamanhos', default=','.join(f"{n}x{a}" for n, a in TAMANHOS),
+                        help="Painéis no formato TICKERSxANOS separados por vírgula (e.g., '5x1,50x5')")
+    parser.add_argument('--casos', default=','.join(CASOS), help=f"Casos a medir, entre: {', '.join(CASOS)}")
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--baseline', default=BASELINE, help='Arquivo JSON do baseline')
+    parser.add_argument('--salvar-baseline', action='store_true', help='Grava os resultados como novo baseline')
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA)
+    parser.add_argument('--redis-url', default=os.getenv('FINDASH_BENCH_REDIS', 'redis://localhost:6379/3'),
+                        help='Redis de empresas (DB3) para calcular_metricas')
+    parser.add_argument('--saida', help='Grava os resultados desta execução em JSON')
+    args = parser.parse_args(argv)
+
+    casos = tuple(c.strip() for c in args.casos.split(',') if c.strip())
+    desconhecidos = set(casos) - set(CASOS)
+    if desconhecidos:
+        parser.error(f"Casos desconhecidos: {', '.join(sorted(desconhecidos))}")
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.salvar_baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f).get('resultados', {})
+
+    empresas_redis = _conectar_empresas(args.redis_url) if 'calcular_metricas' in casos else None
+
+    resultados = {}
+    for n_tickers, anos in _ler_tamanhos(args.tamanhos):
+        print(f"Medindo {n_tickers} tickers × {anos} anos...", file=sys.stderr)
+        for caso, medicao in executar_tamanho(n_tickers, anos, args.repeticoes, casos, empresas_redis).items():
+            resultados[f"{caso}/{n_tickers}x{anos}a"] = medicao
+
+    _imprimir(resultados, baseline)
+
+    relatorio = {
+        'ambiente': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'maquina': platform.platform(),
+        },
+        'resultados': resultados,
+    }
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, indent=2)
+    if args.salvar_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, indent=2)
+        print(f"Baseline gravado em {args.baseline}", file=sys.stderr)
+        return 0
+
+    regressoes = comparar(resultados, baseline, args.tolerancia)
+    for regressao in regressoes:
+        print(f"REGRESSÃO {regressao}", file=sys.stderr)
+    return 1 if regressoes else 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    finally:
+        shutil.rmtree(_CACHE_PRECOS, ignore_errors=True)
@@ -0,0 +1,105 @@
+import os
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+from Findash.metrics.trading_calendar import b3_calendar, para_datetime
+
+# Códigos reais (com setor cadastrado) são usados primeiro; acima disso, códigos fictícios
+LISTA_B3 = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'docs', 'acoes-listadas-b3.csv')
+# Data final (exclusiva) dos painéis sintéticos, fixa para que os resultados sejam reprodutíveis
+DATA_FINAL = '2024-12-31'
+
+
+def gerar_tickers(n: int) -> List[str]:
+    """
+    Retorna `n` tickers para os portfólios sintéticos.
+
+    Args:
+        n (int): Quantidade de tickers.
+
+    Returns:
+        list: Tickers sem o sufixo '.SA' (e.g., ['B3SA3', 'ABEV3', ...]).
+    """
+    try:
+        reais = pd.read_csv(LISTA_B3)['Ticker'].dropna().astype(str).str.strip().tolist()
+    except (OSError, KeyError):
+        reais = []
+    # A lista da B3 repete alguns códigos
+    return list(dict.fromkeys(reais + [f"SINT{i:03d}" for i in range(n)]))[:n]
+
+
+def periodo(anos: int, fim: str = DATA_FINAL) -> tuple:
+    """Retorna (start_date, end_date) cobrindo `anos` anos até `fim`."""
+    inicio = pd.Timestamp(fim) - pd.DateOffset(years=anos)
+    return inicio.strftime('%Y-%m-%d'), fim
+
+
+def gerar_historico(tickers: List[str], anos: int, seed: int = 0, fim: str = DATA_FINAL) -> Dict[str, pd.DataFrame]:
+    """
+    Gera preços, dividendos e volume sintéticos para os tickers e para o IBOV.
+
+    Os preços seguem um passeio aleatório geométrico com um fator de mercado comum (para que
+    correlações, alpha e beta não sejam triviais). Para exercitar o alinhamento do painel,
+    cerca de 10% dos tickers começam a ser negociados no meio do período e alguns pregões
+    ficam sem cotação.
+
+    Args:
+        tickers (list): Tickers sem o sufixo '.SA'.
+        anos (int): Anos de histórico até `fim`.
+        seed (int): Semente do gerador aleatório.
+        fim (str): Data final exclusiva (formato 'YYYY-MM-DD').
+
+    Returns:
+        dict: {ticker normalizado: DataFrame} com colunas 'adj_close', 'dividends', 'volume',
+              incluindo '^BVSP', no formato retornado por `_baixar_yf_download`.
+    """
+    rng = np.random.default_rng(seed)
+    inicio, _ = periodo(anos, fim)
+    indice = para_datetime(b3_calendar.pregoes_entre(inicio, pd.Timestamp(fim) - pd.Timedelta(days=1)))
+    n_dias = len(indice)
+
+    mercado = rng.normal(0.0003, 0.012, n_dias)
+    historico = {
+        '^BVSP': pd.DataFrame({
+            'adj_close': 100000 * np.exp(np.cumsum(mercado)),
+            'dividends': 0.0,
+            'volume': rng.integers(1_000_000, 10_000_000, n_dias).astype(float),
+        }, index=indice)
+    }
+
+    for ticker in tickers:
+        beta = rng.uniform(0.5, 1.5)
+        retornos = beta * mercado + rng.normal(0.0, rng.uniform(0.008, 0.025), n_dias)
+        df = pd.DataFrame({
+            'adj_close': rng.uniform(5, 100) * np.exp(np.cumsum(retornos)),
+            'dividends': np.where(rng.random(n_dias) < 4 / 252, rng.uniform(0.1, 1.5, n_dias), 0.0),
+            'volume': rng.integers(10_000, 5_000_000, n_dias).astype(float),
+        }, index=indice)
+        if rng.random() < 0.1:
+            df = df.iloc[rng.integers(n_dias // 4, n_dias // 2):]
+        df = df[rng.random(len(df)) > 0.002]
+        historico[f"{ticker}.SA"] = df
+    return historico
+
+
+class ProvedorSintetico:
+    """
+    Provedor de dados de mercado offline para `configurar_provedor`.
+
+    Responde cada consulta com o recorte [start_date, end_date) de um histórico sintético
+    gerado previamente, sem acesso à rede. Tickers desconhecidos ficam de fora do retorno,
+    como no yfinance.
+    """
+
+    def __init__(self, historico: Dict[str, pd.DataFrame]):
+        self.historico = historico
+        self.chamadas = 0
+
+    def __call__(self, tickers: List[str], start_date: str, end_date: str) -> Dict[str, pd.DataFrame]:
+        self.chamadas += 1
+        inicio, fim = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        return {
+            ticker: df[(df.index >= inicio) & (df.index < fim)]
+            for ticker, df in ((t, self.historico.get(t)) for t in tickers)
+            if df is not None
+        }
@@ -1,3 +1,6 @@
 from .graphs import register_graph_callbacks
 from .kpis_cards import register_kpis_card
-from .tables import register_table_callbacks 
\ No newline at end of file
+from .tables import register_table_callbacks 
+from .risk import register_risk_callbacks
+from .advanced import register_advanced_callbacks
+from .screener import register_screener_callbacks
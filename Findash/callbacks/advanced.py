@@ -0,0 +1,201 @@
+from dash import Dash, Output, Input
+import plotly.graph_objects as go
+import numpy as np
+import orjson
+from utils.serialization import orjson_loads
+from Findash.utils.plot_style import get_figure_theme, get_color_sequence
+from Findash.utils.logging_tools import logger, log_callback
+from Findash.utils.payload import posicoes_store, quadro_store
+from Findash.utils.formatting import format_br
+from Findash.metrics.projecao import projetar_carteira
+from Findash.metrics.otimizacao import otimizar_carteira
+
+TITULOS_PROJECAO = {
+    'gbm': 'Browniano Geométrico',
+    'bootstrap': 'Bootstrap Histórico',
+}
+TITULOS_CARTEIRAS = {
+    'atual': 'Atual',
+    'min_variancia': 'Mínima Variância',
+    'max_sharpe': 'Máximo Sharpe',
+    'hrp': 'HRP',
+}
+# Semente fixa: o leque não muda entre atualizações do mesmo portfólio
+SEMENTE_PROJECAO = 42
+
+
+def _formatar_reais(valor: float) -> str:
+    return "R$ " + format_br(valor)
+
+
+def register_advanced_callbacks(dash_app: Dash):
+    """
+    Registra callbacks da aba Avançado no Dash app.
+
+    Args:
+        dash_app (Dash): Instância do aplicativo Dash.
+    """
+    @dash_app.callback(
+        Output('projection-chart', 'figure'),
+        Output('projection-summary', 'children'),
+        Input('data-store', 'data'),
+        Input('projection-method', 'value'),
+        Input('projection-horizon', 'value'),
+        Input('projection-target', 'value'),
+        Input('theme-store', 'data'),
+        prevent_initial_call=False
+    )
+    @log_callback("update_projection")
+    def update_projection(store_data, metodo, horizonte, alvo, theme):
+        if not store_data:
+            return go.Figure(), ""
+        try:
+            store_data = orjson_loads(store_data) if isinstance(store_data, (str, bytes)) else store_data
+        except orjson.JSONDecodeError:
+            logger.error("Erro ao deserializar store_data")
+            return go.Figure(), ""
+
+        metodo = metodo or 'gbm'
+        horizonte = int(horizonte or 252)
+        alvo = float(alvo) if alvo not in (None, '') else None
+        posicoes = posicoes_store(store_data)
+        retornos = quadro_store(store_data, 'individual_daily_returns', list(posicoes.index))
+        if posicoes.empty or retornos.empty:
+            return go.Figure(), ""
+        retornos = retornos.sort_index().reindex(columns=posicoes.index) / 100
+
+        projecao = projetar_carteira(
+            retornos, posicoes.to_numpy(), horizonte, metodo, alvo=alvo, seed=SEMENTE_PROJECAO
+        )
+        if not projecao:
+            return go.Figure(), ""
+
+        color_sequence = get_color_sequence(theme)
+        cor = color_sequence[0]
+        datas, faixas = projecao['datas'], projecao['faixas']
+        traces = []
+        # Faixas 5-95 e 25-75: a borda superior primeiro, a inferior preenchendo até ela
+        for inferior, superior, opacidade in ((5, 95, 0.15), (25, 75, 0.3)):
+            traces.append(go.Scatter(
+                x=datas, y=faixas[superior], mode='lines', line=dict(width=0),
+                showlegend=False, hoverinfo='skip'
+            ))
+            traces.append(go.Scatter(
+                x=datas, y=faixas[inferior], mode='lines', line=dict(width=0),
+                fill='tonexty', fillcolor=cor, opacity=opacidade,
+                name=f"P{inferior}-P{superior}", hoverinfo='skip'
+            ))
+        traces.append(go.Scatter(
+            x=datas, y=faixas[50], mode='lines', name='Mediana',
+            line=dict(color=cor, width=2),
+            hovertemplate='R$ %{y:,.2f}<br>%{x|%d-%m-%Y}'
+        ))
+
+        fig = go.Figure(data=traces)
+        fig.update_layout(**get_figure_theme(
+            theme, title=f"Projeção - {TITULOS_PROJECAO.get(metodo, metodo)} ({horizonte} pregões)",
+            yaxis_title="Valor (R$)"
+        ))
+        if alvo is not None:
+            fig.add_hline(
+                y=alvo, line=dict(color=color_sequence[1 % len(color_sequence)], dash='dash', width=1.5),
+                annotation_text="Alvo", annotation_font_size=9
+            )
+
+        final = projecao['valor_final']
+        resumo = (
+            f"Valor atual {_formatar_reais(projecao['valor_inicial'])}; em {datas[-1]:%d-%m-%Y}: "
+            f"mediana {_formatar_reais(final[50])} (P5 {_formatar_reais(final[5])}, P95 {_formatar_reais(final[95])})."
+        )
+        if alvo is not None:
+            resumo += (
+                f" Probabilidade de atingir {_formatar_reais(alvo)}: {format_br(projecao['prob_alvo_trajetoria'], '{:.1%}')} "
+                f"em algum momento, {format_br(projecao['prob_alvo_final'], '{:.1%}')} ao final."
+            )
+        return fig, resumo
+
+    @dash_app.callback(
+        Output('efficient-frontier-chart', 'figure'),
+        Output('optimization-table', 'data'),
+        Input('data-store', 'data'),
+        Input('optimization-target', 'value'),
+        Input('hrp-sector-switch', 'checked'),
+        Input('theme-store', 'data'),
+        prevent_initial_call=False
+    )
+    @log_callback("update_optimization")
+    def update_optimization(store_data, alvo, hrp_setorial, theme):
+        vazio = {'head': [], 'body': []}
+        if not store_data:
+            return go.Figure(), vazio
+        try:
+            store_data = orjson_loads(store_data) if isinstance(store_data, (str, bytes)) else store_data
+        except orjson.JSONDecodeError:
+            logger.error("Erro ao deserializar store_data")
+            return go.Figure(), vazio
+
+        alvo = alvo or 'max_sharpe'
+        tickers = store_data.get('tickers', [])
+        quantidades = np.asarray(store_data.get('quantities', []), dtype=np.float64)
+        posicoes = posicoes_store(store_data)
+        retornos = quadro_store(store_data, 'individual_daily_returns', tickers)
+        if len(quantidades) != len(tickers) or retornos.empty or posicoes.empty:
+            return go.Figure(), vazio
+        posicoes = posicoes.reindex(tickers).fillna(0.0).to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            precos = np.where(quantidades > 0, posicoes / quantidades, 0.0)
+        retornos = retornos.sort_index().reindex(columns=tickers) / 100
+
+        resultado = otimizar_carteira(
+            retornos, quantidades, precos, store_data.get('start_date'), store_data.get('end_date'),
+            hrp_setorial=bool(hrp_setorial)
+        )
+        if not resultado:
+            return go.Figure(), vazio
+
+        color_sequence = get_color_sequence(theme)
+        fronteira, ativos, carteiras = resultado['fronteira'], resultado['ativos'], resultado['carteiras']
+        traces = [
+            go.Scatter(
+                x=fronteira['volatilidade'] * 100, y=fronteira['retorno'] * 100,
+                mode='lines', name='Fronteira', line=dict(color=color_sequence[0], width=2),
+                customdata=fronteira['sharpe'],
+                hovertemplate='Vol %{x:.2f}%<br>Retorno %{y:.2f}%<br>Sharpe %{customdata:.2f}<extra></extra>'
+            ),
+            go.Scatter(
+                x=ativos['volatilidade'] * 100, y=ativos['retorno'] * 100, text=list(ativos.index),
+                mode='markers', name='Ativos', marker=dict(color='#adb5bd', size=6),
+                hovertemplate='%{text}<br>Vol %{x:.2f}%<br>Retorno %{y:.2f}%<extra></extra>'
+            ),
+        ]
+        for i, (nome, carteira) in enumerate(carteiras.items(), start=1):
+            traces.append(go.Scatter(
+                x=[carteira['volatilidade'] * 100], y=[carteira['retorno'] * 100],
+                mode='markers', name=TITULOS_CARTEIRAS[nome],
+                marker=dict(color=color_sequence[i % len(color_sequence)], size=12 if nome == alvo else 9,
+                            symbol='star' if nome == alvo else 'circle'),
+                hovertemplate=f"{TITULOS_CARTEIRAS[nome]}<br>Sharpe {carteira['sharpe']:.2f}<br>"
+                              'Vol %{x:.2f}%<br>Retorno %{y:.2f}%<extra></extra>'
+            ))
+
+        fig = go.Figure(data=traces)
+        fig.update_layout(**get_figure_theme(theme, title="Fronteira Eficiente", yaxis_title="Retorno Anual (%)"))
+        fig.update_layout(xaxis_title="Volatilidade Anual (%)")
+
+        atual, sugerida = carteiras['atual'], carteiras[alvo]
+        ordem = np.argsort(-sugerida['pesos'])
+        tabela = {
+            'head': ['Ticker', 'Peso Atual', 'Peso Sugerido', 'Qtd. Atual', 'Qtd. Sugerida', 'Diferença'],
+            'body': [
+                [
+                    tickers[j],
+                    format_br(atual['pesos'][j], '{:.1%}'),
+                    format_br(sugerida['pesos'][j], '{:.1%}'),
+                    int(atual['quantidades'][j]),
+                    int(sugerida['quantidades'][j]),
+                    f"{int(sugerida['quantidades'][j] - atual['quantidades'][j]):+d}",
+                ]
+                for j in ordem
+            ],
+        }
+        return fig, tabela
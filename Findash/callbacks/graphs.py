@@ -5,6 +5,7 @@ from Findash.utils.plot_style import get_figure_theme, get_color_sequence
 from Findash.utils.logging_tools import log_callback
 import pandas as pd
 from Findash.utils.logging_tools import logger
+from Findash.utils.payload import quadro_store, serie_store
 import orjson
 
 def register_graph_callbacks(dash_app: Dash):
@@ -36,18 +37,20 @@ def register_graph_callbacks(dash_app: Dash):
 
         # === Gráfico: Portfólio vs IBOV ===
         traces_ibov = []
-        if 'portfolio_return' in store_data and 'ibov_return' in store_data:
+        portfolio_return = serie_store(store_data, 'portfolio_return')
+        ibov_return = serie_store(store_data, 'ibov_return')
+        if not portfolio_return.empty and not ibov_return.empty:
             traces_ibov.append(go.Scatter(
-                x=[pt['x'] for pt in store_data['portfolio_return']],
-                y=[pt['y'] for pt in store_data['portfolio_return']],
+                x=portfolio_return.index,
+                y=portfolio_return.values,
                 mode='lines',
                 name='Portfólio',
                 line=dict(color=color_sequence[0], width=1.2, shape='spline', smoothing=1.0),
                 hovertemplate='%{y:.2%}<br>%{x|%d-%m-%Y}'
             ))
             traces_ibov.append(go.Scatter(
-                x=[pt['x'] for pt in store_data['ibov_return']],
-                y=[pt['y'] for pt in store_data['ibov_return']],
+                x=ibov_return.index,
+                y=ibov_return.values,
                 mode='lines',
                 name='IBOV',
                 line=dict(color=color_sequence[1], width=1.2, shape='spline', smoothing=1.3),
@@ -79,12 +82,14 @@ def register_graph_callbacks(dash_app: Dash):
         color_sequence = get_color_sequence(theme)
     
         traces_individual = []
-        if 'individual_returns' in store_data and 'tickers' in store_data:
+        if 'tickers' in store_data:
+            individual_returns = quadro_store(store_data, 'individual_returns')
             for i, ticker in enumerate(store_data['tickers']):
-                if ticker in store_data['individual_returns']:
+                if ticker in individual_returns.columns:
+                    serie = individual_returns[ticker].dropna()
                     traces_individual.append(go.Scatter(
-                        x=[pt['x'] for pt in store_data['individual_returns'][ticker]],
-                        y=[pt['y'] for pt in store_data['individual_returns'][ticker]],
+                        x=serie.index,
+                        y=serie.values,
                         mode='lines',
                         name=ticker.replace(".SA", ""),
                         line=dict(
@@ -112,10 +117,10 @@ def register_graph_callbacks(dash_app: Dash):
         if store_data:
             store_data = orjson_loads(store_data) if isinstance(store_data, (str, bytes)) else store_data
 
-        if not store_data or 'portfolio_values' not in store_data:
+        portfolio_values = quadro_store(store_data, 'portfolio_values') if store_data else pd.DataFrame()
+        if portfolio_values.empty:
             return go.Figure(), False
 
-        portfolio_values = pd.DataFrame(store_data['portfolio_values'])
         tickers = store_data['tickers']
         color_sequence = get_color_sequence(theme)
 
@@ -181,18 +186,19 @@ def register_graph_callbacks(dash_app: Dash):
         if store_data:
             store_data = orjson_loads(store_data) if isinstance(store_data, (str, bytes)) else store_data
             
-        if not store_data or 'tickers' not in store_data or 'quantities' not in store_data or 'portfolio_values' not in store_data:
+        if not store_data or 'tickers' not in store_data or 'quantities' not in store_data:
             return go.Figure()
       
         tickers = store_data['tickers']
         quantities = store_data['quantities']
-        portfolio_values = store_data['portfolio_values']
+        portfolio_values = quadro_store(store_data, 'portfolio_values')
         color_sequence = get_color_sequence(theme)
 
         valores_financeiros = []
         for ticker, quantidade in zip(tickers, quantities):
-            if ticker in portfolio_values and portfolio_values[ticker]:
-                ultimo_valor = list(portfolio_values[ticker].values())[-1]
+            serie = portfolio_values[ticker].dropna() if ticker in portfolio_values.columns else None
+            if serie is not None and not serie.empty:
+                ultimo_valor = serie.iloc[-1]
                 valores_financeiros.append(quantidade * ultimo_valor)
             else:
                 valores_financeiros.append(0.0)
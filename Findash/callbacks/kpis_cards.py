@@ -1,4 +1,4 @@
-from dash import Dash, Output, Input
+from dash import Dash, Output, Input, State, ClientsideFunction
 from utils.serialization import orjson_loads
 from Findash.utils.formatting import format_kpi
 from Findash.utils.logging_tools import log_callback
@@ -45,4 +45,25 @@ def register_kpis_card(dash_app: Dash):
             format_kpi("max_drawdown", kpis.get("max_drawdown")),
             format_kpi("alpha", kpis.get("alpha")),
             format_kpi("beta", kpis.get("beta"))
-        )
\ No newline at end of file
+        )
+
+    # Troca de período do grid temporal feita no navegador: as tabelas dos quatro períodos
+    # já estão em data-store (kpis_periodos), então não há ida ao servidor
+    dash_app.clientside_callback(
+        ClientsideFunction(namespace='findash', function_name='atualizarKpiTemporal'),
+        [Output('kpi-temporal-grid', 'columnDefs'),
+         Output('kpi-temporal-grid', 'rowData'),
+         Output('btn-mensal', 'variant'),
+         Output('btn-trimestral', 'variant'),
+         Output('btn-semestral', 'variant'),
+         Output('btn-anual', 'variant')],
+        [Input('btn-mensal', 'n_clicks'),
+         Input('btn-trimestral', 'n_clicks'),
+         Input('btn-semestral', 'n_clicks'),
+         Input('btn-anual', 'n_clicks'),
+         Input('data-store', 'data')],
+        [State('btn-mensal', 'variant'),
+         State('btn-trimestral', 'variant'),
+         State('btn-semestral', 'variant'),
+         State('btn-anual', 'variant')]
+    )
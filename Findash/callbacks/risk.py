@@ -0,0 +1,312 @@
+from dash import Dash, Output, Input
+import plotly.graph_objects as go
+import pandas as pd
+import orjson
+from utils.serialization import orjson_loads
+from Findash.utils.plot_style import get_figure_theme, get_color_sequence
+from Findash.utils.logging_tools import logger, log_callback
+from Findash.utils.payload import posicoes_store, quadro_store, serie_store
+from Findash.utils.formatting import format_br
+from Findash.metrics.rolling import calcular_metricas_rolantes
+from Findash.metrics.returns import calcular_retorno_diario_ibov
+from Findash.metrics.indices import BENCHMARKS, BENCHMARK_PADRAO, KPIS_RELATIVOS
+from Findash.metrics.var import NIVEIS_CONFIANCA, calcular_var, retornos_carteira, retornos_horizonte
+
+TITULOS_ROLANTES = {
+    'sharpe': 'Sharpe Móvel',
+    'sortino': 'Sortino Móvel',
+    'volatilidade': 'Volatilidade Anualizada Móvel',
+    'retorno_medio_anual': 'Retorno Médio Anual Móvel',
+    'alpha': 'Alpha Móvel vs {benchmark}',
+    'beta': 'Beta Móvel vs {benchmark}',
+}
+
+TITULOS_VAR = {
+    'historico': 'Histórico',
+    'parametrico': 'Paramétrico',
+    'monte_carlo': 'Monte Carlo',
+}
+# Semente fixa: a tabela não muda entre atualizações do mesmo portfólio
+SEMENTE_VAR = 42
+
+TITULOS_RELATIVOS = {
+    'alpha': 'Alpha',
+    'beta': 'Beta',
+    'tracking_error': 'Tracking Error',
+    'information_ratio': 'Information Ratio',
+}
+
+
+def _retornos_do_store(store_data: dict) -> pd.DataFrame:
+    """Retornos diários (decimal) do portfólio e de cada ticker, a partir do data-store (em %)."""
+    individuais = quadro_store(store_data, 'individual_daily_returns', store_data.get('tickers', []))
+    retornos = pd.concat([serie_store(store_data, 'portfolio_daily_return').rename('Portfólio'), individuais], axis=1)
+    return retornos.sort_index() / 100
+
+
+def _benchmark_do_store(store_data: dict, codigo: str = BENCHMARK_PADRAO) -> pd.Series:
+    """
+    Retornos diários de um benchmark a partir do retorno acumulado em 'benchmark_returns'
+    (ou em 'ibov_return', para o IBOV em stores anteriores aos benchmarks múltiplos).
+    """
+    acumulados = quadro_store(store_data, 'benchmark_returns', [codigo])
+    if codigo in acumulados.columns:
+        acumulado = acumulados[codigo].dropna()
+    elif codigo == 'IBOV':
+        acumulado = serie_store(store_data, 'ibov_return')
+    else:
+        return pd.Series(dtype=float)
+    return calcular_retorno_diario_ibov(1 + acumulado / 100)
+
+
+def _pesos_do_store(store_data: dict) -> pd.Series:
+    """Peso atual de cada ticker: valor da posição sobre o total da carteira."""
+    atuais = posicoes_store(store_data)
+    total = atuais.sum()
+    return atuais / total if total > 0 else pd.Series(dtype=float)
+
+
+def _formatar_relativo(kpi: str, valor) -> str:
+    return format_br(valor, '{:.2%}' if kpi in ('alpha', 'tracking_error') else '{:.2f}', 'N/A')
+
+
+def _formatar_perda(valor) -> str:
+    return format_br(valor, '{:.2%}', 'N/A')
+
+
+def register_risk_callbacks(dash_app: Dash):
+    """
+    Registra callbacks da aba Risco no Dash app.
+
+    Args:
+        dash_app (Dash): Instância do aplicativo Dash.
+    """
+    @dash_app.callback(
+        Output('rolling-risk-chart', 'figure'),
+        Input('data-store', 'data'),
+        Input('rolling-metric-select', 'value'),
+        Input('rolling-window', 'value'),
+        Input('benchmark-select', 'value'),
+        Input('theme-store', 'data'),
+        prevent_initial_call=False
+    )
+    @log_callback("update_rolling_risk_chart")
+    def update_rolling_risk_chart(store_data, metrica, janela, benchmarks, theme):
+        if not store_data:
+            return go.Figure()
+        try:
+            store_data = orjson_loads(store_data) if isinstance(store_data, (str, bytes)) else store_data
+        except orjson.JSONDecodeError:
+            logger.error("Erro ao deserializar store_data")
+            return go.Figure()
+
+        metrica = metrica or 'sharpe'
+        janela = int(janela or 63)
+        retornos = _retornos_do_store(store_data)
+        if retornos.empty:
+            return go.Figure()
+
+        codigo = (benchmarks or [BENCHMARK_PADRAO])[0]
+        benchmark = _benchmark_do_store(store_data, codigo) if metrica in ('alpha', 'beta') else None
+        serie = calcular_metricas_rolantes(retornos, janela, benchmark)[metrica].dropna(how='all')
+
+        color_sequence = get_color_sequence(theme)
+        traces = []
+        for i, coluna in enumerate(serie.columns):
+            portfolio = coluna == 'Portfólio'
+            traces.append(go.Scatter(
+                x=serie.index,
+                y=serie[coluna],
+                mode='lines',
+                name=coluna,
+                line=dict(color=color_sequence[i % len(color_sequence)], width=2 if portfolio else 1),
+                opacity=1.0 if portfolio else 0.7,
+                hovertemplate='%{y:.2f}<br>%{x|%d-%m-%Y}'
+            ))
+
+        fig = go.Figure(data=traces)
+        titulo = TITULOS_ROLANTES.get(metrica, metrica).format(benchmark=codigo)
+        fig.update_layout(**get_figure_theme(theme, title=f"{titulo} ({janela} pregões)"))
+        if serie.empty:
+            fig.add_annotation(
+                text=f"Período menor que a janela de {janela} pregões",
+                xref="paper", yref="paper", showarrow=False, font=dict(size=12)
+            )
+        return fig
+
+    @dash_app.callback(
+        Output('drawdown-chart', 'figure'),
+        Input('data-store', 'data'),
+        Input('theme-store', 'data'),
+        prevent_initial_call=False
+    )
+    @log_callback("update_drawdown_chart")
+    def update_drawdown_chart(store_data, theme):
+        if not store_data:
+            return go.Figure()
+        try:
+            store_data = orjson_loads(store_data) if isinstance(store_data, (str, bytes)) else store_data
+        except orjson.JSONDecodeError:
+            logger.error("Erro ao deserializar store_data")
+            return go.Figure()
+
+        drawdowns = store_data.get('drawdowns') or {}
+        underwater = quadro_store(store_data, 'drawdowns.underwater')
+        if underwater.empty:
+            return go.Figure()
+
+        color_sequence = get_color_sequence(theme)
+        traces = []
+        for i, serie in enumerate(underwater.columns):
+            portfolio = serie == 'Portfólio'
+            curva = underwater[serie].dropna()
+            traces.append(go.Scatter(
+                x=curva.index,
+                y=curva.values,
+                mode='lines',
+                name=serie,
+                fill='tozeroy' if portfolio else None,
+                line=dict(color=color_sequence[i % len(color_sequence)], width=1.5 if portfolio else 0.8),
+                opacity=1.0 if portfolio else 0.6,
+                visible=True if portfolio else 'legendonly',
+                hovertemplate='%{y:.2%}<br>%{x|%d-%m-%Y}'
+            ))
+
+        fig = go.Figure(data=traces)
+        fig.update_layout(**get_figure_theme(theme, title="Drawdown", yaxis_title="Drawdown (%)"))
+        fig.update_yaxes(tickformat='.0%')
+
+        # Destaca o vale do pior episódio do portfólio
+        episodios = (drawdowns.get('episodios') or {}).get('Portfólio') or []
+        if episodios:
+            pior = episodios[0]
+            recuperacao = pior['recuperacao'] or 'não recuperado'
+            fig.add_annotation(
+                x=pior['vale'], y=pior['profundidade'],
+                text=f"{format_br(pior['profundidade'], '{:.1%}')} ({pior['duracao']} pregões, {recuperacao})",
+                showarrow=True, arrowhead=2, font=dict(size=9)
+            )
+        return fig
+
+    @dash_app.callback(
+        Output('benchmark-comparison-chart', 'figure'),
+        Output('benchmark-kpis-table', 'data'),
+        Input('data-store', 'data'),
+        Input('benchmark-select', 'value'),
+        Input('theme-store', 'data'),
+        prevent_initial_call=False
+    )
+    @log_callback("update_benchmark_comparison")
+    def update_benchmark_comparison(store_data, benchmarks, theme):
+        vazio = {'head': [], 'body': []}
+        if not store_data:
+            return go.Figure(), vazio
+        try:
+            store_data = orjson_loads(store_data) if isinstance(store_data, (str, bytes)) else store_data
+        except orjson.JSONDecodeError:
+            logger.error("Erro ao deserializar store_data")
+            return go.Figure(), vazio
+
+        selecionados = [b for b in (benchmarks or []) if b in BENCHMARKS]
+        acumulados = quadro_store(store_data, 'benchmark_returns', selecionados)
+        portfolio_return = serie_store(store_data, 'portfolio_return')
+
+        color_sequence = get_color_sequence(theme)
+        traces = []
+        if not portfolio_return.empty:
+            traces.append(go.Scatter(
+                x=portfolio_return.index,
+                y=portfolio_return.values,
+                mode='lines',
+                name='Portfólio',
+                line=dict(color=color_sequence[0], width=2),
+                hovertemplate='%{y:.2f}%<br>%{x|%d-%m-%Y}'
+            ))
+        for i, codigo in enumerate(acumulados.columns, start=1):
+            serie = acumulados[codigo].dropna()
+            traces.append(go.Scatter(
+                x=serie.index,
+                y=serie.values,
+                mode='lines',
+                name=codigo,
+                line=dict(color=color_sequence[i % len(color_sequence)], width=1.2),
+                hovertemplate='%{y:.2f}%<br>%{x|%d-%m-%Y}'
+            ))
+
+        fig = go.Figure(data=traces)
+        fig.update_layout(**get_figure_theme(theme, title="Portfólio vs Benchmarks", yaxis_title="Retorno (%)"))
+
+        kpis = store_data.get('kpis_benchmarks') or {}
+        tabela = {
+            'head': ['Benchmark'] + [TITULOS_RELATIVOS[k] for k in KPIS_RELATIVOS],
+            'body': [
+                [codigo] + [_formatar_relativo(k, kpis[codigo].get(k)) for k in KPIS_RELATIVOS]
+                for codigo in selecionados if codigo in kpis
+            ],
+        }
+        return fig, tabela
+
+    @dash_app.callback(
+        Output('var-distribution-chart', 'figure'),
+        Output('var-table', 'data'),
+        Input('data-store', 'data'),
+        Input('var-horizon', 'value'),
+        Input('theme-store', 'data'),
+        prevent_initial_call=False
+    )
+    @log_callback("update_var")
+    def update_var(store_data, horizonte, theme):
+        vazio = {'head': [], 'body': []}
+        if not store_data:
+            return go.Figure(), vazio
+        try:
+            store_data = orjson_loads(store_data) if isinstance(store_data, (str, bytes)) else store_data
+        except orjson.JSONDecodeError:
+            logger.error("Erro ao deserializar store_data")
+            return go.Figure(), vazio
+
+        horizonte = int(horizonte or 1)
+        pesos = _pesos_do_store(store_data)
+        retornos = quadro_store(store_data, 'individual_daily_returns', list(pesos.index))
+        if pesos.empty or retornos.empty:
+            return go.Figure(), vazio
+        retornos = retornos.sort_index().reindex(columns=pesos.index) / 100
+
+        resultado = calcular_var(retornos, pesos.to_numpy(), horizontes=(horizonte,), seed=SEMENTE_VAR)
+        if resultado.empty:
+            return go.Figure(), vazio
+
+        color_sequence = get_color_sequence(theme)
+        amostras = retornos_horizonte(retornos_carteira(retornos, pesos.to_numpy()), horizonte)
+        fig = go.Figure(data=[go.Histogram(
+            x=amostras * 100,
+            nbinsx=60,
+            name='Retornos históricos',
+            marker=dict(color=color_sequence[0]),
+            opacity=0.7,
+            hovertemplate='%{x:.2f}%<br>%{y} janelas<extra></extra>'
+        )])
+        historico = resultado[resultado['metodo'] == 'historico']
+        for i, linha in enumerate(historico.itertuples()):
+            fig.add_vline(
+                x=-linha.var * 100,
+                line=dict(color=color_sequence[(i + 1) % len(color_sequence)], dash='dash', width=1.5),
+                annotation_text=f"VaR {linha.nivel:.0%}", annotation_font_size=9
+            )
+        fig.update_layout(**get_figure_theme(
+            theme, title=f"Distribuição dos Retornos ({horizonte} pregões)", yaxis_title="Frequência"
+        ))
+        fig.update_layout(showlegend=False, xaxis_title="Retorno (%)")
+
+        tabela = {
+            'head': ['Método'] + [f"VaR {n:.0%}" for n in NIVEIS_CONFIANCA] + [f"CVaR {n:.0%}" for n in NIVEIS_CONFIANCA],
+            'body': [],
+        }
+        for metodo, grupo in resultado.groupby('metodo', sort=False):
+            por_nivel = grupo.set_index('nivel')
+            tabela['body'].append(
+                [TITULOS_VAR.get(metodo, metodo)]
+                + [_formatar_perda(por_nivel.at[n, 'var']) for n in NIVEIS_CONFIANCA]
+                + [_formatar_perda(por_nivel.at[n, 'cvar']) for n in NIVEIS_CONFIANCA]
+            )
+        return fig, tabela
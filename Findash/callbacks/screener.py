@@ -0,0 +1,126 @@
+from dash import Dash, Output, Input, State, ctx, no_update
+from Findash.utils.logging_tools import log_callback
+from Findash.utils.formatting import format_br
+from Findash.metrics.universo import EstatisticasUniverso
+
+# Sliders do screener: coluna -> (rótulo, mínimo, máximo, passo, escala da tabela).
+# Um extremo no limite do slider significa "sem limite" desse lado.
+FAIXAS_SCREENER = {
+    'retorno_12m': ('Retorno 12m (%)', -100, 200, 5, 100),
+    'volatilidade': ('Volatilidade (%)', 0, 150, 5, 100),
+    'beta': ('Beta', -1, 3, 0.1, 1),
+    'dividend_yield': ('Dividend Yield (%)', 0, 20, 0.5, 100),
+}
+# Colunas exibidas (id = coluna da tabela de estatísticas) e formatação
+COLUNAS_SCREENER = {
+    'ticker': ('Ticker', '{}'),
+    'setor': ('Setor', '{}'),
+    'segmento': ('Segmento', '{}'),
+    'preco': ('Preço', 'R$ {:.2f}'),
+    'retorno_12m': ('12m', '{:.1%}'),
+    'volatilidade': ('Vol.', '{:.1%}'),
+    'beta': ('Beta', '{:.2f}'),
+    'dividend_yield': ('DY', '{:.1%}'),
+    'liquidez': ('Liquidez (R$ mi)', '{:,.1f}'),
+}
+
+
+def _formatar(coluna: str, valor) -> str:
+    if isinstance(valor, str):
+        return valor
+    if coluna == 'liquidez' and valor is not None:
+        valor = valor / 1e6
+    return format_br(valor, COLUNAS_SCREENER[coluna][1])
+
+
+def _faixa(coluna: str, valores) -> tuple:
+    """Converte o intervalo do slider para a escala da tabela; extremos do slider viram None."""
+    _, minimo, maximo, _, escala = FAIXAS_SCREENER[coluna]
+    if not valores:
+        return None, None
+    inferior, superior = valores
+    return (
+        inferior / escala if inferior > minimo else None,
+        superior / escala if superior < maximo else None,
+    )
+
+
+def register_screener_callbacks(dash_app: Dash):
+    """
+    Registra callbacks da aba Screener no Dash app.
+
+    Args:
+        dash_app (Dash): Instância do aplicativo Dash.
+    """
+    universo = EstatisticasUniverso()
+
+    @dash_app.callback(
+        Output('screener-setor', 'data'),
+        Output('screener-subsetor', 'data'),
+        Output('screener-segmento', 'data'),
+        Input('screener-setor', 'value'),
+        Input('screener-subsetor', 'value'),
+        prevent_initial_call=False
+    )
+    @log_callback("update_screener_options")
+    def update_screener_options(setor, subsetor):
+        # Opções em cascata: subsetores do setor escolhido, segmentos do subsetor escolhido
+        classificacoes = universo.classificacoes()
+        setores = sorted({c['setor'] for c in classificacoes})
+        subsetores = sorted({c['subsetor'] for c in classificacoes if not setor or c['setor'] == setor})
+        segmentos = sorted({
+            c['segmento'] for c in classificacoes
+            if (not setor or c['setor'] == setor) and (not subsetor or c['subsetor'] == subsetor)
+        })
+        return setores, subsetores, segmentos
+
+    @dash_app.callback(
+        Output('screener-table', 'data'),
+        Output('screener-table', 'page_count'),
+        Output('screener-table', 'page_current'),
+        Output('screener-total', 'children'),
+        Input('screener-setor', 'value'),
+        Input('screener-subsetor', 'value'),
+        Input('screener-segmento', 'value'),
+        *[Input(f'screener-{coluna}', 'value') for coluna in FAIXAS_SCREENER],
+        Input('screener-liquidez', 'value'),
+        Input('screener-table', 'page_current'),
+        Input('screener-table', 'page_size'),
+        Input('screener-table', 'sort_by'),
+        prevent_initial_call=False
+    )
+    @log_callback("update_screener")
+    def update_screener(setor, subsetor, segmento, *args):
+        *intervalos, liquidez_minima, pagina, por_pagina, sort_by = args
+        faixas = {coluna: _faixa(coluna, valores) for coluna, valores in zip(FAIXAS_SCREENER, intervalos)}
+        if liquidez_minima:
+            faixas['liquidez'] = (float(liquidez_minima) * 1e6, None)
+        ordenacao = (sort_by or [{'column_id': 'liquidez', 'direction': 'desc'}])[0]
+        # Filtro alterado: volta para a primeira página
+        if ctx.triggered_id != 'screener-table':
+            pagina = 0
+
+        resultado = universo.filtrar(
+            {'setor': setor, 'subsetor': subsetor, 'segmento': segmento}, faixas,
+            ordenar_por=ordenacao['column_id'], descendente=ordenacao['direction'] == 'desc',
+            pagina=(pagina or 0) + 1, por_pagina=por_pagina or 20,
+        )
+        linhas = [
+            {coluna: _formatar(coluna, linha[coluna]) for coluna in COLUNAS_SCREENER}
+            for linha in resultado['linhas']
+        ]
+        paginas = max(-(-resultado['total'] // resultado['por_pagina']), 1)
+        return linhas, paginas, pagina or 0, f"{resultado['total']} tickers encontrados. Clique no ticker para incluí-lo no portfólio."
+
+    @dash_app.callback(
+        Output('ticker-dropdown', 'value', allow_duplicate=True),
+        Input('screener-table', 'active_cell'),
+        State('screener-table', 'data'),
+        prevent_initial_call=True
+    )
+    @log_callback("screener_add_ticker")
+    def screener_add_ticker(active_cell, data):
+        # Selecionar o ticker no dropdown dispara `add_ticker` (com a validação do limite de tickers)
+        if not active_cell or active_cell['column_id'] != 'ticker' or active_cell['row'] >= len(data or []):
+            return no_update
+        return data[active_cell['row']]['ticker']
@@ -1,8 +1,13 @@
 from dash import Dash, Output, Input, no_update, State
-from utils.serialization import orjson_loads, orjson_dumps
+from Findash.utils.payload import carregar_store, decodificar_store, serializar_store
 from Findash.utils.logging_tools import log_callback, logger
+from Findash.metrics.incremental import adicionar_ticker, remover_ticker
+from Findash.metrics.universo import EstatisticasUniverso
+from Findash.utils.formatting import format_br
 
 def register_table_callbacks(dash_app: Dash):
+    universo = EstatisticasUniverso()
+
     @dash_app.callback(
         Output('data-store', 'data', allow_duplicate=True),
         Input('price-table', 'active_cell'),
@@ -12,10 +17,9 @@ def register_table_callbacks(dash_app: Dash):
     @log_callback("delete_ticker")
     def delete_ticker(active_cell, store_data):
         """
-        Remove um ticker do portfólio usando o PortfolioService.
+        Remove um ticker do portfólio recalculando apenas os agregados (sem acessar o provedor).
         """
-        if store_data:
-            store_data = orjson_loads(store_data) if isinstance(store_data, (str, bytes)) else store_data
+        store_data = decodificar_store(carregar_store(store_data))
 
         if not active_cell or not store_data or not store_data['tickers']:
             return no_update
@@ -29,12 +33,12 @@ def register_table_callbacks(dash_app: Dash):
         ticker_to_remove = store_data['tickers'][row]
     
         try:
-            updated_portfolio = dash_app.portfolio_service.remove_ticker(store_data, ticker_to_remove)
+            updated_portfolio = remover_ticker(store_data, ticker_to_remove, dash_app.empresas_redis)
             logger.info(f"Ticker {ticker_to_remove} removido")
 
             # Só retorna se de fato alterou
             if updated_portfolio != store_data:
-                return orjson_dumps(updated_portfolio).decode('utf-8')
+                return serializar_store(updated_portfolio)
             else:
                 return no_update
         except ValueError as e:
@@ -55,10 +59,9 @@ def register_table_callbacks(dash_app: Dash):
     @log_callback("add_ticker")
     def add_ticker(selected_ticker, store_data, client_config):
         """
-        Adiciona um ticker ao portfólio usando o PortfolioService, validando o limite de tickers.
+        Adiciona um ticker ao portfólio (baixando apenas esse ticker), validando o limite de tickers.
         """
-        if store_data:
-            store_data = orjson_loads(store_data) if isinstance(store_data, (str, bytes)) else store_data
+        store_data = decodificar_store(carregar_store(store_data))
 
         if not selected_ticker or not store_data:
             return no_update, None, no_update, no_update, no_update
@@ -72,9 +75,35 @@ def register_table_callbacks(dash_app: Dash):
             return no_update, None, error_message, True, True
         
         try:
-            updated_portfolio = dash_app.portfolio_service.add_ticker(store_data, selected_ticker, 1)
+            updated_portfolio = adicionar_ticker(store_data, selected_ticker, 1, dash_app.empresas_redis)
             logger.info(f"Ticker {selected_ticker} adicionado")
-            return orjson_dumps(updated_portfolio).decode('utf-8'), None, "", False, False
+            return serializar_store(updated_portfolio), None, "", False, False
         except ValueError as e:
             logger.error(f"Erro ao adicionar ticker: {e}")
-            return no_update, None, str(e), True, current_tickers + 1 >= tickers_limit
\ No newline at end of file
+            return no_update, None, str(e), True, current_tickers + 1 >= tickers_limit
+
+    @dash_app.callback(
+        Output('ticker-preview', 'children'),
+        Input('ticker-dropdown', 'value'),
+        prevent_initial_call=True
+    )
+    @log_callback("preview_ticker")
+    def preview_ticker(selected_ticker):
+        """
+        Resumo do ticker escolhido no dropdown, lido das estatísticas pré-calculadas (sem acessar preços).
+        """
+        # O dropdown volta a None depois da inclusão: mantém o último resumo
+        if not selected_ticker:
+            return no_update
+        nome = selected_ticker.replace('.SA', '').upper()
+        stats = universo.obter([nome]).get(nome)
+        if not stats:
+            return f"{nome}: sem estatísticas pré-calculadas."
+        return (
+            f"{nome} ({stats['setor']} / {stats['segmento']}): "
+            f"12m {format_br(stats['retorno_12m'], '{:+.1%}')} · "
+            f"Vol. {format_br(stats['volatilidade'], '{:.1%}')} · "
+            f"Beta {format_br(stats['beta'], '{:.2f}')} · "
+            f"DY {format_br(stats['dividend_yield'], '{:.1%}')} · "
+            f"Liquidez R$ {format_br(None if stats['liquidez'] is None else stats['liquidez'] / 1e6, '{:,.1f}')} mi/dia"
+        )
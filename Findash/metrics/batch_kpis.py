@@ -0,0 +1,123 @@
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from Findash.utils.logging_tools import logger
+from .kpis_calc import KPI_NOMES, kpis_agrupados
+from .panel import PricePanel
+from .utils import measure_time
+
+
+def matriz_quantidades(carteiras: Dict[Hashable, Dict[str, float]], tickers: List[str]) -> Tuple[List[Hashable], np.ndarray]:
+    """
+    Monta a matriz portfólios × tickers de quantidades a partir de {id: {ticker: quantidade}}.
+
+    Tickers ausentes do universo (`tickers`) são ignorados com aviso.
+
+    Returns:
+        tuple: (ids na ordem das linhas, matriz float64 len(ids) × len(tickers)).
+    """
+    posicao = {t: j for j, t in enumerate(tickers)}
+    ids = list(carteiras.keys())
+    quantidades = np.zeros((len(ids), len(tickers)))
+    fora = set()
+    for i, carteira_id in enumerate(ids):
+        for ticker, qtd in carteiras[carteira_id].items():
+            j = posicao.get(ticker)
+            if j is None:
+                fora.add(ticker)
+            else:
+                quantidades[i, j] = qtd
+    if fora:
+        logger.warning(f"[batch_kpis] Tickers fora do painel ignorados: {sorted(fora)}")
+    return ids, quantidades
+
+
+def _retornos_com_anterior(valores: np.ndarray, validos: np.ndarray) -> np.ndarray:
+    """
+    Retorno de cada dia válido em relação ao último dia válido anterior (NaN nos demais).
+
+    Args:
+        valores (np.ndarray): Matriz linhas × dias.
+        validos (np.ndarray): Máscara booleana do mesmo formato.
+    """
+    dias = valores.shape[-1]
+    indice = np.where(validos, np.arange(dias), -1)
+    anterior = np.maximum.accumulate(indice, axis=-1)
+    # Último dia válido estritamente anterior: desloca o acumulado uma posição
+    anterior = np.concatenate([np.full(anterior.shape[:-1] + (1,), -1), anterior[..., :-1]], axis=-1)
+    tem_anterior = validos & (anterior >= 0)
+    base = np.take_along_axis(valores, np.maximum(anterior, 0), axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(tem_anterior, valores / base - 1, np.nan)
+
+
+def calcular_valores_lote(quantidades: np.ndarray, painel: PricePanel) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Valores e retornos diários de vários portfólios sobre o mesmo painel, por produto de matrizes.
+
+    Mesma convenção de `calcular_retornos_portfolio`: o valor do dia soma os tickers com
+    preço (ausentes contam como zero), e dias em que nenhum ticker do portfólio negociou
+    ficam de fora.
+
+    Args:
+        quantidades (np.ndarray): Matriz portfólios × tickers (na ordem de `painel.tickers`).
+        painel (PricePanel): Painel compartilhado.
+
+    Returns:
+        tuple: (valores, retornos), ambos portfólios × dias; NaN onde não se aplica.
+               Retornos em decimal, relativos ao pregão anterior do próprio portfólio.
+    """
+    presentes = ~np.isnan(painel.precos)
+    valores = quantidades @ np.where(presentes, painel.precos, 0.0)
+    validos = ((quantidades != 0).astype(np.float64) @ presentes.astype(np.float64)) > 0
+    retornos = _retornos_com_anterior(valores, validos)
+    return np.where(validos, valores, np.nan), retornos
+
+
+def _retornos_benchmark(painel: PricePanel) -> np.ndarray:
+    validos = ~np.isnan(painel.benchmark)
+    return _retornos_com_anterior(np.nan_to_num(painel.benchmark), validos)
+
+
+@measure_time
+def calcular_kpis_lote(quantidades: np.ndarray, painel: PricePanel, ids: Optional[Sequence[Hashable]] = None,
+                       tamanho_lote: Optional[int] = 500, com_benchmark: bool = True) -> pd.DataFrame:
+    """
+    Calcula os KPIs de `calcular_kpis` para muitos portfólios que compartilham um universo de tickers.
+
+    Os portfólios são processados em lotes de `tamanho_lote` linhas, limitando a memória a
+    O(tamanho_lote × dias); cada lote é resolvido com um produto de matrizes e uma única
+    chamada de `kpis_agrupados` (um grupo por portfólio).
+
+    Args:
+        quantidades (np.ndarray): Matriz portfólios × tickers (na ordem de `painel.tickers`).
+        painel (PricePanel): Painel compartilhado (com o IBOV como benchmark, se houver).
+        ids (sequence, optional): Identificadores dos portfólios (índice do resultado).
+        tamanho_lote (int, optional): Portfólios por lote; None processa todos de uma vez.
+        com_benchmark (bool): Se True, calcula alpha e beta contra o benchmark do painel.
+
+    Returns:
+        pd.DataFrame: Uma linha por portfólio e colunas KPI_NOMES.
+    """
+    quantidades = np.asarray(quantidades, dtype=np.float64)
+    if quantidades.ndim != 2 or quantidades.shape[1] != len(painel.tickers):
+        raise ValueError(f"Matriz de quantidades deve ter formato (portfólios, {len(painel.tickers)})")
+
+    n_portfolios = quantidades.shape[0]
+    ids = list(ids) if ids is not None else list(range(n_portfolios))
+    benchmark = _retornos_benchmark(painel) if com_benchmark and not np.isnan(painel.benchmark).all() else None
+    passo = tamanho_lote or max(n_portfolios, 1)
+
+    resultado = np.full((n_portfolios, len(KPI_NOMES)), np.nan)
+    for inicio in range(0, n_portfolios, passo):
+        lote = quantidades[inicio:inicio + passo]
+        _, retornos = calcular_valores_lote(lote, painel)
+        linhas, colunas = np.nonzero(~np.isnan(retornos))
+        kpis = kpis_agrupados(
+            retornos[linhas, colunas], linhas, len(lote),
+            benchmark[colunas] if benchmark is not None else None
+        )
+        resultado[inicio:inicio + len(lote)] = np.column_stack([kpis[k] for k in KPI_NOMES])
+
+    logger.info(f"[batch_kpis] KPIs de {n_portfolios} portfólios × {len(painel.tickers)} tickers × {len(painel.dias)} dias")
+    return pd.DataFrame(resultado, index=ids, columns=list(KPI_NOMES))
@@ -0,0 +1,156 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+from redis import Redis
+from redis.exceptions import RedisError
+from Findash.utils.logging_tools import logger
+from .data_fetch import obter_dados
+from .price_store import B3_TZ, B3_FECHAMENTO
+
+PREFIXO_POPULARIDADE = 'tickers:popularidade'
+# Janela (em dias) considerada no ranking de popularidade
+JANELA_POPULARIDADE = 7
+# Tickers sempre aquecidos, independentemente do ranking
+TICKERS_FIXOS = ['PETR4', 'VALE3', 'ITUB4', 'BBDC4', 'ABEV3']
+
+
+def registrar_popularidade(redis_client: Redis, tickers: List[str]) -> None:
+    """
+    Incrementa o contador diário de uso de cada ticker (um ZINCRBY por ticker, em pipeline).
+
+    Args:
+        redis_client (redis.Redis): Conexão Redis.
+        tickers (list): Tickers enviados em /dashboard.
+    """
+    chave = f"{PREFIXO_POPULARIDADE}:{datetime.now(B3_TZ):%Y%m%d}"
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for ticker in tickers:
+            pipe.zincrby(chave, 1, ticker.replace('.SA', '').upper())
+        pipe.expire(chave, (JANELA_POPULARIDADE + 1) * 86400)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"[CacheWarmer] Falha ao registrar popularidade de {tickers}: {e}")
+
+
+def tickers_populares(redis_client: Redis, n: int = 20) -> List[str]:
+    """
+    Retorna os `n` tickers mais usados nos últimos JANELA_POPULARIDADE dias.
+    """
+    hoje = datetime.now(B3_TZ).date()
+    chaves = [f"{PREFIXO_POPULARIDADE}:{hoje - timedelta(days=i):%Y%m%d}" for i in range(JANELA_POPULARIDADE)]
+    destino = f"{PREFIXO_POPULARIDADE}:janela"
+    try:
+        redis_client.zunionstore(destino, chaves)
+        redis_client.expire(destino, 300)
+        return [t.decode() if isinstance(t, bytes) else t for t in redis_client.zrevrange(destino, 0, n - 1)]
+    except RedisError as e:
+        logger.warning(f"[CacheWarmer] Falha ao ler ranking de popularidade: {e}")
+        return []
+
+
+class CacheWarmer:
+    """
+    Mantém aquecido o cache de preços (PriceStore) do IBOV e dos tickers mais populares.
+
+    A cada ciclo baixa preços e dividendos dos últimos `anos` anos para IBOV, TICKERS_FIXOS e
+    o top-N do ranking de popularidade. Os ciclos acontecem a cada `intervalo` segundos e logo
+    após o fechamento do pregão, de modo que o primeiro acesso do dia encontra o cache pronto.
+    Um lock no Redis garante que apenas um worker aqueça o cache por ciclo.
+    """
+
+    def __init__(self, redis_client: Redis, top_n: int = 20, intervalo: int = 3600, anos: int = 5):
+        self.redis = redis_client
+        self.top_n = top_n
+        self.intervalo = intervalo
+        self.anos = anos
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def aquecer(self) -> List[str]:
+        """
+        Executa um ciclo de aquecimento.
+
+        Returns:
+            list: Tickers aquecidos (vazio se outro worker detinha o lock).
+        """
+        try:
+            # Workers acordam juntos após o fechamento; o lock curto evita ciclos duplicados
+            if not self.redis.set('cache_warmer:lock', os.getpid(), nx=True, ex=300):
+                logger.info("[CacheWarmer] Ciclo em andamento em outro worker, pulando")
+                return []
+        except RedisError as e:
+            logger.warning(f"[CacheWarmer] Redis indisponível, aquecendo sem lock: {e}")
+
+        populares = tickers_populares(self.redis, self.top_n)
+        tickers = list(dict.fromkeys(TICKERS_FIXOS + populares))
+        hoje = datetime.now(B3_TZ).date()
+        start_date = (hoje - timedelta(days=365 * self.anos)).strftime('%Y-%m-%d')
+        end_date = (hoje + timedelta(days=1)).strftime('%Y-%m-%d')
+
+        inicio = time.perf_counter()
+        dados = obter_dados(tickers, start_date, end_date, include_ibov=True)
+        falhas = [t for t, s in dados.get('status', {}).items() if s == 'erro']
+        logger.info(f"[CacheWarmer] {len(tickers)} tickers + IBOV aquecidos em {time.perf_counter() - inicio:.2f}s; falhas: {falhas or 'nenhuma'}")
+        return tickers
+
+    def _segundos_ate_proximo_ciclo(self) -> float:
+        agora = datetime.now(B3_TZ)
+        pos_fechamento = datetime.combine(agora.date(), B3_FECHAMENTO, tzinfo=B3_TZ) + timedelta(minutes=5)
+        if pos_fechamento <= agora:
+            pos_fechamento += timedelta(days=1)
+        return max(1.0, min(self.intervalo, (pos_fechamento - agora).total_seconds()))
+
+    def executar(self) -> None:
+        """Loop de aquecimento até `parar()` ser chamado."""
+        while not self._parar.is_set():
+            try:
+                self.aquecer()
+            except Exception as e:
+                logger.error(f"[CacheWarmer] Erro no ciclo de aquecimento: {e}", exc_info=True)
+            self._parar.wait(self._segundos_ate_proximo_ciclo())
+
+    def iniciar(self) -> None:
+        """Inicia o loop numa thread daemon."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self.executar, name='findash-cache-warmer', daemon=True)
+        self._thread.start()
+        logger.info(f"[CacheWarmer] Iniciado (top_n={self.top_n}, intervalo={self.intervalo}s)")
+
+    def parar(self) -> None:
+        self._parar.set()
+
+
+def iniciar_cache_warmer(redis_client: Redis) -> Optional[CacheWarmer]:
+    """
+    Inicia o aquecedor em segundo plano se FINDASH_CACHE_WARMER estiver ativo (padrão: '1').
+
+    Args:
+        redis_client (redis.Redis): Conexão Redis com os contadores de popularidade.
+
+    Returns:
+        CacheWarmer: Instância iniciada, ou None se desativado.
+    """
+    if os.getenv('FINDASH_CACHE_WARMER', '1') != '1':
+        return None
+    warmer = CacheWarmer(
+        redis_client,
+        top_n=int(os.getenv('FINDASH_CACHE_WARMER_TOP_N', 20)),
+        intervalo=int(os.getenv('FINDASH_CACHE_WARMER_INTERVALO', 3600)),
+    )
+    warmer.iniciar()
+    return warmer
+
+
+if __name__ == '__main__':
+    # Execução como processo separado: python -m Findash.metrics.cache_warmer
+    redis_client = Redis(host=os.getenv('REDIS_HOST', 'localhost'), port=6379, db=1)
+    CacheWarmer(
+        redis_client,
+        top_n=int(os.getenv('FINDASH_CACHE_WARMER_TOP_N', 20)),
+        intervalo=int(os.getenv('FINDASH_CACHE_WARMER_INTERVALO', 3600)),
+    ).executar()
@@ -1,100 +1,264 @@
-from typing import List, Dict, Any
+from typing import Callable, List, Dict, Any, Optional, Tuple
 from redis import Redis
 import yfinance as yf
 import pandas as pd
+import os
 import time
 from Findash.services.ticker_service import manage_ticker_data, get_all_sectors, get_sector, DATABASE_PATH
 from Findash.utils.logging_tools import logger
+from Findash.utils.instrumentation import observar
+from utils.serialization import orjson_dumps, orjson_loads
+from .price_store import price_store, COLUNAS
+from .panel import PricePanel
+from .trading_calendar import para_dias, para_iso, para_datetime
+from .single_flight import SingleFlight, obter_single_flight
+from .download_gateway import PriceBatcher
+from .downloader import ChunkedDownloader, CircuitoAbertoError, STATUS_CIRCUITO_ABERTO
 from .utils import measure_time
 
+def _baixar_yf_download(tickers: List[str], start_date: str, end_date: str) -> Dict[str, pd.DataFrame]:
+    """
+    Consulta o yfinance numa única chamada multi-ticker e separa o resultado por ticker.
+
+    Args:
+        tickers (list): Tickers normalizados (e.g., ['PETR4.SA', '^BVSP']).
+        start_date (str): Data inicial (formato 'YYYY-MM-DD').
+        end_date (str): Data final exclusiva (formato 'YYYY-MM-DD').
+
+    Returns:
+        dict: {ticker: DataFrame} com colunas 'adj_close', 'dividends', 'volume'.
+              Tickers que falharam no yfinance ficam de fora.
+    """
+    inicio = time.perf_counter()
+    data = yf.download(
+        tickers,
+        start=start_date,
+        end=end_date,
+        auto_adjust=False,
+        actions=True,
+        progress=False,
+        timeout=10
+    )
+    observar('findash_download_segundos', time.perf_counter() - inicio, origem='data_fetch')
+
+    erros = getattr(yf.shared, '_ERRORS', {}) or {}
+    if erros and all(t in erros for t in tickers):
+        raise RuntimeError(f"yfinance falhou para todos os tickers: {erros}")
+    if data.empty:
+        logger.warning(f"Nenhum dado retornado para {tickers}")
+        return {t: pd.DataFrame(columns=['adj_close', 'dividends', 'volume']) for t in tickers if t not in erros}
+
+    available_columns = data.columns.get_level_values(0).unique()
+    if 'Adj Close' not in available_columns:
+        logger.warning(f"'Adj Close' não encontrado para {tickers}")
+        return {}
+    if 'Dividends' not in available_columns:
+        logger.info("Nenhum dado de dividendos retornado pelo yfinance")
+
+    if data.index.tz is not None:
+        data.index = data.index.tz_localize(None)
+
+    resultado = {}
+    for ticker in tickers:
+        if ticker in erros or ticker not in data['Adj Close'].columns:
+            continue
+        resultado[ticker] = pd.DataFrame({
+            'adj_close': data['Adj Close'][ticker],
+            'dividends': data['Dividends'][ticker] if 'Dividends' in available_columns else 0.0,
+            'volume': data['Volume'][ticker] if 'Volume' in available_columns else 0.0,
+        })
+    return resultado
+
+def _baixar_historico(tickers: List[str], start_date: str, end_date: str) -> Dict[str, pd.DataFrame]:
+    """
+    Baixa um lote ticker a ticker via yf.Ticker.history, que (ao contrário do yf.download)
+    pode ser usado em várias threads ao mesmo tempo. Levanta exceção apenas se todo o lote falhar.
+    """
+    resultado, erros = {}, {}
+    for ticker in tickers:
+        try:
+            hist = yf.Ticker(ticker).history(
+                start=start_date, end=end_date, auto_adjust=False, actions=True, raise_errors=True, timeout=10
+            )
+        except Exception as e:
+            erros[ticker] = str(e)
+            continue
+        if hist.index.tz is not None:
+            hist.index = hist.index.tz_localize(None)
+        resultado[ticker] = pd.DataFrame({
+            'adj_close': hist['Adj Close'] if 'Adj Close' in hist.columns else hist.get('Close'),
+            'dividends': hist['Dividends'] if 'Dividends' in hist.columns else 0.0,
+            'volume': hist['Volume'] if 'Volume' in hist.columns else 0.0,
+        }, index=hist.index)
+    if erros:
+        logger.warning(f"Falha no yfinance para {list(erros)}: {erros}")
+        if not resultado:
+            raise RuntimeError(f"Lote inteiro falhou: {list(erros)}")
+    return resultado
+
+# Listas grandes são divididas em lotes paralelos; listas pequenas usam um único yf.download.
+# Ambos os casos passam por retry com backoff e pelo circuit breaker.
+_downloader = ChunkedDownloader(
+    _baixar_historico,
+    baixar_unico=_baixar_yf_download,
+    tamanho_lote=int(os.getenv('FINDASH_DOWNLOAD_LOTE', 20)),
+    max_workers=int(os.getenv('FINDASH_DOWNLOAD_WORKERS', 4)),
+)
+
+def _baixar_precos(tickers: List[str], start_date: str, end_date: str) -> Dict[str, pd.DataFrame]:
+    dados, status = _downloader.baixar(tickers, start_date, end_date)
+    if status and all(s == STATUS_CIRCUITO_ABERTO for s in status.values()):
+        raise CircuitoAbertoError("Provedor de dados de mercado temporariamente indisponível")
+    return dados
+
+def _serializar_precos(precos: Dict[str, pd.DataFrame]) -> bytes:
+    return orjson_dumps({
+        ticker: {
+            'datas': para_iso(para_dias(df.index)).tolist(),
+            **{c: df[c].astype(float).tolist() for c in COLUNAS},
+        }
+        for ticker, df in precos.items()
+    })
+
+def _desserializar_precos(bruto: bytes) -> Dict[str, pd.DataFrame]:
+    return {
+        ticker: pd.DataFrame({c: dados[c] for c in COLUNAS}, index=para_datetime(para_dias(dados['datas'])), dtype=float)
+        for ticker, dados in orjson_loads(bruto).items()
+    }
+
+def _baixar_coordenado(tickers: List[str], start_date: str, end_date: str) -> Dict[str, pd.DataFrame]:
+    """
+    Baixa preços via yfinance, deduplicando downloads idênticos entre processos quando o
+    single-flight estiver configurado (ver `configurar_single_flight`).
+    """
+    single_flight = obter_single_flight()
+    if single_flight is None:
+        return _baixar_precos(tickers, start_date, end_date)
+
+    chave = SingleFlight.gerar_chave('precos', sorted(tickers), start_date, end_date)
+    return single_flight.executar(
+        chave,
+        lambda: _baixar_precos(tickers, start_date, end_date),
+        serializar=_serializar_precos,
+        desserializar=_desserializar_precos
+    )
+
+# Pedidos simultâneos do processo (janela em ms, 0 desativa) viram um único yf.download
+_batcher = PriceBatcher(_baixar_coordenado, janela=int(os.getenv('FINDASH_BATCH_JANELA_MS', 50)) / 1000)
+
+# Provedor alternativo ao yfinance (e.g., dados sintéticos nos benchmarks); None usa o yfinance
+_provedor: Optional[Callable[[List[str], str, str], Dict[str, pd.DataFrame]]] = None
+
+def configurar_provedor(baixar: Optional[Callable[[List[str], str, str], Dict[str, pd.DataFrame]]]) -> None:
+    """
+    Substitui (ou restaura, com None) o provedor de dados de mercado abaixo do PriceStore.
+
+    Args:
+        baixar (callable): Função (tickers, start, end) -> {ticker: DataFrame} com colunas
+            'adj_close', 'dividends', 'volume', no mesmo formato de `_baixar_yf_download`.
+    """
+    global _provedor
+    _provedor = baixar
+
+def _baixar(tickers: List[str], start_date: str, end_date: str) -> Dict[str, pd.DataFrame]:
+    if _provedor is not None:
+        return _provedor(tickers, start_date, end_date)
+    return _batcher.baixar(tickers, start_date, end_date)
+
+def _normalizar_tickers(tickers: List[str]) -> Tuple[List[str], Dict[str, str]]:
+    """Retorna os tickers no formato do yfinance e o mapa normalizado -> nome exibido."""
+    normalized_tickers = [ticker if ticker == '^BVSP' else f"{ticker}.SA" if not ticker.endswith('.SA') else ticker for ticker in tickers]
+    ticker_map = {ticker if ticker == '^BVSP' else f"{ticker}.SA" if not ticker.endswith('.SA') else ticker: ticker.replace('.SA', '') for ticker in tickers}
+    return normalized_tickers, ticker_map
+
+def versao_precos(tickers: List[str], start_date: str, end_date: str, include_ibov: bool = True) -> Optional[str]:
+    """
+    Versão dos preços em cache para os tickers no período (ver `PriceStore.versao`).
+
+    Returns:
+        str: Identificador da versão, ou None se algum trecho ainda precisar ser baixado.
+    """
+    normalized_tickers, _ = _normalizar_tickers(tickers)
+    return price_store.versao(normalized_tickers + ['^BVSP'] if include_ibov else normalized_tickers, start_date, end_date)
+
+def obter_historico(tickers: List[str], start_date: str, end_date: str) -> Tuple[Dict[str, pd.DataFrame], Dict[str, str]]:
+    """
+    Histórico completo (preço ajustado, dividendos e volume) de cada ticker, via PriceStore.
+
+    Args:
+        tickers (list): Tickers (e.g., ['PETR4', 'VALE3.SA', '^BVSP']).
+        start_date (str): Data inicial (formato 'YYYY-MM-DD').
+        end_date (str): Data final exclusiva (formato 'YYYY-MM-DD').
+
+    Returns:
+        tuple: ({ticker normalizado: DataFrame com colunas 'adj_close', 'dividends', 'volume'},
+                {ticker normalizado: 'ok' | 'sem_dados' | 'erro'}).
+    """
+    normalized_tickers, _ = _normalizar_tickers(tickers)
+    status = {}
+    historico = price_store.obter(normalized_tickers, start_date, end_date, baixar=_baixar, status=status)
+    return historico, status
+
+@measure_time
+def obter_painel(tickers: List[str], start_date: str, end_date: str, include_ibov: bool = True) -> Tuple[PricePanel, Dict[str, str]]:
+    """
+    Obtém preços ajustados e dividendos como um PricePanel compacto.
+
+    Os dados vêm do cache local em disco (PriceStore); apenas os trechos ainda não
+    baixados (no início ou no fim do intervalo) são consultados no yfinance.
+
+    Args:
+        tickers (list): Lista de tickers (e.g., ['PETR4.SA', 'VALE3.SA']).
+        start_date (str): Data inicial (formato 'YYYY-MM-DD').
+        end_date (str): Data final (formato 'YYYY-MM-DD').
+        include_ibov (bool): Se True, inclui o IBOV (^BVSP) como benchmark do painel.
+
+    Returns:
+        tuple: (PricePanel, status), com status {ticker: 'ok' | 'sem_dados' | 'erro'}.
+               Falhas em alguns tickers não afetam os dados dos demais.
+    """
+    normalized_tickers, ticker_map = _normalizar_tickers(tickers)
+    tickers_to_download = normalized_tickers + ['^BVSP'] if include_ibov else normalized_tickers
+    if not tickers_to_download:
+        return PricePanel.vazio(), {}
+
+    status = {}
+    historico = price_store.obter(tickers_to_download, start_date, end_date, baixar=_baixar, status=status)
+    painel = PricePanel.from_historico(
+        historico, normalized_tickers, nomes=ticker_map, benchmark='^BVSP' if include_ibov else None
+    )
+    logger.info(f"Portfolio: {len(painel.dias)} dias para {normalized_tickers}")
+    return painel, {ticker_map.get(t, t): s for t, s in status.items()}
+
 @measure_time
 def obter_dados(tickers: List[str], start_date: str, end_date: str, include_ibov: bool = True) -> Dict[str, Any]:
     """
     Obtém dados de preços ajustados e dividendos para uma lista de tickers.
-    
+
+    Formato de borda (dicionários por data) sobre `obter_painel`; código novo deve preferir
+    o PricePanel, que evita as conversões para dicionário.
+
     Args:
         tickers (list): Lista de tickers (e.g., ['PETR4.SA', 'VALE3.SA']).
         start_date (str): Data inicial (formato 'YYYY-MM-DD').
         end_date (str): Data final (formato 'YYYY-MM-DD').
         include_ibov (bool): Se True, inclui dados do IBOV (^BVSP).
-    
+
     Returns:
-        dict: Contém 'portfolio', 'ibov', 'dividends'.
+        dict: Contém 'portfolio', 'ibov', 'dividends' e 'status' ({ticker: 'ok' | 'sem_dados' | 'erro'}).
+              Falhas em alguns tickers não afetam os dados dos demais.
     """
-    normalized_tickers = [ticker if ticker == '^BVSP' else f"{ticker}.SA" if not ticker.endswith('.SA') else ticker for ticker in tickers]
-    ticker_map = {ticker if ticker == '^BVSP' else f"{ticker}.SA" if not ticker.endswith('.SA') else ticker: ticker.replace('.SA', '') for ticker in tickers}
-    
-    result = {'portfolio': {ticker_map.get(t, t): {} for t in normalized_tickers}, 'ibov': {}, 'dividends': {ticker_map.get(t, t): {} for t in normalized_tickers}}
-    valid_tickers = []
+    normalized_tickers, ticker_map = _normalizar_tickers(tickers)
+    result = {'portfolio': {ticker_map.get(t, t): {} for t in normalized_tickers}, 'ibov': {}, 'dividends': {ticker_map.get(t, t): {} for t in normalized_tickers}, 'status': {}}
 
-    tickers_to_download = normalized_tickers + ['^BVSP'] if include_ibov else normalized_tickers
+    try:
+        painel, status = obter_painel(tickers, start_date, end_date, include_ibov)
+        result.update(painel.to_dados())
+        result['status'] = status
+        if not include_ibov:
+            result['ibov'] = {}
+    except Exception as e:
+        logger.error(f"Erro ao obter dados do yfinance: {e}")
+        result['status'] = {ticker_map.get(t, t): 'erro' for t in normalized_tickers}
 
-    if tickers_to_download:
-        try:
-            start_time = time.time()
-            data = yf.download(
-                tickers_to_download, 
-                start=start_date, 
-                end=end_date,
-                auto_adjust=False,
-                actions=True,
-                progress=False,
-                timeout=10
-            )
-            print(f"yf.download took {time.time() - start_time}s")
-            
-            if data.empty:
-                print(f"Nenhum dado retornado para {tickers_to_download}")
-                return result
-
-            available_columns = data.columns.get_level_values(0).unique()
-            if 'Adj Close' not in available_columns:
-                logger.warning(f"'Adj Close' não encontrado para {tickers_to_download}")
-                return result
-            adj_close = data['Adj Close']
-
-            if 'Dividends' in available_columns:
-                dividends_data = data['Dividends']
-            else:
-                logger.info("Nenhum dado de dividendos retornado pelo yfinance")
-                dividends_data = None
-
-            valid_tickers = [t for t in normalized_tickers if t in adj_close.columns and not adj_close[t].isna().all()]
-            if valid_tickers:
-                adj_close_portfolio = adj_close[valid_tickers]
-                print(f"Portfolio: {len(adj_close_portfolio)} linhas para {valid_tickers}")
-                adj_close_portfolio.index = adj_close_portfolio.index.map(lambda x: x.strftime('%Y-%m-%d'))
-                result['portfolio'].update({ticker_map.get(ticker, ticker): adj_close_portfolio[ticker].to_dict() for ticker in valid_tickers})
-            else:
-                print(f"Nenhum dado válido para {normalized_tickers}")
-
-            if include_ibov and '^BVSP' in adj_close.columns:
-                ibov_adj_close = adj_close['^BVSP'].dropna()
-                print(f"IBOV: {len(ibov_adj_close)} linhas")
-                ibov_adj_close.index = ibov_adj_close.index.map(lambda x: x.strftime('%Y-%m-%d'))
-                result['ibov'] = ibov_adj_close.to_dict()
-            elif include_ibov:
-                print("Nenhum dado para IBOV (^BVSP)")
-
-            if dividends_data is not None:
-                for ticker in valid_tickers:
-                    ticker_dividends = dividends_data[ticker].dropna()
-                    if not ticker_dividends.empty:
-                        ticker_dividends = ticker_dividends.loc[start_date:end_date]
-                        ticker_dividends.index = ticker_dividends.index.map(lambda x: x.strftime('%Y-%m-%d'))
-                        result['dividends'][ticker_map.get(ticker, ticker)] = ticker_dividends.to_dict()
-                    else:
-                        result['dividends'][ticker] = {}
-            else:
-                for ticker in valid_tickers:
-                    result['dividends'][ticker] = {}
-
-        except Exception as e:
-            print(f"Erro ao obter dados do yfinance: {e}")
-            for ticker in normalized_tickers:
-                result['portfolio'][ticker] = {}
-                result['dividends'][ticker] = {}
-            if include_ibov:
-                result['ibov'] = {}
-
-    return result
\ No newline at end of file
+    return result
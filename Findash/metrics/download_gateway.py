@@ -0,0 +1,112 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+import pandas as pd
+from Findash.utils.logging_tools import logger
+from Findash.utils.instrumentation import contar
+
+Baixador = Callable[[List[str], str, str], Dict[str, pd.DataFrame]]
+
+
+@dataclass
+class _Pedido:
+    tickers: List[str]
+    start_date: str
+    end_date: str
+    pronto: threading.Event = field(default_factory=threading.Event)
+    resultado: Optional[Dict[str, pd.DataFrame]] = None
+    erro: Optional[BaseException] = None
+
+
+class PriceBatcher:
+    """
+    Agrupa pedidos de preços que chegam numa mesma janela curta numa única chamada ao provedor.
+
+    O primeiro pedido abre a janela e, ao final dela, executa um download com a união dos
+    tickers e o intervalo mais amplo entre os pedidos pendentes. Cada chamador recebe apenas
+    seus tickers, recortados ao próprio intervalo. Os lotes são executados um de cada vez por
+    processo (o yfinance não é seguro para downloads simultâneos), e os pedidos que chegam
+    durante um download acumulam-se no lote seguinte.
+    """
+
+    def __init__(self, baixar: Baixador, janela: float = 0.05, max_tickers: int = 200):
+        self._baixar = baixar
+        self.janela = janela
+        self.max_tickers = max_tickers
+        self._lock = threading.Lock()
+        self._download_lock = threading.Lock()
+        self._pendentes: List[_Pedido] = []
+        self._janela_aberta = False
+        self.lotes = 0
+        self.pedidos = 0
+
+    def baixar(self, tickers: List[str], start_date: str, end_date: str) -> Dict[str, pd.DataFrame]:
+        """
+        Mesmo contrato de `_baixar_precos`: (tickers, start, end) -> {ticker: DataFrame}.
+        """
+        if self.janela <= 0:
+            return self._baixar(tickers, start_date, end_date)
+
+        pedido = _Pedido(list(tickers), start_date, end_date)
+        with self._lock:
+            self._pendentes.append(pedido)
+            coletor = not self._janela_aberta
+            self._janela_aberta = True
+
+        if coletor:
+            time.sleep(self.janela)
+            # Pedidos que chegam enquanto outro lote está baixando entram no próximo lote
+            with self._download_lock:
+                with self._lock:
+                    lote, self._pendentes = self._pendentes, []
+                    self._janela_aberta = False
+                self._executar_lote(lote)
+        else:
+            pedido.pronto.wait()
+
+        if pedido.erro is not None:
+            raise pedido.erro
+        return pedido.resultado
+
+    def _executar_lote(self, lote: List[_Pedido]) -> None:
+        # Lotes muito grandes são quebrados para não estourar o limite de tickers por chamada
+        grupos, atual, vistos = [], [], set()
+        for pedido in lote:
+            novos = set(pedido.tickers) - vistos
+            if atual and len(vistos | novos) > self.max_tickers:
+                grupos.append(atual)
+                atual, vistos = [], set()
+            atual.append(pedido)
+            vistos |= set(pedido.tickers)
+        if atual:
+            grupos.append(atual)
+
+        for grupo in grupos:
+            tickers = sorted({t for p in grupo for t in p.tickers})
+            inicio = min(p.start_date for p in grupo)
+            fim = max(p.end_date for p in grupo)
+            try:
+                if len(grupo) > 1:
+                    logger.info(f"[PriceBatcher] {len(grupo)} pedidos agrupados: {len(tickers)} tickers, {inicio} → {fim}")
+                dados = self._baixar(tickers, inicio, fim)
+                for pedido in grupo:
+                    pedido.resultado = self._recortar(dados, pedido)
+            except BaseException as e:
+                for pedido in grupo:
+                    pedido.erro = e
+            finally:
+                self.lotes += 1
+                self.pedidos += len(grupo)
+                contar('findash_batcher_lotes_total')
+                contar('findash_batcher_pedidos_total', len(grupo))
+                for pedido in grupo:
+                    pedido.pronto.set()
+
+    @staticmethod
+    def _recortar(dados: Dict[str, pd.DataFrame], pedido: _Pedido) -> Dict[str, pd.DataFrame]:
+        inicio, fim = pd.Timestamp(pedido.start_date), pd.Timestamp(pedido.end_date)
+        return {
+            t: dados[t][(dados[t].index >= inicio) & (dados[t].index < fim)]
+            for t in pedido.tickers if t in dados
+        }
@@ -0,0 +1,177 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+import pandas as pd
+from Findash.utils.logging_tools import logger
+from Findash.utils.instrumentation import contar, definir
+
+Baixador = Callable[[List[str], str, str], Dict[str, pd.DataFrame]]
+
+# Status por ticker devolvidos pelo ChunkedDownloader
+STATUS_OK = 'ok'
+STATUS_SEM_DADOS = 'sem_dados'
+STATUS_ERRO = 'erro'
+STATUS_CIRCUITO_ABERTO = 'circuito_aberto'
+
+
+class CircuitoAbertoError(RuntimeError):
+    """Levantada quando o circuit breaker bloqueia chamadas ao provedor."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker simples para o provedor de dados de mercado.
+
+    Após `limite_falhas` falhas consecutivas o circuito abre e as chamadas são recusadas por
+    `tempo_reabertura` segundos. Depois disso uma chamada de teste é liberada (meio aberto):
+    sucesso fecha o circuito, falha o reabre.
+    """
+
+    FECHADO, ABERTO, MEIO_ABERTO = 'fechado', 'aberto', 'meio_aberto'
+
+    def __init__(self, limite_falhas: int = 5, tempo_reabertura: float = 60.0):
+        self.limite_falhas = limite_falhas
+        self.tempo_reabertura = tempo_reabertura
+        self._estado = self.FECHADO
+        self._falhas = 0
+        self._aberto_em = 0.0
+        self._teste_em_andamento = False
+        self._lock = threading.Lock()
+
+    @property
+    def estado(self) -> str:
+        with self._lock:
+            if self._estado == self.ABERTO and time.monotonic() - self._aberto_em >= self.tempo_reabertura:
+                return self.MEIO_ABERTO
+            return self._estado
+
+    def permitir(self) -> bool:
+        """Indica se uma chamada ao provedor pode ser feita agora."""
+        with self._lock:
+            if self._estado == self.FECHADO:
+                return True
+            if self._estado == self.ABERTO and time.monotonic() - self._aberto_em >= self.tempo_reabertura:
+                self._estado = self.MEIO_ABERTO
+            if self._estado == self.MEIO_ABERTO and not self._teste_em_andamento:
+                self._teste_em_andamento = True
+                return True
+            return False
+
+    def registrar_sucesso(self) -> None:
+        with self._lock:
+            self._estado = self.FECHADO
+            self._falhas = 0
+            self._teste_em_andamento = False
+        definir('findash_circuito_aberto', 0)
+
+    def registrar_falha(self) -> None:
+        with self._lock:
+            self._falhas += 1
+            self._teste_em_andamento = False
+            if self._estado == self.MEIO_ABERTO or self._falhas >= self.limite_falhas:
+                if self._estado != self.ABERTO:
+                    logger.warning(f"[CircuitBreaker] Circuito aberto após {self._falhas} falhas")
+                self._estado = self.ABERTO
+                self._aberto_em = time.monotonic()
+                definir('findash_circuito_aberto', 1)
+
+
+class ChunkedDownloader:
+    """
+    Baixa listas grandes de tickers em lotes, em paralelo, com retry e backoff exponencial.
+
+    Cada lote é tentado até `tentativas` vezes; um lote que continua falhando afeta apenas
+    os próprios tickers. Todas as chamadas passam pelo circuit breaker, que interrompe o
+    acesso ao provedor quando ele está instável.
+    """
+
+    def __init__(self, baixar_lote: Baixador, baixar_unico: Optional[Baixador] = None,
+                 tamanho_lote: int = 20, max_workers: int = 4, tentativas: int = 3,
+                 backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 breaker: Optional[CircuitBreaker] = None):
+        """
+        Args:
+            baixar_lote (callable): Baixa um lote; precisa ser seguro para uso em várias threads.
+            baixar_unico (callable, optional): Usado quando todos os tickers cabem em um lote
+                (executado na thread do chamador). Padrão: `baixar_lote`.
+            tamanho_lote (int): Máximo de tickers por lote.
+            max_workers (int): Tamanho do pool de threads.
+            tentativas (int): Número máximo de tentativas por lote.
+            backoff_base (float): Espera (s) antes da segunda tentativa; dobra a cada nova falha.
+            backoff_max (float): Espera máxima entre tentativas.
+            breaker (CircuitBreaker, optional): Circuit breaker compartilhado.
+        """
+        self._baixar_lote = baixar_lote
+        self._baixar_unico = baixar_unico or baixar_lote
+        self.tamanho_lote = tamanho_lote
+        self.max_workers = max_workers
+        self.tentativas = tentativas
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+
+    def _executar_lote(self, baixar: Baixador, lote: List[str], start_date: str, end_date: str
+                       ) -> Tuple[Dict[str, pd.DataFrame], Dict[str, str]]:
+        ultimo_erro = None
+        for tentativa in range(1, self.tentativas + 1):
+            if not self.breaker.permitir():
+                logger.warning(f"[ChunkedDownloader] Circuito aberto, lote ignorado: {lote}")
+                contar('findash_downloads_total', resultado=STATUS_CIRCUITO_ABERTO)
+                return {}, {t: STATUS_CIRCUITO_ABERTO for t in lote}
+            try:
+                dados = baixar(lote, start_date, end_date)
+                self.breaker.registrar_sucesso()
+                contar('findash_downloads_total', resultado=STATUS_OK)
+                status = {
+                    t: (STATUS_OK if not dados[t].dropna(subset=['adj_close']).empty else STATUS_SEM_DADOS)
+                    if t in dados else STATUS_ERRO
+                    for t in lote
+                }
+                return dados, status
+            except Exception as e:
+                ultimo_erro = e
+                self.breaker.registrar_falha()
+                contar('findash_downloads_total', resultado=STATUS_ERRO)
+                if tentativa < self.tentativas:
+                    espera = min(self.backoff_max, self.backoff_base * 2 ** (tentativa - 1))
+                    espera *= random.uniform(0.5, 1.0)
+                    logger.warning(f"[ChunkedDownloader] Tentativa {tentativa} falhou para {lote}: {e}; nova tentativa em {espera:.2f}s")
+                    time.sleep(espera)
+
+        logger.error(f"[ChunkedDownloader] Lote {lote} falhou após {self.tentativas} tentativas: {ultimo_erro}")
+        return {}, {t: STATUS_ERRO for t in lote}
+
+    def baixar(self, tickers: List[str], start_date: str, end_date: str
+               ) -> Tuple[Dict[str, pd.DataFrame], Dict[str, str]]:
+        """
+        Baixa os tickers em lotes e devolve os dados parciais e o status de cada ticker.
+
+        Args:
+            tickers (list): Tickers normalizados.
+            start_date (str): Data inicial (formato 'YYYY-MM-DD').
+            end_date (str): Data final exclusiva (formato 'YYYY-MM-DD').
+
+        Returns:
+            tuple: ({ticker: DataFrame}, {ticker: status}), status em
+                'ok', 'sem_dados', 'erro' ou 'circuito_aberto'.
+        """
+        if not tickers:
+            return {}, {}
+
+        if len(tickers) <= self.tamanho_lote:
+            return self._executar_lote(self._baixar_unico, list(tickers), start_date, end_date)
+
+        lotes = [tickers[i:i + self.tamanho_lote] for i in range(0, len(tickers), self.tamanho_lote)]
+        dados, status = {}, {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(lotes))) as pool:
+            futuros = [pool.submit(self._executar_lote, self._baixar_lote, lote, start_date, end_date) for lote in lotes]
+            for futuro in as_completed(futuros):
+                dados_lote, status_lote = futuro.result()
+                dados.update(dados_lote)
+                status.update(status_lote)
+
+        falhas = [t for t, s in status.items() if s in (STATUS_ERRO, STATUS_CIRCUITO_ABERTO)]
+        logger.info(f"[ChunkedDownloader] {len(tickers)} tickers em {len(lotes)} lotes; falhas: {falhas or 'nenhuma'}")
+        return dados, status
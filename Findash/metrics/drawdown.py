@@ -0,0 +1,116 @@
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from .trading_calendar import para_dias, para_iso
+from .utils import measure_time
+
+# Quantidade de piores episódios guardados por série no data-store
+TOP_EPISODIOS = 5
+
+
+def curva_submersa(niveis: np.ndarray) -> np.ndarray:
+    """
+    Drawdown de cada dia em relação ao pico anterior (0 no pico, negativo abaixo dele).
+
+    Args:
+        niveis (np.ndarray): Preços ou valores (dias × séries, ou um vetor). NaN repete o último
+            nível conhecido; antes do primeiro nível válido o resultado é NaN.
+
+    Returns:
+        np.ndarray: Curva "underwater", no mesmo formato de `niveis`.
+    """
+    niveis = np.asarray(niveis, dtype=float)
+    vetor = niveis.ndim == 1
+    niveis = niveis.reshape(len(niveis), -1)
+    validos = ~np.isnan(niveis)
+
+    # Forward fill vetorizado: índice do último dia válido de cada coluna
+    ultimo = np.maximum.accumulate(np.where(validos, np.arange(len(niveis))[:, None], -1), axis=0)
+    preenchidos = np.where(ultimo >= 0, np.take_along_axis(niveis, np.maximum(ultimo, 0), axis=0), np.nan)
+
+    picos = np.fmax.accumulate(preenchidos, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        curva = preenchidos / picos - 1
+    return curva[:, 0] if vetor else curva
+
+
+def episodios_drawdown(curva: np.ndarray, datas: np.ndarray, top_n: Optional[int] = TOP_EPISODIOS) -> List[Dict[str, Any]]:
+    """
+    Identifica os episódios de drawdown de uma curva underwater numa única passada vetorizada.
+
+    Um episódio vai do último pico (início) até o primeiro dia de volta ao pico (recuperação);
+    o vale é o dia de menor drawdown. Durações são contadas em pregões do eixo de `datas`.
+
+    Args:
+        curva (np.ndarray): Curva underwater de uma série (ver `curva_submersa`).
+        datas (np.ndarray): Datas 'YYYY-MM-DD' de cada ponto da curva.
+        top_n (int, optional): Quantos episódios retornar (os mais profundos); None retorna todos.
+
+    Returns:
+        list: Episódios do mais profundo ao mais raso, cada um com 'inicio', 'vale', 'recuperacao'
+              (None se ainda não recuperou), 'profundidade', 'duracao', 'dias_ate_vale' e
+              'dias_recuperacao' (None se ainda não recuperou).
+    """
+    curva = np.asarray(curva, dtype=float)
+    submerso = curva < 0
+    if not submerso.any():
+        return []
+
+    bordas = np.diff(np.r_[0, submerso.astype(np.int8), 0])
+    inicios = np.flatnonzero(bordas == 1)        # primeiro dia abaixo do pico
+    fins = np.flatnonzero(bordas == -1)          # dia seguinte ao último abaixo do pico
+
+    posicoes = np.flatnonzero(submerso)
+    episodio = np.repeat(np.arange(len(inicios)), fins - inicios)
+    profundidades = np.minimum.reduceat(curva[posicoes], np.r_[0, np.cumsum(fins - inicios)[:-1]])
+    no_vale = np.flatnonzero(curva[posicoes] == profundidades[episodio])
+    vales = posicoes[no_vale[np.r_[True, np.diff(episodio[no_vale]) != 0]]]
+
+    ordem = np.argsort(profundidades, kind='stable')
+    if top_n is not None:
+        ordem = ordem[:top_n]
+
+    ultimo = len(curva) - 1
+    episodios = []
+    for i in ordem:
+        pico = max(inicios[i] - 1, 0)
+        recuperou = fins[i] <= ultimo
+        fim = fins[i] if recuperou else ultimo
+        episodios.append({
+            'inicio': str(datas[pico]),
+            'vale': str(datas[vales[i]]),
+            'recuperacao': str(datas[fins[i]]) if recuperou else None,
+            'profundidade': round(float(profundidades[i]), 6),
+            'duracao': int(fim - pico),
+            'dias_ate_vale': int(vales[i] - pico),
+            'dias_recuperacao': int(fins[i] - vales[i]) if recuperou else None,
+        })
+    return episodios
+
+
+@measure_time
+def calcular_drawdowns(niveis: pd.DataFrame, top_n: Optional[int] = TOP_EPISODIOS) -> Dict[str, Any]:
+    """
+    Curvas underwater e episódios de drawdown de várias séries (portfólio e tickers).
+
+    Args:
+        niveis (pd.DataFrame): Preços/valores (datas × séries), índice 'YYYY-MM-DD' ou datetime.
+        top_n (int, optional): Piores episódios guardados por série.
+
+    Returns:
+        dict: 'underwater' ({série: {data: drawdown}}, 4 casas decimais) e
+              'episodios' ({série: [episódios do mais profundo ao mais raso]}).
+    """
+    if niveis.empty:
+        return {'underwater': {}, 'episodios': {}}
+
+    datas = para_iso(para_dias(niveis.index))
+    curvas = curva_submersa(niveis.to_numpy(dtype=float))
+
+    underwater, episodios = {}, {}
+    for j, serie in enumerate(niveis.columns):
+        curva = curvas[:, j]
+        validos = ~np.isnan(curva)
+        underwater[serie] = dict(zip(datas[validos].tolist(), np.round(curva[validos], 4).tolist()))
+        episodios[serie] = episodios_drawdown(curva[validos], datas[validos], top_n)
+    return {'underwater': underwater, 'episodios': episodios}
@@ -0,0 +1,122 @@
+from typing import Optional, Sequence
+import numpy as np
+from scipy.cluster.hierarchy import leaves_list, linkage
+from scipy.spatial.distance import squareform
+from Findash.utils.setors_bv import SETORIAL_B3, raiz_ticker
+from .utils import measure_time
+
+# Níveis da taxonomia setorial, do mais amplo ao mais específico
+NIVEIS_SETORIAIS = ('setor', 'subsetor', 'segmento')
+
+
+def hierarquia_setorial(tickers: Sequence[str]) -> np.ndarray:
+    """
+    Códigos inteiros de setor, subsetor e segmento de cada ticker (SETORIAL_B3).
+
+    Tickers fora da taxonomia ficam num grupo 'Outros' próprio em cada nível.
+
+    Returns:
+        np.ndarray: Shape (tickers, 3), na ordem de NIVEIS_SETORIAIS.
+    """
+    rotulos = []
+    for ticker in tickers:
+        info = SETORIAL_B3.get(raiz_ticker(ticker), {})
+        setor = info.get('setor', 'Outros')
+        subsetor = info.get('subsetor', setor)
+        rotulos.append((setor, f"{setor}/{subsetor}", f"{setor}/{subsetor}/{info.get('segmento', subsetor)}"))
+    if not rotulos:
+        return np.empty((0, len(NIVEIS_SETORIAIS)), dtype=np.int64)
+    return np.column_stack([np.unique(nivel, return_inverse=True)[1] for nivel in zip(*rotulos)])
+
+
+def distancias_correlacao(covariancia: np.ndarray, grupos: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Distâncias sqrt((1 - ρ) / 2) entre os ativos, em [0, 1].
+
+    Com `grupos` (ver `hierarquia_setorial`), soma 1 para cada nível da taxonomia em que os dois
+    ativos diferem: qualquer par do mesmo segmento fica mais próximo que qualquer par de segmentos
+    diferentes, e assim por diante, e o agrupamento hierárquico respeita setor/subsetor/segmento.
+    """
+    desvios = np.sqrt(np.maximum(np.diag(covariancia), 1e-18))
+    correlacao = np.clip(covariancia / np.outer(desvios, desvios), -1.0, 1.0)
+    distancias = np.sqrt((1 - correlacao) / 2)
+    if grupos is not None and len(grupos):
+        distancias = distancias + (grupos[:, None, :] != grupos[None, :, :]).sum(axis=2)
+    np.fill_diagonal(distancias, 0.0)
+    return distancias
+
+
+def _bissecao(ligacoes: np.ndarray, variancias_segmento, n: int) -> np.ndarray:
+    """
+    Divide o capital recursivamente pela árvore de `ligacoes`, nível a nível.
+
+    Cada nó ocupa um trecho contíguo da ordem das folhas (o filho esquerdo primeiro); a parcela
+    do filho esquerdo é 1 - var_esq / (var_esq + var_dir).
+
+    Returns:
+        np.ndarray: Pesos na ordem das folhas.
+    """
+    tamanhos = np.concatenate([np.ones(n), ligacoes[:, 3]]).astype(np.int64)
+    pesos = np.zeros(n)
+    nos, inicios, parcelas = np.array([2 * n - 2]), np.array([0]), np.array([1.0])
+    while len(nos):
+        folhas = nos < n
+        pesos[inicios[folhas]] = parcelas[folhas]
+        nos, inicios, parcelas = nos[~folhas], inicios[~folhas], parcelas[~folhas]
+        if not len(nos):
+            break
+        esquerdos = ligacoes[nos - n, 0].astype(np.int64)
+        direitos = ligacoes[nos - n, 1].astype(np.int64)
+        meios = inicios + tamanhos[esquerdos]
+        var_esquerda = variancias_segmento(inicios, meios)
+        var_direita = variancias_segmento(meios, meios + tamanhos[direitos])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            alfa = np.where(var_esquerda + var_direita > 0, 1 - var_esquerda / (var_esquerda + var_direita), 0.5)
+        nos = np.concatenate([esquerdos, direitos])
+        inicios = np.concatenate([inicios, meios])
+        parcelas = np.concatenate([parcelas * alfa, parcelas * (1 - alfa)])
+    return pesos
+
+
+@measure_time
+def alocacao_hrp(covariancia: np.ndarray, grupos: Optional[np.ndarray] = None,
+                 metodo: str = 'single') -> np.ndarray:
+    """
+    Pesos por Hierarchical Risk Parity (López de Prado, 2016).
+
+    Os ativos são agrupados pela distância de correlação (opcionalmente restrita à taxonomia
+    setorial), ordenados pelas folhas do dendrograma e o capital é dividido em cada nó pelo
+    inverso da variância dos dois ramos. A variância de qualquer trecho contíguo da ordem sai
+    de somas prefixadas 2D da covariância ponderada, então cada nível da árvore é resolvido
+    de uma vez.
+
+    Args:
+        covariancia (np.ndarray): Covariância dos retornos (n × n).
+        grupos (np.ndarray, optional): Códigos de `hierarquia_setorial` para restringir o agrupamento.
+        metodo (str): Método de ligação do scipy ('single', 'average', 'complete', 'ward').
+
+    Returns:
+        np.ndarray: Pesos (somam 1) na ordem das linhas de `covariancia`.
+    """
+    n = len(covariancia)
+    if n == 1:
+        return np.ones(1)
+    ligacoes = linkage(squareform(distancias_correlacao(covariancia, grupos), checks=False), method=metodo)
+
+    # Quase-diagonalização: ativos na ordem das folhas do dendrograma
+    ordem = leaves_list(ligacoes)
+    cov_ordenada = covariancia[np.ix_(ordem, ordem)]
+    inverso = 1 / np.maximum(np.diag(cov_ordenada), 1e-18)
+    # Variância da carteira de inverso da variância em [a, b): soma do bloco de v_i v_j Σ_ij / (Σ v_i)²
+    prefixo_2d = np.zeros((n + 1, n + 1))
+    prefixo_2d[1:, 1:] = (cov_ordenada * np.outer(inverso, inverso)).cumsum(axis=0).cumsum(axis=1)
+    prefixo = np.concatenate([[0.0], np.cumsum(inverso)])
+
+    def variancias_segmento(inicios: np.ndarray, fins: np.ndarray) -> np.ndarray:
+        bloco = prefixo_2d[fins, fins] - prefixo_2d[inicios, fins] - prefixo_2d[fins, inicios] + prefixo_2d[inicios, inicios]
+        return bloco / (prefixo[fins] - prefixo[inicios]) ** 2
+
+    pesos = np.empty(n)
+    pesos[ordem] = _bissecao(ligacoes, variancias_segmento, n)
+    return pesos
+
@@ -0,0 +1,273 @@
+from typing import Any, Dict, List, Optional
+import pandas as pd
+from redis import Redis
+from Findash.utils.logging_tools import logger
+from Findash.services.ticker_service import get_all_sectors, get_sector
+from .data_fetch import obter_painel
+from .indices import kpis_benchmarks_do_store
+from .metrics import agregar_portfolio, calcular_metricas
+from .panel_cache import obter_painel_periodo
+from .result_cache import memoizar_metricas
+from .returns import calcular_retornos_individuais
+from .utils import measure_time
+
+
+def _precos_do_store(store_data: Dict[str, Any], tickers: List[str], quantities: List[float]) -> pd.DataFrame:
+    """
+    Reconstrói os preços (datas × tickers) a partir do dcc.Store, sem acessar o provedor.
+
+    Usa os preços brutos em 'portfolio' quando presentes; caso contrário, divide
+    'portfolio_values' (preço × quantidade) pela quantidade de cada ticker.
+    """
+    brutos = store_data.get('portfolio') or {}
+    valores = store_data.get('portfolio_values') or {}
+    colunas = {}
+    for ticker, qtd in zip(tickers, quantities):
+        if brutos.get(ticker):
+            colunas[ticker] = pd.Series(brutos[ticker], dtype=float)
+        elif valores.get(ticker) and qtd:
+            colunas[ticker] = pd.Series(valores[ticker], dtype=float) / qtd
+        else:
+            colunas[ticker] = pd.Series(dtype=float)
+    return pd.DataFrame(colunas, columns=tickers).sort_index()
+
+
+def _ibov_do_store(store_data: Dict[str, Any]) -> Optional[pd.Series]:
+    """
+    Nível do IBOV a partir do dcc.Store: preços em 'ibov' ou índice reconstruído de 'ibov_return'.
+
+    O retorno diário derivado do índice acumulado (1 + r/100) é o mesmo dos preços originais.
+    """
+    if store_data.get('ibov'):
+        return pd.Series(store_data['ibov'], dtype=float)
+    ibov_return = store_data.get('ibov_return') or []
+    if not ibov_return:
+        return None
+    return pd.Series({p['x']: 1 + p['y'] / 100 for p in ibov_return if p.get('y') is not None}, dtype=float)
+
+
+def _setores(store_data: Dict[str, Any], tickers: List[str], empresas_redis: Redis) -> Dict[str, Any]:
+    """Setores por ticker (reaproveitando a tabela atual) e a lista de setores econômicos."""
+    sectors_data = get_all_sectors(empresas_redis)
+    ticker_to_setor = sectors_data['ticker_to_setor']
+    conhecidos = {row['ticker']: row.get('setor', '') for row in store_data.get('table_data', []) if row.get('ticker') != 'Total'}
+    sectores = {}
+    for ticker in tickers:
+        sector = conhecidos.get(ticker) or ticker_to_setor.get(ticker)
+        if not sector:
+            logger.warning(f"[incremental] Ticker {ticker} não encontrado em ticker_to_setor, usando get_sector")
+            sector = get_sector(ticker, empresas_redis)
+        sectores[ticker] = sector or ''
+    return {'sectores': sectores, 'setores_economicos': sectors_data['setores_economicos']}
+
+
+def _reagregar(store_data: Dict[str, Any], tickers: List[str], quantities: List[float],
+               precos_df: pd.DataFrame, empresas_redis: Redis) -> Dict[str, Any]:
+    """Recalcula apenas os agregados do portfólio e os grava numa cópia do store."""
+    setores = _setores(store_data, tickers, empresas_redis)
+    dividends = store_data.get('dividends', {})
+    agregados = agregar_portfolio(
+        tickers, quantities, precos_df, {t: dividends.get(t, {}) for t in tickers},
+        setores['sectores'], setores['setores_economicos'], _ibov_do_store(store_data),
+        store_data.get('period', 'mensal')
+    )
+    agregados['kpis_por_periodo'] = agregados['kpis_por_periodo'].to_dict(orient='index')
+    # As séries dos benchmarks não dependem da carteira: ficam as do store, só os KPIs relativos mudam
+    agregados['kpis_benchmarks'] = kpis_benchmarks_do_store(
+        agregados['portfolio_daily_return'], store_data.get('benchmark_returns')
+    )
+
+    # A coluna 'acao' da tabela (botão de remoção) é mantida se o store já a utilizava
+    if any('acao' in row for row in store_data.get('table_data', [])):
+        for row in agregados['table_data']:
+            row['acao'] = 'Total' if row['ticker'] == 'Total' else 'x'
+
+    atualizado = dict(store_data)
+    atualizado.update(agregados)
+    atualizado['tickers'] = tickers
+    atualizado['quantities'] = quantities
+    return atualizado
+
+
+@measure_time
+def adicionar_ticker(store_data: Dict[str, Any], ticker: str, quantidade: float,
+                     empresas_redis: Redis) -> Dict[str, Any]:
+    """
+    Inclui um ticker no portfólio baixando apenas esse ticker.
+
+    As séries individuais dos tickers existentes são reaproveitadas do store; somente os
+    agregados (valores, tabela, pesos por setor e KPIs) são recalculados.
+
+    Args:
+        store_data (dict): Conteúdo atual do dcc.Store 'data-store'.
+        ticker (str): Ticker a incluir (e.g., 'PETR4').
+        quantidade (float): Quantidade do novo ticker.
+        empresas_redis (redis.Redis): Conexão Redis para dados de empresas (DB3).
+
+    Returns:
+        dict: Novo conteúdo do store.
+
+    Raises:
+        ValueError: Se o ticker já estiver no portfólio ou não tiver dados no período.
+    """
+    nome = ticker.replace('.SA', '').upper()
+    tickers = list(store_data.get('tickers', []))
+    quantities = list(store_data.get('quantities', []))
+    if nome in tickers:
+        raise ValueError(f"O ticker {nome} já está no portfólio")
+
+    painel, status = obter_painel([nome], store_data['start_date'], store_data['end_date'], include_ibov=False)
+    if status.get(nome) != 'ok':
+        raise ValueError(f"Sem dados para {nome} no período selecionado")
+
+    novo_df = painel.to_frame([nome])
+    precos_df = _precos_do_store(store_data, tickers, quantities).join(novo_df, how='outer').sort_index()
+    tickers.append(nome)
+    quantities.append(quantidade)
+
+    individual_returns, individual_daily_returns = calcular_retornos_individuais([nome], novo_df)
+    dados_novos = painel.to_dados()
+
+    atualizado = dict(store_data)
+    atualizado['individual_returns'] = {
+        **store_data.get('individual_returns', {}),
+        nome: [{'x': k, 'y': v} for k, v in individual_returns[nome].items()]
+    }
+    atualizado['individual_daily_returns'] = {**store_data.get('individual_daily_returns', {}), **individual_daily_returns}
+    atualizado['dividends'] = {**store_data.get('dividends', {}), nome: dados_novos['dividends'][nome]}
+    if 'portfolio' in store_data:
+        atualizado['portfolio'] = {**store_data['portfolio'], nome: dados_novos['portfolio'][nome]}
+
+    logger.info(f"[incremental] {nome} incluído; agregados recalculados para {len(tickers)} tickers")
+    return _reagregar(atualizado, tickers, quantities, precos_df, empresas_redis)
+
+
+@measure_time
+def remover_ticker(store_data: Dict[str, Any], ticker: str, empresas_redis: Redis) -> Dict[str, Any]:
+    """
+    Remove um ticker do portfólio sem nenhuma consulta ao provedor de dados.
+
+    Args:
+        store_data (dict): Conteúdo atual do dcc.Store 'data-store'.
+        ticker (str): Ticker a remover.
+        empresas_redis (redis.Redis): Conexão Redis para dados de empresas (DB3).
+
+    Returns:
+        dict: Novo conteúdo do store.
+
+    Raises:
+        ValueError: Se o ticker não estiver no portfólio ou for o último.
+    """
+    tickers = list(store_data.get('tickers', []))
+    quantities = list(store_data.get('quantities', []))
+    if ticker not in tickers:
+        raise ValueError(f"O ticker {ticker} não está no portfólio")
+    if len(tickers) == 1:
+        raise ValueError("O portfólio precisa de ao menos um ticker")
+
+    posicao = tickers.index(ticker)
+    del tickers[posicao]
+    del quantities[posicao]
+
+    atualizado = dict(store_data)
+    for chave in ('portfolio', 'portfolio_values', 'individual_returns', 'individual_daily_returns', 'dividends'):
+        if chave in store_data:
+            atualizado[chave] = {t: v for t, v in store_data[chave].items() if t != ticker}
+
+    # Datas em que só o ticker removido tinha preço saem do eixo
+    precos_df = _precos_do_store(store_data, tickers, quantities).dropna(how='all')
+
+    logger.info(f"[incremental] {ticker} removido; agregados recalculados para {len(tickers)} tickers")
+    return _reagregar(atualizado, tickers, quantities, precos_df, empresas_redis)
+
+
+@measure_time
+def atualizar_periodo(store_data: Dict[str, Any], start_date: str, end_date: str,
+                      empresas_redis: Redis) -> Dict[str, Any]:
+    """
+    Recalcula o portfólio para um novo período a partir do histórico em cache.
+
+    O painel do período é recortado do histórico do portfólio (ver PanelCache), e os retornos
+    acumulados passam a partir do primeiro dia do novo período. A rede só é usada para
+    trechos do período que nunca foram baixados.
+
+    Args:
+        store_data (dict): Conteúdo atual do dcc.Store 'data-store'.
+        start_date (str): Data inicial (formato 'YYYY-MM-DD').
+        end_date (str): Data final (formato 'YYYY-MM-DD').
+        empresas_redis (redis.Redis): Conexão Redis para dados de empresas (DB3).
+
+    Returns:
+        dict: Novo conteúdo do store.
+
+    Raises:
+        ValueError: Se não houver preços no período.
+    """
+    tickers = list(store_data.get('tickers', []))
+    quantities = list(store_data.get('quantities', []))
+    painel = obter_painel_periodo(tickers, start_date, end_date)
+    if not painel.dias_com_precos().any():
+        raise ValueError(f"Sem dados para o período {start_date} → {end_date}")
+
+    period = store_data.get('period', 'mensal')
+    resultado = memoizar_metricas(
+        tickers, quantities, start_date, end_date, period,
+        lambda: calcular_metricas(painel, tickers, quantities, start_date, end_date, empresas_redis, period=period)
+    )
+    resultado['kpis_por_periodo'] = resultado['kpis_por_periodo'].to_dict(orient='index')
+    dados = painel.to_dados()
+
+    atualizado = dict(store_data)
+    atualizado.update(resultado)
+    atualizado.update(start_date=start_date, end_date=end_date, dividends=dados['dividends'])
+    for chave in ('portfolio', 'ibov'):
+        if chave in store_data:
+            atualizado[chave] = dados[chave]
+    return atualizado
+
+
+@measure_time
+def criar_portfolio(tickers: List[str], quantities: List[float], start_date: str, end_date: str,
+                    empresas_redis: Redis, tickers_limit: Optional[int] = None,
+                    period: str = 'mensal') -> Dict[str, Any]:
+    """
+    Monta o portfólio inicial (conteúdo do store) de um formulário novo.
+
+    O painel vem do PanelCache/PriceStore e as métricas passam pelo ResultCache: portfólios
+    idênticos (mesmos tickers, quantidades e período) enviados por outras sessões reaproveitam
+    o resultado sem recalcular `calcular_metricas`.
+
+    Args:
+        tickers (list): Tickers do portfólio.
+        quantities (list): Quantidades correspondentes.
+        start_date (str): Data inicial (formato 'YYYY-MM-DD').
+        end_date (str): Data final (formato 'YYYY-MM-DD').
+        empresas_redis (redis.Redis): Conexão Redis para dados de empresas (DB3).
+        tickers_limit (int, optional): Limite de tickers do plano do usuário.
+        period (str, optional): Período dos KPIs. Padrão: 'mensal'.
+
+    Returns:
+        dict: Conteúdo do store.
+
+    Raises:
+        ValueError: Se o limite de tickers for excedido ou não houver preços no período.
+    """
+    tickers = [t.replace('.SA', '').upper() for t in tickers]
+    quantities = list(quantities)
+    if tickers_limit is not None and len(tickers) > tickers_limit:
+        raise ValueError(f"Limite de {tickers_limit} tickers excedido")
+    painel = obter_painel_periodo(tickers, start_date, end_date)
+    if not painel.dias_com_precos().any():
+        raise ValueError(f"Sem dados para o período {start_date} → {end_date}")
+
+    resultado = memoizar_metricas(
+        tickers, quantities, start_date, end_date, period,
+        lambda: calcular_metricas(painel, tickers, quantities, start_date, end_date, empresas_redis, period=period)
+    )
+    resultado['kpis_por_periodo'] = resultado['kpis_por_periodo'].to_dict(orient='index')
+
+    portfolio = {'tickers': tickers, 'quantities': quantities, 'start_date': start_date,
+                 'end_date': end_date, 'period': period}
+    portfolio.update(resultado)
+    portfolio.update(painel.to_dados())
+    return portfolio
@@ -0,0 +1,299 @@
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from redis import Redis
+from redis.exceptions import RedisError
+from utils.serialization import orjson_dumps, orjson_loads
+from Findash.utils.logging_tools import logger
+from Findash.utils.instrumentation import contar
+from .data_fetch import obter_historico
+from .price_store import B3_TZ, price_store
+from .returns import calcular_retorno_diario_ibov
+from .single_flight import SingleFlight
+from .trading_calendar import b3_calendar, indice_datetime, para_datetime, para_dias
+from .utils import measure_time
+
+# Benchmarks disponíveis no dashboard. Índices sem histórico no yfinance usam o ETF que os
+# replica; o CDI é aproximado por uma taxa anual constante capitalizada por pregão.
+BENCHMARKS = {
+    'IBOV': {'nome': 'Ibovespa', 'ticker': '^BVSP'},
+    'SMLL': {'nome': 'Small Caps (SMAL11)', 'ticker': 'SMAL11.SA'},
+    'IFIX': {'nome': 'Fundos Imobiliários (XFIX11)', 'ticker': 'XFIX11.SA'},
+    'IDIV': {'nome': 'Dividendos (DIVO11)', 'ticker': 'DIVO11.SA'},
+    'CDI': {'nome': 'CDI', 'ticker': None},
+}
+BENCHMARK_PADRAO = 'IBOV'
+CDI_ANUAL = float(os.getenv('FINDASH_CDI_ANUAL', 0.1065))
+
+# Indicadores de `kpis_relativos`, na ordem exibida na aba Risco
+KPIS_RELATIVOS = ('alpha', 'beta', 'tracking_error', 'information_ratio')
+
+
+def _serie_cdi(start_date: str, end_date: str) -> pd.Series:
+    """Nível do CDI (base 1) em cada pregão de [start_date, end_date), até hoje."""
+    fim = min(para_dias(end_date) - 1, para_dias(datetime.now(B3_TZ).date()))
+    dias = b3_calendar.pregoes_entre(start_date, fim)
+    taxa_diaria = (1 + CDI_ANUAL) ** (1 / 252) - 1
+    return pd.Series((1 + taxa_diaria) ** np.arange(len(dias)), index=para_datetime(dias))
+
+
+def _serie_dos_niveis(niveis: pd.Series) -> pd.DataFrame:
+    if niveis.empty:
+        return pd.DataFrame(columns=['diario', 'acumulado'], index=pd.DatetimeIndex([]), dtype=float)
+    return pd.DataFrame({
+        'diario': niveis.pct_change(),
+        'acumulado': (niveis / niveis.iloc[0] - 1) * 100,
+    })
+
+
+def _calcular_series(codigos: List[str], start_date: str, end_date: str) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
+    """
+    Séries dos benchmarks com uma única consulta ao PriceStore para todos os tickers (os trechos
+    faltantes de todos vão juntos ao provedor).
+
+    Returns:
+        tuple: ({codigo: série}, códigos cujo download falhou). Benchmarks com falha podem
+            ter a série incompleta e não devem ser guardados em cache.
+    """
+    tickers = [BENCHMARKS[c]['ticker'] for c in codigos if BENCHMARKS[c]['ticker']]
+    historico, status = obter_historico(tickers, start_date, end_date) if tickers else ({}, {})
+    series, falhas = {}, []
+    for codigo in codigos:
+        ticker = BENCHMARKS[codigo]['ticker']
+        if ticker is None:
+            series[codigo] = _serie_dos_niveis(_serie_cdi(start_date, end_date))
+            continue
+        if status.get(ticker) == 'erro':
+            logger.warning(f"[benchmarks] Falha ao obter {codigo} ({ticker}) para {start_date} → {end_date}")
+            falhas.append(codigo)
+        series[codigo] = _serie_dos_niveis(historico[ticker]['adj_close'].dropna())
+    return series, falhas
+
+
+def _versao(codigo: str, start_date: str, end_date: str) -> Optional[str]:
+    ticker = BENCHMARKS[codigo]['ticker']
+    return price_store.versao([ticker], start_date, end_date) if ticker else f"cdi:{CDI_ANUAL}"
+
+
+class CacheBenchmarks:
+    """
+    Guarda no Redis as séries de retorno de cada benchmark por período, compartilhadas entre
+    usuários e workers.
+
+    A chave inclui a versão dos preços em cache (ver `PriceStore.versao`); enquanto algum trecho
+    do período ainda não foi baixado, a série é calculada sem ser gravada.
+    """
+
+    def __init__(self, redis_client: Redis, prefixo: str = 'benchmarks', ttl: int = 3600):
+        self.redis = redis_client
+        self.prefixo = prefixo
+        self.ttl = ttl
+
+    def _chave(self, codigo: str, start_date: str, end_date: str, versao: str) -> str:
+        return f"{self.prefixo}:{SingleFlight.gerar_chave(codigo, start_date, end_date, versao)}"
+
+    def ler(self, chave: str) -> Optional[pd.DataFrame]:
+        try:
+            bruto = self.redis.get(chave)
+        except RedisError as e:
+            logger.warning(f"[CacheBenchmarks] Erro ao ler {chave}: {e}")
+            return None
+        if bruto is None:
+            return None
+        dados = orjson_loads(bruto)
+        return pd.DataFrame(
+            {'diario': dados['diario'], 'acumulado': dados['acumulado']},
+            index=para_datetime(np.asarray(dados['dias'], dtype=np.int64)), dtype=float
+        )
+
+    def gravar(self, chave: str, serie: pd.DataFrame) -> None:
+        try:
+            self.redis.setex(chave, self.ttl, orjson_dumps({
+                'dias': para_dias(serie.index),
+                'diario': serie['diario'].to_numpy(dtype=np.float64),
+                'acumulado': serie['acumulado'].to_numpy(dtype=np.float64),
+            }))
+        except RedisError as e:
+            logger.warning(f"[CacheBenchmarks] Erro ao gravar {chave}: {e}")
+
+    def obter(self, codigos: List[str], start_date: str, end_date: str) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
+        """
+        Séries dos benchmarks do cache; as ausentes são calculadas juntas (ver `_calcular_series`)
+        e gravadas, exceto as vazias ou com falha no download.
+
+        Returns:
+            tuple: ({codigo: série}, códigos cujo download falhou).
+        """
+        series, faltantes = {}, []
+        for codigo in codigos:
+            versao = _versao(codigo, start_date, end_date)
+            serie = self.ler(self._chave(codigo, start_date, end_date, versao)) if versao is not None else None
+            if serie is not None:
+                contar('findash_cache_total', cache='benchmarks', resultado='hits')
+                series[codigo] = serie
+            else:
+                contar('findash_cache_total', cache='benchmarks', resultado='misses')
+                faltantes.append(codigo)
+        if not faltantes:
+            return series, []
+
+        calculadas, falhas = _calcular_series(faltantes, start_date, end_date)
+        for codigo, serie in calculadas.items():
+            versao = _versao(codigo, start_date, end_date)
+            if versao is not None and not serie.empty and codigo not in falhas:
+                self.gravar(self._chave(codigo, start_date, end_date, versao), serie)
+        series.update(calculadas)
+        return series, falhas
+
+
+_cache_benchmarks: Optional[CacheBenchmarks] = None
+
+
+def configurar_cache_benchmarks(redis_client: Optional[Redis], **kwargs) -> Optional[CacheBenchmarks]:
+    """
+    Ativa (ou desativa, com None) o cache compartilhado das séries dos benchmarks.
+
+    Args:
+        redis_client (redis.Redis): Conexão Redis compartilhada entre os workers.
+        **kwargs: Parâmetros repassados para CacheBenchmarks.
+
+    Returns:
+        CacheBenchmarks: Instância configurada, ou None se desativado.
+    """
+    global _cache_benchmarks
+    _cache_benchmarks = CacheBenchmarks(redis_client, **kwargs) if redis_client is not None else None
+    return _cache_benchmarks
+
+
+def series_benchmarks(codigos: List[str], start_date: str, end_date: str) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
+    """
+    Retornos dos benchmarks no período [start_date, end_date), com uma única consulta ao
+    provedor para todos os que não estão em cache.
+
+    Args:
+        codigos (list): Chaves de BENCHMARKS (e.g., ['IBOV', 'CDI']).
+        start_date (str): Data inicial (formato 'YYYY-MM-DD').
+        end_date (str): Data final exclusiva (formato 'YYYY-MM-DD').
+
+    Returns:
+        tuple: ({codigo: DataFrame com índice datetime e colunas 'diario' (decimal, NaN no
+            primeiro dia) e 'acumulado' (% desde o primeiro dia do período)}, códigos cujo
+            download falhou).
+    """
+    if _cache_benchmarks is None:
+        return _calcular_series(codigos, start_date, end_date)
+    return _cache_benchmarks.obter(codigos, start_date, end_date)
+
+
+def _retornos_carteira(portfolio_daily_return: Dict[str, float]) -> pd.Series:
+    retornos = pd.Series(portfolio_daily_return, dtype=float).sort_index() / 100
+    retornos.index = indice_datetime(retornos.index)
+    return retornos
+
+
+@measure_time
+def kpis_relativos(retornos: pd.Series, benchmarks: pd.DataFrame) -> Dict[str, Dict[str, float]]:
+    """
+    Alpha, beta, tracking error e information ratio do portfólio contra vários benchmarks
+    numa única passada vetorizada.
+
+    Cada benchmark usa apenas os dias em que ele e o portfólio têm retorno. Alpha e beta seguem
+    as definições de `calcular_kpis`; o tracking error é o desvio padrão anualizado do retorno
+    ativo (portfólio - benchmark) e o information ratio, o retorno ativo anualizado dividido
+    pelo tracking error.
+
+    Args:
+        retornos (pd.Series): Retornos diários (decimais) do portfólio, com índice datetime.
+        benchmarks (pd.DataFrame): Retornos diários (decimais) dos benchmarks, um por coluna.
+
+    Returns:
+        dict: {benchmark: {kpi: valor}} com os KPIs de KPIS_RELATIVOS (NaN se indefinido).
+    """
+    alinhados = benchmarks.reindex(retornos.index).to_numpy(dtype=np.float64)
+    carteira = retornos.to_numpy(dtype=np.float64)[:, None]
+    pares = ~np.isnan(alinhados) & ~np.isnan(carteira)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        n = pares.sum(axis=0).astype(float)
+        p = np.where(pares, carteira, 0.0)
+        b = np.where(pares, alinhados, 0.0)
+        media_p = p.sum(axis=0) / n
+        media_b = b.sum(axis=0) / n
+        desvio_p = np.where(pares, p - media_p, 0.0)
+        desvio_b = np.where(pares, b - media_b, 0.0)
+        covariancia = (desvio_p * desvio_b).sum(axis=0) / (n - 1)
+        variancia_b = (desvio_b ** 2).sum(axis=0) / (n - 1)
+        beta = np.where(np.isclose(variancia_b, 0), np.nan, covariancia / variancia_b)
+        alpha = (media_p - beta * media_b) * 252
+
+        ativo = p - b
+        media_ativo = ativo.sum(axis=0) / n
+        desvio_ativo = np.where(pares, ativo - media_ativo, 0.0)
+        tracking_error = np.sqrt((desvio_ativo ** 2).sum(axis=0) / (n - 1)) * np.sqrt(252)
+        information_ratio = np.where(np.isclose(tracking_error, 0), np.nan, media_ativo * 252 / tracking_error)
+
+    insuficiente = n < 2
+    kpis = {'alpha': alpha, 'beta': beta, 'tracking_error': tracking_error, 'information_ratio': information_ratio}
+    return {
+        codigo: {nome: float('nan') if insuficiente[j] else float(valores[j]) for nome, valores in kpis.items()}
+        for j, codigo in enumerate(benchmarks.columns)
+    }
+
+
+@measure_time
+def comparar_benchmarks(portfolio_daily_return: Dict[str, float], start_date: str, end_date: str,
+                        codigos: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Séries acumuladas dos benchmarks e KPIs relativos do portfólio contra cada um, para o store.
+
+    Benchmarks sem dados no período ficam de fora; os que falharam no provedor são listados em
+    'benchmarks_com_falha' (o resultado não deve ser guardado em cache).
+
+    Args:
+        portfolio_daily_return (dict): Retornos diários do portfólio em % ({data: retorno}).
+        start_date (str): Data inicial (formato 'YYYY-MM-DD').
+        end_date (str): Data final exclusiva (formato 'YYYY-MM-DD').
+        codigos (list, optional): Benchmarks a incluir. Padrão: todos de BENCHMARKS.
+
+    Returns:
+        dict: 'benchmark_returns' ({benchmark: {data: retorno acumulado %}}) e
+            'kpis_benchmarks' ({benchmark: {kpi: valor}}) e 'benchmarks_com_falha' (list).
+    """
+    series, falhas = series_benchmarks(list(codigos or BENCHMARKS), start_date, end_date)
+    diarios, acumulados = {}, {}
+    for codigo, serie in series.items():
+        if serie.empty:
+            continue
+        diarios[codigo] = serie['diario']
+        # Sem arredondamento: os KPIs relativos das inclusões/remoções de tickers partem destas séries
+        acumulados[codigo] = dict(zip(serie.index.strftime('%Y-%m-%d'), serie['acumulado'].tolist()))
+
+    resultado = {'benchmark_returns': acumulados, 'kpis_benchmarks': {}, 'benchmarks_com_falha': falhas}
+    if diarios and portfolio_daily_return:
+        resultado['kpis_benchmarks'] = kpis_relativos(_retornos_carteira(portfolio_daily_return), pd.DataFrame(diarios))
+    return resultado
+
+
+def kpis_benchmarks_do_store(portfolio_daily_return: Dict[str, float],
+                             benchmark_returns: Dict[str, Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    """
+    KPIs relativos do portfólio contra as séries dos benchmarks já gravadas no store, sem
+    consultar o cache de benchmarks nem o provedor (inclusão/remoção de tickers).
+
+    Args:
+        portfolio_daily_return (dict): Retornos diários do portfólio em % ({data: retorno}).
+        benchmark_returns (dict): {benchmark: {data: retorno acumulado %}} do store.
+
+    Returns:
+        dict: {benchmark: {kpi: valor}}, como em `comparar_benchmarks`.
+    """
+    # Mesma reconstrução da aba Risco: retornos diários do índice acumulado (1 + r/100)
+    diarios = {
+        codigo: calcular_retorno_diario_ibov(1 + pd.Series(serie, dtype=float) / 100)
+        for codigo, serie in (benchmark_returns or {}).items() if serie
+    }
+    if not diarios or not portfolio_daily_return:
+        return {}
+    return kpis_relativos(_retornos_carteira(portfolio_daily_return), pd.DataFrame(diarios))
@@ -3,31 +3,23 @@ import pandas as pd
 import numpy as np
 from Findash.utils.logging_tools import logger
 from .utils import measure_time
+from .trading_calendar import PERIODOS, agrupar_por_periodo, indice_datetime, para_dias
 
 # Função auxiliar para garantir índice datetime
 def ensure_datetime_index(series: pd.Series) -> pd.Series:
     if not isinstance(series.index, pd.DatetimeIndex):
-        series.index = pd.to_datetime(series.index)
+        series.index = indice_datetime(series.index)
     return series
 
+# KPIs calculados por calcular_kpis/kpis_agrupados, na ordem das linhas de calcular_kpis_por_periodo
+KPI_NOMES = ('sharpe', 'sortino', 'volatilidade', 'max_drawdown', 'retorno_medio_anual', 'alpha', 'beta')
+
 # Função auxiliar para calcular drawdown 
 def calcular_max_drawdown(retornos: pd.Series) -> float:
     cum_returns = (1 + retornos).cumprod()
     drawdown = (cum_returns / cum_returns.cummax()) - 1
     return drawdown.min() if not drawdown.empty else 0
 
-# Função auxiliar para formatar períodos
-def formatar_periodo(ts: pd.Timestamp, tipo: str) -> str:
-    if tipo == 'mensal':
-        return ts.strftime('%Y-%m')
-    elif tipo == 'trimestral':
-        return f"{ts.year}-Q{(ts.month - 1) // 3 + 1}"
-    elif tipo == 'semestral':
-        return f"{ts.year}-S{(ts.month - 1) // 6 + 1}"
-    elif tipo == 'anual':
-        return str(ts.year)
-    return str(ts)
-
 @measure_time
 def calcular_kpis(portfolio_daily_returns, benchmark_daily_returns=None):
     """
@@ -79,6 +71,84 @@ def calcular_kpis(portfolio_daily_returns, benchmark_daily_returns=None):
 
     return metrics
 
+def kpis_agrupados(retornos: np.ndarray, grupos: np.ndarray, n_grupos: int,
+                   benchmark: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Calcula todos os KPIs de todos os grupos numa única passada vetorizada.
+
+    Mesmas definições de `calcular_kpis`, aplicadas a cada grupo: médias, variâncias e
+    covariâncias por somas agrupadas (np.bincount) e drawdown pelo máximo acumulado por grupo.
+
+    Args:
+        retornos (np.ndarray): Retornos diários (decimais), sem NaN, agrupados de forma contígua.
+        grupos (np.ndarray): Índice do grupo de cada retorno (0..n_grupos-1), não decrescente.
+        n_grupos (int): Quantidade de grupos.
+        benchmark (np.ndarray, optional): Retornos do benchmark alinhados a `retornos` (NaN = ausente).
+
+    Returns:
+        dict: {kpi: array com um valor por grupo}, na ordem de KPI_NOMES.
+    """
+    def somar(valores, mascara=None):
+        pesos = valores if mascara is None else np.where(mascara, valores, 0.0)
+        return np.bincount(grupos, weights=pesos, minlength=n_grupos)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        n = np.bincount(grupos, minlength=n_grupos).astype(float)
+        media = somar(retornos) / n
+        desvios = retornos - media[grupos]
+        variancia = somar(desvios ** 2) / (n - 1)
+        variancia[n < 2] = np.nan
+
+        retorno_medio_anual = media * 252
+        volatilidade = np.sqrt(variancia) * np.sqrt(252)
+        sharpe = np.where(np.isclose(volatilidade, 0), np.nan, retorno_medio_anual / volatilidade)
+
+        negativos = retornos < 0
+        downside = np.sqrt(somar(retornos ** 2, negativos) / n) * np.sqrt(252)
+        downside[somar(np.ones_like(retornos), negativos) == 0] = 0.0
+        sortino = np.where(np.isclose(downside, 0), np.nan, retorno_medio_anual / downside)
+
+        # Drawdown: log do acumulado dentro do grupo; o deslocamento por grupo faz o máximo
+        # acumulado global funcionar como máximo acumulado por grupo
+        log_acumulado = np.cumsum(np.log1p(retornos))
+        inicios = np.flatnonzero(np.r_[True, np.diff(grupos) != 0])
+        base = np.r_[0.0, log_acumulado][inicios]
+        log_acumulado = log_acumulado - np.repeat(base, np.diff(np.r_[inicios, len(retornos)]))
+        amplitude = (log_acumulado.max() - log_acumulado.min() + 1.0) if len(retornos) else 1.0
+        deslocado = log_acumulado + grupos * amplitude
+        drawdown = np.expm1(deslocado - np.maximum.accumulate(deslocado))
+        max_drawdown = np.zeros(n_grupos)
+        if len(retornos):
+            max_drawdown[grupos[inicios]] = np.minimum.reduceat(drawdown, inicios)
+
+        alpha = np.full(n_grupos, np.nan)
+        beta = np.full(n_grupos, np.nan)
+        if benchmark is not None:
+            pares = ~np.isnan(benchmark)
+            bench = np.where(pares, benchmark, 0.0)
+            n_pares = somar(np.ones_like(retornos), pares)
+            media_p = somar(retornos, pares) / n_pares
+            media_b = somar(bench, pares) / n_pares
+            desvio_p = np.where(pares, retornos - media_p[grupos], 0.0)
+            desvio_b = np.where(pares, bench - media_b[grupos], 0.0)
+            covariancia = somar(desvio_p * desvio_b) / (n_pares - 1)
+            variancia_b = somar(desvio_b ** 2) / (n_pares - 1)
+            covariancia[n_pares < 2] = np.nan
+            variancia_b[n_pares < 2] = np.nan
+            beta = np.where(np.isclose(variancia_b, 0), np.nan, covariancia / variancia_b)
+            alpha = (media_p - beta * media_b) * 252
+
+    return {
+        'sharpe': sharpe,
+        'sortino': sortino,
+        'volatilidade': volatilidade,
+        'max_drawdown': max_drawdown,
+        'retorno_medio_anual': retorno_medio_anual,
+        'alpha': alpha,
+        'beta': beta,
+    }
+
+
 @measure_time
 def calcular_kpis_por_periodo(portfolio_daily_returns, period: str, benchmark_daily_returns=None):
     """
@@ -92,48 +162,73 @@ def calcular_kpis_por_periodo(portfolio_daily_returns, period: str, benchmark_da
     Returns:
         pd.DataFrame: KPIs nas linhas, períodos nas colunas.
     """
-    portfolio_daily_returns = ensure_datetime_index(portfolio_daily_returns)
-    if benchmark_daily_returns is not None:
-        benchmark_daily_returns = ensure_datetime_index(benchmark_daily_returns)
+    if period not in PERIODOS:
+        raise ValueError("Período deve ser 'mensal', 'trimestral', 'semestral' ou 'anual'")
 
-    period_map = {
-        'mensal': 'ME',
-        'trimestral': 'QE',
-        'semestral': '6ME',
-        'anual': 'YE'
-    }
+    return calcular_kpis_todos_periodos(portfolio_daily_returns, benchmark_daily_returns, periodos=(period,)).get(period, pd.DataFrame())
 
-    if period not in period_map:
-        raise ValueError("Período deve ser 'mensal', 'trimestral', 'semestral' ou 'anual'")
 
-    freq = period_map[period]
-    grouped_returns = portfolio_daily_returns.groupby(pd.Grouper(freq=freq))
-    grouped_keys = list(grouped_returns.groups.keys())
-    if not grouped_keys:
-        return pd.DataFrame()
+@measure_time
+def calcular_kpis_todos_periodos(portfolio_daily_returns, benchmark_daily_returns=None,
+                                 periodos=PERIODOS) -> Dict[str, pd.DataFrame]:
+    """
+    Calcula as tabelas de KPIs de vários períodos numa única chamada de `kpis_agrupados`.
 
-    grouped_benchmark = (
-        benchmark_daily_returns.groupby(pd.Grouper(freq=freq))
-        if benchmark_daily_returns is not None else None
-    )
+    Os grupos de todos os períodos são concatenados (com deslocamento) num só eixo, de modo que
+    mensal, trimestral, semestral e anual saem da mesma passada.
 
-    # Pega os KPIs diretamente de uma execução modelo para evitar inconsistência futura
-    kpis_exemplo = calcular_kpis(pd.Series([0.0]), pd.Series([0.0]))
-    kpis = list(kpis_exemplo.keys())
+    Args:
+        portfolio_daily_returns (pd.Series): Retornos diários do portfólio.
+        benchmark_daily_returns (pd.Series): Retornos diários do benchmark (opcional).
+        periodos (tuple): Períodos desejados. Padrão: todos.
 
-    # Geração das colunas com função auxiliar
-    columns = [formatar_periodo(pd.Timestamp(g), period) for g in grouped_keys]
-    result = pd.DataFrame(index=kpis, columns=columns)
+    Returns:
+        dict: {periodo: DataFrame com KPIs nas linhas e períodos nas colunas}; vazio se não houver retornos.
+    """
+    portfolio_daily_returns = ensure_datetime_index(portfolio_daily_returns).sort_index().dropna()
+    if portfolio_daily_returns.empty:
+        return {}
 
-    for name, group in grouped_returns:
-        period_label = formatar_periodo(pd.Timestamp(name), period)
-        benchmark_group = (
-            grouped_benchmark.get_group(name) if benchmark_daily_returns is not None and name in grouped_benchmark.groups else None
-        )
-        period_metrics = calcular_kpis(group, benchmark_group)
+    retornos = portfolio_daily_returns.to_numpy(dtype=float)
+    benchmark = None
+    if benchmark_daily_returns is not None:
+        benchmark_daily_returns = ensure_datetime_index(benchmark_daily_returns)
+        benchmark = benchmark_daily_returns.reindex(portfolio_daily_returns.index).to_numpy(dtype=float)
+
+    # Períodos de calendário (semestres em jan-jun/jul-dez) a partir do calendário da B3
+    dias = para_dias(portfolio_daily_returns.index)
+    blocos = [agrupar_por_periodo(dias, periodo) for periodo in periodos]
+    deslocamentos = np.cumsum([0] + [len(rotulos) for _, rotulos in blocos])
+    grupos = np.concatenate([g + d for (g, _), d in zip(blocos, deslocamentos)])
+
+    kpis = kpis_agrupados(
+        np.tile(retornos, len(periodos)), grupos, int(deslocamentos[-1]),
+        np.tile(benchmark, len(periodos)) if benchmark is not None else None
+    )
+    matriz = np.vstack([kpis[k] for k in KPI_NOMES])
+    return {
+        periodo: pd.DataFrame(
+            matriz[:, deslocamentos[i]:deslocamentos[i + 1]], index=list(KPI_NOMES), columns=rotulos
+        ).astype(float).round(4)
+        for i, (periodo, (_, rotulos)) in enumerate(zip(periodos, blocos))
+    }
 
-        for kpi in kpis:
-            result.loc[kpi, period_label] = period_metrics.get(kpi, np.nan)
 
-    return result.astype(float).round(4)
-    
\ No newline at end of file
+def compactar_kpis_periodos(tabelas: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
+    """
+    Formato compacto (colunar) das tabelas de KPIs por período para o dcc.Store.
+
+    Returns:
+        dict: {'kpis': [nomes], 'periodos': {periodo: {'colunas': [rótulos], 'valores': [[...] por KPI]}}},
+              com None no lugar de NaN.
+    """
+    return {
+        'kpis': list(KPI_NOMES),
+        'periodos': {
+            periodo: {
+                'colunas': list(tabela.columns),
+                'valores': tabela.reindex(list(KPI_NOMES)).astype(object).where(tabela.notna(), None).values.tolist(),
+            }
+            for periodo, tabela in tabelas.items()
+        },
+    }
@@ -1,15 +1,19 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 import pandas as pd
 from redis import Redis
 from Findash.utils.logging_tools import logger
 from Findash.services.ticker_service import get_all_sectors, get_sector
 from .returns import calcular_retornos_individuais, calcular_retornos_portfolio, calcular_retorno_ibov, calcular_retorno_diario_ibov
 from .metrics_calc import calcular_pesos_por_setor, calcular_metricas_tabela
-from .kpis_calc import calcular_kpis, calcular_kpis_por_periodo
+from .kpis_calc import calcular_kpis, calcular_kpis_todos_periodos, compactar_kpis_periodos
+from .drawdown import calcular_drawdowns
+from .indices import comparar_benchmarks
+from .panel import PricePanel
+from .trading_calendar import indice_datetime
 from .utils import measure_time
 
 @measure_time
-def calcular_metricas(portfolio: Dict[str, Any], tickers: List[str], quantities: List[float], 
+def calcular_metricas(portfolio: Union[Dict[str, Any], PricePanel], tickers: List[str], quantities: List[float], 
                       start_date: str, end_date: str, empresas_redis: Redis, 
                       ibov: Optional[Dict[str, float]] = None, 
                       dividends: Optional[Dict[str, Any]] = None,
@@ -19,14 +23,15 @@ def calcular_metricas(portfolio: Dict[str, Any], tickers: List[str], quantities:
     Calcula métricas do portfólio, incluindo tabela, retornos e pesos por setor.
     
     Args:
-        portfolio (dict): Dicionário de preços {ticker: {data: preço}}.
+        portfolio (PricePanel | dict): Painel de preços (ver `obter_painel`) ou, no formato
+            legado, dicionário de preços {ticker: {data: preço}}.
         tickers (list): Lista de tickers.
         quantities (list): Lista de quantidades correspondentes aos tickers.
         start_date (str): Data inicial no formato 'YYYY-MM-DD'.
         end_date (str): Data final no formato 'YYYY-MM-DD'.
         empresas_redis (redis.Redis): Conexão Redis para dados de empresas (DB3).
-        ibov (dict, optional): Dicionário de preços do IBOV {data: preço}.
-        dividends (dict, optional): Dicionário de dividendos por ticker.
+        ibov (dict, optional): Dicionário de preços do IBOV {data: preço} (ignorado se `portfolio` for um PricePanel).
+        dividends (dict, optional): Dicionário de dividendos por ticker (ignorado se `portfolio` for um PricePanel).
         period (str, optional): Período para KPIs ('mensal', 'trimestral', 'semestral', 'anual'). Padrão: 'mensal'.
     
     Returns:
@@ -42,13 +47,19 @@ def calcular_metricas(portfolio: Dict[str, Any], tickers: List[str], quantities:
             - setor_pesos_financeiros: Pesos por setor (por valor financeiro).
             - kpis: Indicadores financeiros.
             - kpis_por_periodo: KPIs por período (DataFrame com KPIs nas linhas, períodos nas colunas).
+            - kpis_periodos: Tabelas de KPIs dos quatro períodos, no formato compacto para o store.
+            - drawdowns: Curvas underwater e piores episódios de drawdown do portfólio e de cada ticker.
+            - benchmark_returns: Retorno acumulado de cada benchmark (ver `comparar_benchmarks`).
+            - kpis_benchmarks: Alpha, beta, tracking error e information ratio contra cada benchmark.
+            - benchmarks_com_falha: Benchmarks que não puderam ser baixados (resultado não é memoizado).
     """
     sectors_data = get_all_sectors(empresas_redis)
     setores_economicos = sectors_data['setores_economicos']
     ticker_to_setor = sectors_data['ticker_to_setor']
 
-    if not tickers or not quantities or len(tickers) != len(quantities) or not portfolio:
-        logger.error(f"[calcular_metricas] Entrada inválida: tickers={len(tickers)}, quantities={len(quantities)}, portfolio_vazio={not portfolio}")
+    portfolio_vazio = not portfolio.tickers if isinstance(portfolio, PricePanel) else not portfolio
+    if not tickers or not quantities or len(tickers) != len(quantities) or portfolio_vazio:
+        logger.error(f"[calcular_metricas] Entrada inválida: tickers={len(tickers)}, quantities={len(quantities)}, portfolio_vazio={portfolio_vazio}")
         return {
             'table_data': [],
             'portfolio_return': {},
@@ -60,19 +71,21 @@ def calcular_metricas(portfolio: Dict[str, Any], tickers: List[str], quantities:
             'setor_pesos': {setor: 0.0 for setor in setores_economicos},
             'setor_pesos_financeiros': {setor: 0.0 for setor in setores_economicos},
             'kpis': {},
-            'kpis_por_periodo': pd.DataFrame()
+            'kpis_por_periodo': pd.DataFrame(),
+            'kpis_periodos': compactar_kpis_periodos({}),
+            'drawdowns': {'underwater': {}, 'episodios': {}},
+            'benchmark_returns': {},
+            'kpis_benchmarks': {},
+            'benchmarks_com_falha': []
         }
     if not empresas_redis:
         logger.error("[calcular_metricas] empresas_redis não fornecido")
         raise ValueError("Conexão Redis (empresas_redis) é obrigatória")
 
-    precos_df = pd.DataFrame(portfolio)
-    precos_df = precos_df[tickers]
-    precos_df.index = pd.to_datetime(precos_df.index).strftime('%Y-%m-%d')
-
-    quantities_dict = dict(zip(tickers, quantities))
-    portfolio_values = precos_df * pd.Series(quantities_dict)
-    portfolio_values_dict = portfolio_values.to_dict()
+    # Entrada legada (dicionários por data) é convertida uma única vez para o painel compacto
+    painel = portfolio if isinstance(portfolio, PricePanel) else PricePanel.from_dados(portfolio, ibov, dividends)
+    precos_df = painel.to_frame(tickers)
+    ibov_series = painel.serie_benchmark()
 
     sectores = {}
     for ticker in tickers:
@@ -82,55 +95,116 @@ def calcular_metricas(portfolio: Dict[str, Any], tickers: List[str], quantities:
             sector = get_sector(ticker, empresas_redis)
         sectores[ticker] = sector or ''
 
-    setor_pesos, setor_pesos_financeiros = calcular_pesos_por_setor(
-        tickers, quantities, precos_df, setores_economicos, sectores
-    )
-    
-    ticker_metrics = calcular_metricas_tabela(tickers, quantities, precos_df, dividends, sectores)
-
     individual_returns, individual_daily_returns = calcular_retornos_individuais(tickers, precos_df)
     individual_returns = {
         ticker: [{'x': k, 'y': v} for k, v in returns.items()]
         for ticker, returns in individual_returns.items()
     }
 
+    ibov_return = calcular_retorno_ibov(ibov_series)
+    ibov_return = [
+        {'x': k, 'y': v}
+        for k, v in ibov_return.items()
+    ]
+
+    agregados = agregar_portfolio(
+        tickers, quantities, precos_df, painel.dividendos_totais(), sectores, setores_economicos,
+        ibov_series, period
+    )
+    benchmarks = comparar_benchmarks(agregados['portfolio_daily_return'], start_date, end_date)
+
+    return {
+        'table_data': agregados['table_data'],
+        'portfolio_return': agregados['portfolio_return'],
+        'individual_returns': individual_returns,
+        'portfolio_daily_return': agregados['portfolio_daily_return'],
+        'individual_daily_returns': individual_daily_returns,
+        'ibov_return': ibov_return,
+        'portfolio_values': agregados['portfolio_values'],
+        'setor_pesos': agregados['setor_pesos'],
+        'setor_pesos_financeiros': agregados['setor_pesos_financeiros'],
+        'kpis': agregados['kpis'],
+        'kpis_por_periodo': agregados['kpis_por_periodo'],
+        'kpis_periodos': agregados['kpis_periodos'],
+        'drawdowns': agregados['drawdowns'],
+        'benchmark_returns': benchmarks['benchmark_returns'],
+        'kpis_benchmarks': benchmarks['kpis_benchmarks'],
+        'benchmarks_com_falha': benchmarks['benchmarks_com_falha']
+    }
+
+
+@measure_time
+def agregar_portfolio(tickers: List[str], quantities: List[float], precos_df: pd.DataFrame,
+                      dividends: Dict[str, Any], sectores: Dict[str, str], setores_economicos: List[str],
+                      ibov_series: Optional[pd.Series] = None, period: str = 'mensal') -> Dict[str, Any]:
+    """
+    Calcula as métricas agregadas do portfólio (tabela, valores, pesos por setor e KPIs).
+
+    Não depende das séries individuais por ticker, por isso é reutilizada nas atualizações
+    incrementais (inclusão/remoção de ticker) sem recalcular o restante do portfólio.
+
+    Args:
+        tickers (list): Lista de tickers.
+        quantities (list): Lista de quantidades correspondentes aos tickers.
+        precos_df (DataFrame): Preços com tickers como colunas e índice 'YYYY-MM-DD'.
+        dividends (dict): Dividendos por ticker ({ticker: {data: valor}} ou total por ação).
+        sectores (dict): Dicionário de setores {ticker: setor}.
+        setores_economicos (list): Lista de setores econômicos.
+        ibov_series (pd.Series, optional): Nível do IBOV (preço ou índice acumulado) por data.
+        period (str, optional): Período para KPIs. Padrão: 'mensal'.
+
+    Returns:
+        dict: table_data, portfolio_return, portfolio_daily_return, portfolio_values,
+            setor_pesos, setor_pesos_financeiros, kpis, kpis_por_periodo (tabela de `period`),
+            kpis_periodos (todos os períodos, formato compacto) e drawdowns (portfólio e tickers).
+    """
+    quantities_dict = dict(zip(tickers, quantities))
+    portfolio_values = precos_df * pd.Series(quantities_dict)
+    portfolio_values_dict = portfolio_values.to_dict()
+
+    setor_pesos, setor_pesos_financeiros = calcular_pesos_por_setor(
+        tickers, quantities, precos_df, setores_economicos, sectores
+    )
+    
+    ticker_metrics = calcular_metricas_tabela(tickers, quantities, precos_df, dividends, sectores)
+
     portfolio_return, portfolio_daily_return = calcular_retornos_portfolio(tickers, quantities, portfolio_values)
     portfolio_return = [
         {'x': k, 'y': v}
         for k, v in portfolio_return.items()
     ]
 
-    ibov_return = calcular_retorno_ibov(ibov)
-    ibov_return = [
-        {'x': pd.to_datetime(k).strftime('%Y-%m-%d'), 'y': v}
-        for k, v in ibov_return.items()
-    ]
-
     portfolio_returns_series = pd.Series(portfolio_daily_return).sort_index()
-    portfolio_returns_series.index = pd.to_datetime(portfolio_returns_series.index)
+    portfolio_returns_series.index = indice_datetime(portfolio_returns_series.index)
     portfolio_returns_series = portfolio_returns_series / 100
 
     benchmark_returns_series = None
-    if ibov:
-        benchmark_returns_series = calcular_retorno_diario_ibov(ibov)
-        benchmark_returns_series = benchmark_returns_series.loc[portfolio_returns_series.index]
+    if ibov_series is not None and len(ibov_series):
+        benchmark_returns_series = calcular_retorno_diario_ibov(ibov_series)
+        benchmark_returns_series = benchmark_returns_series.reindex(portfolio_returns_series.index)
 
     kpis = calcular_kpis(portfolio_returns_series, benchmark_returns_series)
     logger.info("KPIs calculados: " + ", ".join(f"{k}: {v:.4f}" for k, v in kpis.items()))
 
-    kpis_por_periodo = calcular_kpis_por_periodo(portfolio_returns_series, period, benchmark_returns_series)
+    # Os quatro períodos saem de uma só passada; a troca de período no grid é feita no navegador
+    tabelas_periodos = calcular_kpis_todos_periodos(portfolio_returns_series, benchmark_returns_series)
+    kpis_por_periodo = tabelas_periodos.get(period, pd.DataFrame())
     logger.info(f"KPIs por período ({period}) calculados: {kpis_por_periodo.shape}")
 
+    # Drawdowns do portfólio (valor total) e de cada ticker (preço), guardados com o portfólio
+    niveis = precos_df[tickers].copy()
+    niveis.insert(0, 'Portfólio', portfolio_values.sum(axis=1))
+    drawdowns = calcular_drawdowns(niveis)
+
     return {
         'table_data': ticker_metrics,
         'portfolio_return': portfolio_return,
-        'individual_returns': individual_returns,
         'portfolio_daily_return': portfolio_daily_return,
-        'individual_daily_returns': individual_daily_returns,
-        'ibov_return': ibov_return,
         'portfolio_values': portfolio_values_dict,
         'setor_pesos': setor_pesos,
         'setor_pesos_financeiros': setor_pesos_financeiros,
         'kpis': kpis,
-        'kpis_por_periodo': kpis_por_periodo
-    }
\ No newline at end of file
+        'kpis_por_periodo': kpis_por_periodo,
+        'kpis_periodos': compactar_kpis_periodos(tabelas_periodos),
+        'drawdowns': drawdowns
+    }
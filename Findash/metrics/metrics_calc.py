@@ -55,7 +55,7 @@ def calcular_metricas_tabela(tickers: List[str], quantities: List[float], precos
         tickers (list): Lista de tickers.
         quantities (list): Lista de quantidades correspondentes aos tickers.
         precos_df (DataFrame): DataFrame com preços, tickers como colunas.
-        dividends (dict, optional): Dicionário de dividendos por ticker.
+        dividends (dict, optional): Dividendos por ticker: {ticker: {data: valor}} ou total por ação {ticker: valor}.
         sectores (dict, optional): Dicionário de setores {ticker: setor}.
     
     Returns:
@@ -66,10 +66,11 @@ def calcular_metricas_tabela(tickers: List[str], quantities: List[float], precos
     preco_final = precos_df.iloc[-1].reindex(tickers) if not precos_df.empty else pd.Series(index=tickers, dtype=float)
 
     ganho_capital = ((preco_final - preco_inicial) * quantities_series).fillna(0.0)
+    dividends = dividends or {}
     proventos = pd.Series({
-        t: sum(dividends[t].values()) * quantities_series[t]
+        t: (sum(dividends[t].values()) if isinstance(dividends[t], dict) else dividends[t]) * quantities_series[t]
         for t in tickers if t in dividends
-    }).reindex(tickers, fill_value=0.0)
+    }, dtype=float).reindex(tickers, fill_value=0.0)
 
     df = pd.DataFrame({
         'ticker': tickers,
@@ -0,0 +1,293 @@
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from redis import Redis
+from redis.exceptions import RedisError
+from Findash.utils.logging_tools import logger
+from Findash.utils.instrumentation import contar
+from .data_fetch import versao_precos
+from .hrp import alocacao_hrp, hierarquia_setorial
+from .single_flight import SingleFlight
+from .utils import measure_time
+from .var import matriz_retornos
+
+PONTOS_FRONTEIRA = int(os.getenv('FINDASH_FRONTEIRA_PONTOS', 40))
+MAX_ITERACOES = int(os.getenv('FINDASH_OTIMIZACAO_ITERACOES', 2000))
+TOLERANCIA = 1e-7
+# Busca do máximo Sharpe: pontos entre os vizinhos do melhor ponto, em rodadas sucessivas
+PONTOS_REFINO = 8
+RODADAS_REFINO = 3
+
+
+def estimar_parametros(retornos: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Retorno médio e matriz de covariância anualizados (252 pregões) dos retornos diários.
+
+    Args:
+        retornos (pd.DataFrame): Retornos diários (decimais), datas × tickers.
+
+    Returns:
+        tuple: (média por ticker, covariância tickers × tickers).
+    """
+    matriz = matriz_retornos(retornos)
+    media = matriz.mean(axis=0) * 252
+    covariancia = np.atleast_2d(np.cov(matriz, rowvar=False)) * 252
+    return media, covariancia
+
+
+class CacheCovariancia:
+    """
+    Guarda no Redis o retorno médio e a covariância dos tickers por período, para que o
+    otimizador não recalcule a matriz (O(dias × tickers²)) a cada interação.
+
+    A chave inclui a ordem dos tickers e a versão dos preços em cache (ver `PriceStore.versao`);
+    enquanto algum trecho do período ainda não foi baixado, as estimativas não são gravadas.
+    Os valores ficam em float64 binário: média (n) seguida da covariância (n × n).
+    """
+
+    def __init__(self, redis_client: Redis, prefixo: str = 'covariancia', ttl: int = 3600):
+        self.redis = redis_client
+        self.prefixo = prefixo
+        self.ttl = ttl
+
+    def _chave(self, tickers: List[str], start_date: str, end_date: str, versao: str) -> str:
+        return f"{self.prefixo}:{SingleFlight.gerar_chave(list(tickers), start_date, end_date, versao)}"
+
+    def ler(self, chave: str, n: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        try:
+            bruto = self.redis.get(chave)
+        except RedisError as e:
+            logger.warning(f"[CacheCovariancia] Erro ao ler {chave}: {e}")
+            return None
+        if bruto is None:
+            return None
+        valores = np.frombuffer(bruto, dtype=np.float64)
+        if len(valores) != n + n * n:
+            return None
+        return valores[:n].copy(), valores[n:].reshape(n, n).copy()
+
+    def gravar(self, chave: str, media: np.ndarray, covariancia: np.ndarray) -> None:
+        try:
+            self.redis.setex(chave, self.ttl, np.concatenate([media, covariancia.ravel()]).tobytes())
+        except RedisError as e:
+            logger.warning(f"[CacheCovariancia] Erro ao gravar {chave}: {e}")
+
+    def obter(self, retornos: pd.DataFrame, start_date: str, end_date: str) -> Tuple[np.ndarray, np.ndarray]:
+        tickers = list(retornos.columns)
+        versao = versao_precos(tickers, start_date, end_date, include_ibov=False)
+        if versao is not None:
+            cache = self.ler(self._chave(tickers, start_date, end_date, versao), len(tickers))
+            if cache is not None:
+                contar('findash_cache_total', cache='covariancia', resultado='hits')
+                return cache
+
+        contar('findash_cache_total', cache='covariancia', resultado='misses')
+        media, covariancia = estimar_parametros(retornos)
+        if versao is not None:
+            self.gravar(self._chave(tickers, start_date, end_date, versao), media, covariancia)
+        return media, covariancia
+
+
+_cache_covariancia: Optional[CacheCovariancia] = None
+
+
+def configurar_cache_covariancia(redis_client: Optional[Redis], **kwargs) -> Optional[CacheCovariancia]:
+    """
+    Ativa (ou desativa, com None) o cache compartilhado das covariâncias por período.
+
+    Args:
+        redis_client (redis.Redis): Conexão Redis compartilhada entre os workers.
+        **kwargs: Parâmetros repassados para CacheCovariancia.
+
+    Returns:
+        CacheCovariancia: Instância configurada, ou None se desativado.
+    """
+    global _cache_covariancia
+    _cache_covariancia = CacheCovariancia(redis_client, **kwargs) if redis_client is not None else None
+    return _cache_covariancia
+
+
+def parametros_periodo(retornos: pd.DataFrame, start_date: str, end_date: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Retorno médio e covariância anualizados, via CacheCovariancia quando configurado.
+
+    Args:
+        retornos (pd.DataFrame): Retornos diários (decimais), datas × tickers.
+        start_date (str): Data inicial do período (formato 'YYYY-MM-DD').
+        end_date (str): Data final exclusiva do período (formato 'YYYY-MM-DD').
+
+    Returns:
+        tuple: (média por ticker, covariância tickers × tickers), na ordem das colunas.
+    """
+    if _cache_covariancia is None:
+        return estimar_parametros(retornos)
+    return _cache_covariancia.obter(retornos, start_date, end_date)
+
+
+def projetar_simplex(v: np.ndarray) -> np.ndarray:
+    """
+    Projeção euclidiana de cada linha de `v` no simplex (pesos >= 0 que somam 1).
+
+    Algoritmo por ordenação (Duchi et al., 2008), vetorizado sobre as linhas.
+    """
+    n = v.shape[1]
+    ordenado = -np.sort(-v, axis=1)
+    acumulado = np.cumsum(ordenado, axis=1) - 1
+    positivos = ordenado - acumulado / np.arange(1, n + 1) > 0
+    rho = positivos.sum(axis=1)
+    theta = acumulado[np.arange(len(v)), rho - 1] / rho
+    return np.maximum(v - theta[:, None], 0.0)
+
+
+def _resolver(media: np.ndarray, covariancia: np.ndarray, aversao: np.ndarray, lipschitz: float,
+              iniciais: Optional[np.ndarray] = None, iteracoes: int = MAX_ITERACOES) -> np.ndarray:
+    """
+    Pesos que minimizam ½ w'Σw - t μ'w no simplex, para cada `t` de `aversao` ao mesmo tempo.
+
+    Gradiente projetado acelerado (FISTA) com passo 1/`lipschitz` (maior autovalor de Σ) e reinício do momento por linha
+    quando ele deixa de reduzir o objetivo; cada iteração custa um único produto
+    (pontos × n) @ (n × n). `iniciais` (pesos de partida, e.g., de uma solução vizinha)
+    reduz as iterações; o padrão é a carteira igualitária.
+
+    Returns:
+        np.ndarray: Pesos, shape (pontos, n).
+    """
+    n = len(media)
+    passo = 1 / max(lipschitz, 1e-12)
+    linear = aversao[:, None] * media
+    pesos = np.full((len(aversao), n), 1 / n) if iniciais is None else np.broadcast_to(iniciais, (len(aversao), n))
+    y, s = pesos, np.ones(len(aversao))
+    for _ in range(iteracoes):
+        novos = projetar_simplex(y - passo * (y @ covariancia - linear))
+        passo_dado = novos - pesos
+        if np.abs(passo_dado).max() < TOLERANCIA:
+            pesos = novos
+            break
+        reiniciar = np.einsum('ij,ij->i', y - novos, passo_dado) > 0
+        s = np.where(reiniciar, 1.0, s)
+        s_novo = (1 + np.sqrt(1 + 4 * s * s)) / 2
+        y = novos + ((s - 1) / s_novo)[:, None] * passo_dado
+        pesos, s = novos, s_novo
+    return pesos
+
+
+def _estatisticas(pesos: np.ndarray, media: np.ndarray, covariancia: np.ndarray) -> Tuple[np.ndarray, ...]:
+    retorno = pesos @ media
+    volatilidade = np.sqrt(np.maximum(((pesos @ covariancia) * pesos).sum(axis=1), 0.0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(np.isclose(volatilidade, 0), np.nan, retorno / volatilidade)
+    return retorno, volatilidade, sharpe
+
+
+def fronteira_eficiente(media: np.ndarray, covariancia: np.ndarray,
+                        pontos: int = PONTOS_FRONTEIRA) -> Dict[str, Any]:
+    """
+    Fronteira eficiente (sem venda a descoberto) e as carteiras de mínima variância e máximo Sharpe.
+
+    Todos os pontos são otimizados juntos, variando a aversão ao risco de zero (mínima variância)
+    até o ponto em que a carteira se concentra no ativo de maior retorno. O máximo Sharpe
+    (sem taxa livre de risco, como em `calcular_kpis`) é refinado entre os vizinhos do melhor ponto.
+
+    Args:
+        media (np.ndarray): Retornos médios anualizados.
+        covariancia (np.ndarray): Covariância anualizada.
+        pontos (int): Pontos da fronteira.
+
+    Returns:
+        dict: 'fronteira' (DataFrame com 'volatilidade', 'retorno' e 'sharpe', por volatilidade),
+            'min_variancia' e 'max_sharpe' (pesos).
+    """
+    lipschitz = np.linalg.eigvalsh(covariancia)[-1]
+    amplitude = max(media.max() - media.min(), 1e-12)
+    aversao = np.concatenate([[0.0], np.geomspace(1e-3, 100, pontos - 1) * lipschitz / amplitude])
+    pesos = _resolver(media, covariancia, aversao, lipschitz)
+    retorno, volatilidade, sharpe = _estatisticas(pesos, media, covariancia)
+
+    # Busca em grade cada vez mais fina em torno do melhor Sharpe encontrado
+    grade, pesos_grade, sharpe_grade = aversao, pesos, sharpe
+    max_sharpe, melhor_sharpe = pesos[0], -np.inf
+    for rodada in range(RODADAS_REFINO + 1):
+        if not np.isfinite(sharpe_grade).any():
+            break
+        melhor = int(np.nanargmax(sharpe_grade))
+        if sharpe_grade[melhor] > melhor_sharpe:
+            max_sharpe, melhor_sharpe = pesos_grade[melhor], sharpe_grade[melhor]
+        if rodada == RODADAS_REFINO:
+            break
+        grade = np.linspace(grade[max(melhor - 1, 0)], grade[min(melhor + 1, len(grade) - 1)], PONTOS_REFINO)
+        pesos_grade = _resolver(media, covariancia, grade, lipschitz, iniciais=max_sharpe)
+        sharpe_grade = _estatisticas(pesos_grade, media, covariancia)[2]
+
+    fronteira = pd.DataFrame({'volatilidade': volatilidade, 'retorno': retorno, 'sharpe': sharpe})
+    fronteira = fronteira.round(10).drop_duplicates(['volatilidade', 'retorno']).sort_values('volatilidade')
+    return {'fronteira': fronteira.reset_index(drop=True), 'min_variancia': pesos[0], 'max_sharpe': max_sharpe}
+
+
+def sugerir_quantidades(pesos: Sequence[float], precos: Sequence[float], quantidades: Sequence[float]) -> np.ndarray:
+    """
+    Quantidades inteiras que aproximam `pesos` mantendo o valor atual da carteira.
+
+    Args:
+        pesos (list): Pesos alvo (somam 1).
+        precos (list): Último preço de cada ticker.
+        quantidades (list): Quantidades atuais.
+
+    Returns:
+        np.ndarray: Quantidades sugeridas.
+    """
+    precos = np.asarray(precos, dtype=np.float64)
+    total = float(np.asarray(quantidades, dtype=np.float64) @ precos)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sugeridas = np.where(precos > 0, np.floor(np.asarray(pesos) * total / precos + 0.5), 0)
+    return sugeridas.astype(np.int64)
+
+
+@measure_time
+def otimizar_carteira(retornos: pd.DataFrame, quantidades: Sequence[float], precos: Sequence[float],
+                      start_date: str, end_date: str, pontos: int = PONTOS_FRONTEIRA,
+                      hrp_setorial: bool = False) -> Dict[str, Any]:
+    """
+    Otimização média-variância e Hierarchical Risk Parity (ver `alocacao_hrp`) dos tickers atuais,
+    com quantidades sugeridas para cada alvo.
+
+    Args:
+        retornos (pd.DataFrame): Retornos diários (decimais), datas × tickers.
+        quantidades (list): Quantidades atuais, na ordem das colunas.
+        precos (list): Último preço de cada ticker, na ordem das colunas.
+        start_date (str): Data inicial do período (formato 'YYYY-MM-DD').
+        end_date (str): Data final exclusiva do período (formato 'YYYY-MM-DD').
+        pontos (int): Pontos da fronteira.
+        hrp_setorial (bool): Se True, o agrupamento do HRP respeita setor/subsetor/segmento (SETORIAL_B3).
+
+    Returns:
+        dict: 'fronteira' (ver `fronteira_eficiente`), 'ativos' (DataFrame com retorno e
+            volatilidade de cada ticker) e 'carteiras' ({'atual', 'min_variancia', 'max_sharpe', 'hrp'}:
+            {'pesos', 'quantidades', 'retorno', 'volatilidade', 'sharpe'}). Vazio se não houver retornos.
+    """
+    if retornos.shape[1] == 0 or len(matriz_retornos(retornos)) < 2:
+        return {}
+    media, covariancia = parametros_periodo(retornos, start_date, end_date)
+    resultado = fronteira_eficiente(media, covariancia, pontos)
+
+    quantidades = np.asarray(quantidades, dtype=np.float64)
+    valores = quantidades * np.asarray(precos, dtype=np.float64)
+    atuais = valores / valores.sum() if valores.sum() > 0 else np.full(len(valores), 1 / len(valores))
+
+    grupos = hierarquia_setorial(list(retornos.columns)) if hrp_setorial else None
+    carteiras = {}
+    for nome, pesos in (('atual', atuais), ('min_variancia', resultado['min_variancia']),
+                        ('max_sharpe', resultado['max_sharpe']), ('hrp', alocacao_hrp(covariancia, grupos))):
+        retorno, volatilidade, sharpe = _estatisticas(pesos[None, :], media, covariancia)
+        carteiras[nome] = {
+            'pesos': pesos,
+            'quantidades': quantidades.astype(np.int64) if nome == 'atual' else sugerir_quantidades(pesos, precos, quantidades),
+            'retorno': float(retorno[0]),
+            'volatilidade': float(volatilidade[0]),
+            'sharpe': float(sharpe[0]),
+        }
+    ativos = pd.DataFrame(
+        {'retorno': media, 'volatilidade': np.sqrt(np.maximum(np.diag(covariancia), 0.0))},
+        index=retornos.columns
+    )
+    return {'fronteira': resultado['fronteira'], 'ativos': ativos, 'carteiras': carteiras}
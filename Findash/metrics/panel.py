@@ -0,0 +1,248 @@
+import io
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from .trading_calendar import fatiar, para_dias, para_iso, para_datetime
+
+BENCHMARK_PADRAO = '^BVSP'
+
+
+@dataclass
+class PricePanel:
+    """
+    Painel compacto de preços: um eixo de dias compartilhado e uma matriz ticker × dia.
+
+    Atributos:
+        dias (np.ndarray): Dias desde 1970-01-01 (int32), ordenados e únicos.
+        tickers (list): Tickers, na ordem das linhas de `precos`.
+        precos (np.ndarray): Preços ajustados float64 (len(tickers) × len(dias)); NaN = sem pregão.
+        benchmark (np.ndarray): Preços do benchmark (IBOV) alinhados a `dias`, NaN onde ausente.
+        div_ticker (np.ndarray): Dividendos (esparso): índice da linha do ticker (int32).
+        div_dia (np.ndarray): Dividendos (esparso): índice do dia em `dias` (int32).
+        div_valor (np.ndarray): Dividendos (esparso): valor por ação (float64).
+
+    A conversão para dicionários {ticker: {data: valor}} acontece apenas na borda (`to_dados`).
+    """
+    dias: np.ndarray
+    tickers: List[str]
+    precos: np.ndarray
+    benchmark: np.ndarray = None
+    div_ticker: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int32))
+    div_dia: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int32))
+    div_valor: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float64))
+
+    def __post_init__(self):
+        if self.benchmark is None:
+            self.benchmark = np.full(len(self.dias), np.nan)
+
+    # ------------------------------------------------------------------
+    # Construção
+    # ------------------------------------------------------------------
+    @classmethod
+    def vazio(cls, tickers: Optional[List[str]] = None) -> 'PricePanel':
+        tickers = list(tickers or [])
+        return cls(np.empty(0, dtype=np.int32), tickers, np.empty((len(tickers), 0)))
+
+    @classmethod
+    def from_historico(cls, historico: Dict[str, pd.DataFrame], tickers: List[str],
+                       nomes: Optional[Dict[str, str]] = None,
+                       benchmark: Optional[str] = BENCHMARK_PADRAO) -> 'PricePanel':
+        """
+        Monta o painel a partir do histórico por ticker do PriceStore.
+
+        Args:
+            historico (dict): {ticker: DataFrame} com colunas 'adj_close' e 'dividends'.
+            tickers (list): Tickers (chaves de `historico`) que formam as linhas.
+            nomes (dict, optional): Nome exibido de cada ticker (e.g., 'PETR4.SA' -> 'PETR4').
+            benchmark (str, optional): Chave do benchmark em `historico`.
+        """
+        nomes = nomes or {}
+        series = {t: historico[t] for t in tickers if t in historico and not historico[t].empty}
+        bench = historico.get(benchmark) if benchmark else None
+        partes = [para_dias(df.index) for df in series.values()]
+        if bench is not None and not bench.empty:
+            partes.append(para_dias(bench.index))
+        dias = np.unique(np.concatenate(partes)).astype(np.int32) if partes else np.empty(0, dtype=np.int32)
+
+        precos = np.full((len(tickers), len(dias)), np.nan)
+        div_t, div_d, div_v = [], [], []
+        for i, t in enumerate(tickers):
+            df = series.get(t)
+            if df is None:
+                continue
+            pos = np.searchsorted(dias, para_dias(df.index))
+            precos[i, pos] = df['adj_close'].to_numpy(dtype=np.float64)
+            valores = df['dividends'].to_numpy(dtype=np.float64)
+            nz = np.flatnonzero(np.nan_to_num(valores))
+            div_t.append(np.full(len(nz), i, dtype=np.int32))
+            div_d.append(pos[nz].astype(np.int32))
+            div_v.append(valores[nz])
+
+        benchmark_precos = np.full(len(dias), np.nan)
+        if bench is not None and not bench.empty:
+            benchmark_precos[np.searchsorted(dias, para_dias(bench.index))] = bench['adj_close'].to_numpy(dtype=np.float64)
+
+        return cls(
+            dias=dias,
+            tickers=[nomes.get(t, t) for t in tickers],
+            precos=precos,
+            benchmark=benchmark_precos,
+            div_ticker=np.concatenate(div_t) if div_t else np.empty(0, dtype=np.int32),
+            div_dia=np.concatenate(div_d) if div_d else np.empty(0, dtype=np.int32),
+            div_valor=np.concatenate(div_v) if div_v else np.empty(0, dtype=np.float64),
+        )
+
+    @classmethod
+    def from_dados(cls, portfolio: Dict[str, Dict[str, float]], ibov: Optional[Dict[str, float]] = None,
+                   dividends: Optional[Dict[str, Dict[str, float]]] = None) -> 'PricePanel':
+        """
+        Monta o painel a partir do formato legado {ticker: {data: valor}} (saída de `obter_dados`).
+        """
+        def _arrays(serie):
+            return para_dias(list(serie.keys())), np.array(list(serie.values()), dtype=np.float64)
+
+        tickers = list(portfolio.keys())
+        series = [_arrays(portfolio[t]) if portfolio[t] else None for t in tickers]
+        bench = _arrays(ibov) if ibov else None
+        partes = [s[0] for s in series if s is not None] + ([bench[0]] if bench else [])
+        dias = np.unique(np.concatenate(partes)).astype(np.int32) if partes else np.empty(0, dtype=np.int32)
+
+        precos = np.full((len(tickers), len(dias)), np.nan)
+        for i, serie in enumerate(series):
+            if serie is not None:
+                precos[i, np.searchsorted(dias, serie[0])] = serie[1]
+
+        benchmark = np.full(len(dias), np.nan)
+        if bench:
+            benchmark[np.searchsorted(dias, bench[0])] = bench[1]
+
+        div_t, div_d, div_v = [], [], []
+        for i, t in enumerate(tickers):
+            serie = (dividends or {}).get(t)
+            if not serie:
+                continue
+            d, v = _arrays(serie)
+            nz = np.flatnonzero(np.nan_to_num(v))
+            # Dividendos em dias fora do eixo (sem pregão) são descartados
+            pos = np.searchsorted(dias, d[nz])
+            validos = (pos < len(dias)) & (dias[np.minimum(pos, len(dias) - 1)] == d[nz]) if len(dias) else np.zeros(len(nz), bool)
+            div_t.append(np.full(validos.sum(), i, dtype=np.int32))
+            div_d.append(pos[validos].astype(np.int32))
+            div_v.append(v[nz][validos])
+
+        return cls(
+            dias=dias,
+            tickers=tickers,
+            precos=precos,
+            benchmark=benchmark,
+            div_ticker=np.concatenate(div_t) if div_t else np.empty(0, dtype=np.int32),
+            div_dia=np.concatenate(div_d) if div_d else np.empty(0, dtype=np.int32),
+            div_valor=np.concatenate(div_v) if div_v else np.empty(0, dtype=np.float64),
+        )
+
+    @classmethod
+    def from_bytes(cls, bruto: bytes) -> 'PricePanel':
+        """Reconstrói um painel serializado com `to_bytes`."""
+        with np.load(io.BytesIO(bruto)) as arquivo:
+            return cls(
+                dias=arquivo['dias'],
+                tickers=arquivo['tickers'].tolist(),
+                precos=arquivo['precos'],
+                benchmark=arquivo['benchmark'],
+                div_ticker=arquivo['div_ticker'],
+                div_dia=arquivo['div_dia'],
+                div_valor=arquivo['div_valor'],
+            )
+
+    def to_bytes(self) -> bytes:
+        """Serializa o painel (arrays numpy em formato .npz) para cache no Redis."""
+        buffer = io.BytesIO()
+        np.savez(
+            buffer, dias=self.dias, tickers=np.array(self.tickers, dtype=str), precos=self.precos,
+            benchmark=self.benchmark, div_ticker=self.div_ticker, div_dia=self.div_dia, div_valor=self.div_valor
+        )
+        return buffer.getvalue()
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    def recortar(self, start_date: str, end_date: str) -> 'PricePanel':
+        """
+        Sub-painel com os dias em [start_date, end_date) (fim exclusivo, como no yfinance).
+
+        Os arrays são fatias do painel original; retornos calculados sobre o recorte já
+        partem do primeiro dia do novo período.
+        """
+        fatia = fatiar(self.dias, start_date, int(para_dias(end_date)) - 1)
+        dividendos = (self.div_dia >= fatia.start) & (self.div_dia < fatia.stop)
+        return PricePanel(
+            dias=self.dias[fatia],
+            tickers=list(self.tickers),
+            precos=self.precos[:, fatia],
+            benchmark=self.benchmark[fatia],
+            div_ticker=self.div_ticker[dividendos],
+            div_dia=(self.div_dia[dividendos] - fatia.start).astype(np.int32),
+            div_valor=self.div_valor[dividendos],
+        )
+
+    def datas(self) -> np.ndarray:
+        """Datas do eixo como strings 'YYYY-MM-DD'."""
+        return para_iso(self.dias)
+
+    def indice_datetime(self) -> pd.DatetimeIndex:
+        return para_datetime(self.dias)
+
+    def dias_com_precos(self) -> np.ndarray:
+        """Máscara dos dias em que ao menos um ticker tem preço."""
+        return ~np.isnan(self.precos).all(axis=0) if len(self.tickers) else np.zeros(len(self.dias), dtype=bool)
+
+    def to_frame(self, tickers: Optional[List[str]] = None, datas_iso: bool = True) -> pd.DataFrame:
+        """
+        DataFrame de preços (dias × tickers), sem os dias em que nenhum ticker negociou.
+
+        Args:
+            tickers (list, optional): Subconjunto/ordem das colunas.
+            datas_iso (bool): Se True, índice como string 'YYYY-MM-DD'; senão DatetimeIndex.
+        """
+        mascara = self.dias_com_precos()
+        indice = self.datas()[mascara] if datas_iso else self.indice_datetime()[mascara]
+        df = pd.DataFrame(self.precos[:, mascara].T, index=indice, columns=self.tickers)
+        return df[tickers] if tickers is not None else df
+
+    def serie_benchmark(self, datas_iso: bool = True) -> pd.Series:
+        """Preços do benchmark (sem NaN), com índice string ou datetime."""
+        mascara = ~np.isnan(self.benchmark)
+        indice = self.datas()[mascara] if datas_iso else self.indice_datetime()[mascara]
+        return pd.Series(self.benchmark[mascara], index=indice)
+
+    def dividendos_totais(self) -> Dict[str, float]:
+        """Soma dos dividendos por ação de cada ticker no período do painel."""
+        totais = np.bincount(self.div_ticker, weights=self.div_valor, minlength=len(self.tickers))
+        return dict(zip(self.tickers, totais.tolist()))
+
+    # ------------------------------------------------------------------
+    # Conversão na borda
+    # ------------------------------------------------------------------
+    def to_dados(self) -> Dict[str, Dict]:
+        """
+        Converte para o formato legado de `obter_dados`: {'portfolio', 'ibov', 'dividends'}.
+
+        Os dividendos saem com uma entrada por pregão do ticker (zeros inclusive), como o yfinance.
+        """
+        datas = self.datas()
+        mascara = self.dias_com_precos()
+        portfolio, dividends = {}, {}
+        for i, t in enumerate(self.tickers):
+            presentes = ~np.isnan(self.precos[i])
+            if not presentes.any():
+                portfolio[t], dividends[t] = {}, {}
+                continue
+            portfolio[t] = dict(zip(datas[mascara].tolist(), self.precos[i, mascara].tolist()))
+            div = np.zeros(len(self.dias))
+            sel = self.div_ticker == i
+            div[self.div_dia[sel]] = self.div_valor[sel]
+            dividends[t] = dict(zip(datas[presentes].tolist(), div[presentes].tolist()))
+        bench = ~np.isnan(self.benchmark)
+        ibov = dict(zip(datas[bench].tolist(), self.benchmark[bench].tolist()))
+        return {'portfolio': portfolio, 'ibov': ibov, 'dividends': dividends}
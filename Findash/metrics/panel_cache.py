@@ -0,0 +1,124 @@
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from redis import Redis
+from redis.exceptions import RedisError
+from Findash.utils.logging_tools import logger
+from Findash.utils.instrumentation import contar
+from .data_fetch import obter_painel
+from .panel import PricePanel
+from .price_store import B3_TZ
+from .single_flight import SingleFlight
+from .trading_calendar import para_dias, para_iso
+from .utils import measure_time
+
+# Histórico mínimo mantido por portfólio (anos antes de hoje), além do período pedido
+ANOS_HISTORICO = int(os.getenv('FINDASH_PAINEL_ANOS', 5))
+
+
+class PanelCache:
+    """
+    Mantém no Redis o painel com o histórico completo de cada portfólio (conjunto de tickers).
+
+    Mudanças de período são atendidas recortando esse painel; o provedor só é consultado
+    quando o período pedido sai da cobertura já carregada, e mesmo então o PriceStore baixa
+    apenas os trechos nunca consultados.
+    """
+
+    def __init__(self, redis_client: Redis, prefixo: str = 'painel', ttl: int = 1800,
+                 anos_historico: int = ANOS_HISTORICO):
+        self.redis = redis_client
+        self.prefixo = prefixo
+        self.ttl = ttl
+        self.anos_historico = anos_historico
+        self.hits = 0
+        self.misses = 0
+
+    def _chave(self, tickers: List[str]) -> str:
+        return f"{self.prefixo}:{SingleFlight.gerar_chave(list(tickers))}"
+
+    def ler(self, tickers: List[str]) -> Optional[Tuple[PricePanel, str, str]]:
+        """Retorna (painel, início, fim exclusivo da cobertura) ou None se não houver cache."""
+        chave = self._chave(tickers)
+        try:
+            bruto, cobertura = self.redis.mget(chave, f"{chave}:cobertura")
+        except RedisError as e:
+            logger.warning(f"[PanelCache] Erro ao ler painel de {tickers}: {e}")
+            return None
+        if bruto is None or cobertura is None:
+            return None
+        inicio, fim = (cobertura.decode() if isinstance(cobertura, bytes) else cobertura).split(',')
+        return PricePanel.from_bytes(bruto), inicio, fim
+
+    def gravar(self, tickers: List[str], painel: PricePanel, inicio: str, fim: str) -> None:
+        chave = self._chave(tickers)
+        try:
+            pipe = self.redis.pipeline()
+            pipe.setex(chave, self.ttl, painel.to_bytes())
+            pipe.setex(f"{chave}:cobertura", self.ttl, f"{inicio},{fim}")
+            pipe.execute()
+        except RedisError as e:
+            logger.warning(f"[PanelCache] Erro ao gravar painel de {tickers}: {e}")
+
+    @measure_time
+    def obter(self, tickers: List[str], start_date: str, end_date: str) -> PricePanel:
+        """
+        Painel dos tickers no período [start_date, end_date), recortado do histórico em cache.
+
+        Args:
+            tickers (list): Tickers do portfólio (nomes exibidos, e.g., 'PETR4').
+            start_date (str): Data inicial (formato 'YYYY-MM-DD').
+            end_date (str): Data final exclusiva (formato 'YYYY-MM-DD').
+
+        Returns:
+            PricePanel: Painel do período, com o IBOV como benchmark.
+        """
+        start_date, end_date = str(para_iso(para_dias(start_date))), str(para_iso(para_dias(end_date)))
+        cache = self.ler(tickers)
+        if cache is not None:
+            painel, inicio, fim = cache
+            if para_dias(inicio) <= para_dias(start_date) and para_dias(end_date) <= para_dias(fim):
+                self.hits += 1
+                contar('findash_cache_total', cache='painel', resultado='hits')
+                logger.info(f"[PanelCache] Período {start_date} → {end_date} recortado do cache ({inicio} → {fim})")
+                return painel.recortar(start_date, end_date)
+            inicio, fim = min(inicio, start_date), max(fim, end_date)
+        else:
+            hoje = datetime.now(B3_TZ).date()
+            inicio = min(start_date, (hoje - timedelta(days=365 * self.anos_historico)).strftime('%Y-%m-%d'))
+            fim = max(end_date, (hoje + timedelta(days=1)).strftime('%Y-%m-%d'))
+
+        self.misses += 1
+        contar('findash_cache_total', cache='painel', resultado='misses')
+        painel, _ = obter_painel(tickers, inicio, fim, include_ibov=True)
+        self.gravar(tickers, painel, inicio, fim)
+        return painel.recortar(start_date, end_date)
+
+
+_panel_cache: Optional[PanelCache] = None
+
+
+def configurar_panel_cache(redis_client: Optional[Redis], **kwargs) -> Optional[PanelCache]:
+    """
+    Ativa (ou desativa, com None) o cache de painéis por portfólio.
+
+    Args:
+        redis_client (redis.Redis): Conexão Redis compartilhada entre os workers.
+        **kwargs: Parâmetros repassados para PanelCache.
+
+    Returns:
+        PanelCache: Instância configurada, ou None se desativado.
+    """
+    global _panel_cache
+    _panel_cache = PanelCache(redis_client, **kwargs) if redis_client is not None else None
+    return _panel_cache
+
+
+def obter_painel_periodo(tickers: List[str], start_date: str, end_date: str) -> PricePanel:
+    """
+    Painel do período, via PanelCache quando configurado; senão direto do PriceStore.
+    """
+    if _panel_cache is None:
+        painel, _ = obter_painel(tickers, start_date, end_date, include_ibov=True)
+        return painel
+    return _panel_cache.obter(tickers, start_date, end_date)
@@ -0,0 +1,285 @@
+import os
+import re
+import threading
+import time
+from datetime import datetime, date, timedelta, time as dtime
+from typing import Callable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+import numpy as np
+import pandas as pd
+from Findash.utils.logging_tools import logger
+from Findash.utils.instrumentation import contar
+from .trading_calendar import b3_calendar, para_dias, para_iso, para_datetime
+
+# Diretório padrão do cache de preços (um arquivo .npz por ticker)
+PRICE_CACHE_DIR = os.getenv(
+    'FINDASH_PRICE_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'price_cache')
+)
+
+B3_TZ = ZoneInfo('America/Sao_Paulo')
+# Horário de abertura do pregão; antes dele o dia ainda não tem preços
+B3_ABERTURA = dtime(10, 0)
+# Horário a partir do qual o pregão do dia é considerado encerrado (inclui call de fechamento e after)
+B3_FECHAMENTO = dtime(18, 30)
+# Validade do trecho ainda não consolidado (pregão em andamento)
+TTL_PREGAO_ABERTO = int(os.getenv('FINDASH_PRICE_TTL_ABERTO', 15 * 60))
+
+COLUNAS = ('adj_close', 'dividends', 'volume')
+
+
+def _para_dia(d) -> int:
+    """Converte 'YYYY-MM-DD', date ou Timestamp em dias desde 1970-01-01."""
+    return int(para_dias(pd.Timestamp(d).date()))
+
+
+def _para_data(dia: int) -> str:
+    return str(para_iso(dia))
+
+
+def ultimo_pregao_fechado(agora: Optional[datetime] = None) -> date:
+    """
+    Retorna o último pregão já encerrado na B3 (considera fins de semana e feriados).
+
+    Args:
+        agora (datetime, optional): Momento de referência. Padrão: agora no fuso de São Paulo.
+
+    Returns:
+        date: Último dia com preços de fechamento definitivos.
+    """
+    agora = agora.astimezone(B3_TZ) if agora else datetime.now(B3_TZ)
+    dia = agora.date()
+    if b3_calendar.eh_pregao(dia) and agora.time() >= B3_FECHAMENTO:
+        return dia
+    return b3_calendar.ultimo_pregao(dia - timedelta(days=1))
+
+
+class PriceStore:
+    """
+    Cache local de preços ajustados, dividendos e volume, com um arquivo colunar (.npz) por ticker.
+
+    Cada arquivo guarda, além das colunas, o intervalo de datas já consultado no yfinance
+    (`cobertura`) e até que dia os dados são definitivos (`consolidado_ate`). Intervalos que
+    terminam em pregões encerrados nunca são baixados novamente; o trecho do pregão em
+    andamento expira após `TTL_PREGAO_ABERTO` segundos.
+    """
+
+    def __init__(self, diretorio: str = PRICE_CACHE_DIR):
+        self.diretorio = diretorio
+        self._lock = threading.Lock()
+        os.makedirs(self.diretorio, exist_ok=True)
+
+    def _caminho(self, ticker: str) -> str:
+        return os.path.join(self.diretorio, re.sub(r'[^A-Za-z0-9._-]', '_', ticker) + '.npz')
+
+    def ler(self, ticker: str) -> Optional[Dict[str, np.ndarray]]:
+        """Lê o arquivo do ticker; retorna None se não existir ou estiver corrompido."""
+        caminho = self._caminho(ticker)
+        if not os.path.exists(caminho):
+            return None
+        try:
+            with np.load(caminho) as arquivo:
+                return {nome: arquivo[nome] for nome in arquivo.files}
+        except Exception as e:
+            logger.warning(f"[PriceStore] Arquivo de cache inválido para {ticker}, descartando: {e}")
+            return None
+
+    def gravar(self, ticker: str, dados: Dict[str, np.ndarray]) -> None:
+        """Grava o arquivo do ticker de forma atômica (arquivo temporário + os.replace)."""
+        caminho = self._caminho(ticker)
+        temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporario, 'wb') as f:
+            np.savez(f, **dados)
+        os.replace(temporario, caminho)
+
+    def intervalos_faltantes(self, ticker: str, start_date: str, end_date: str,
+                             agora: Optional[datetime] = None) -> List[Tuple[str, str]]:
+        """
+        Calcula os trechos [início, fim) que precisam ser baixados para cobrir o intervalo pedido.
+
+        Args:
+            ticker (str): Ticker normalizado (e.g., 'PETR4.SA').
+            start_date (str): Data inicial (formato 'YYYY-MM-DD').
+            end_date (str): Data final exclusiva, como no yf.download.
+            agora (datetime, optional): Momento de referência para o cálculo do TTL.
+
+        Returns:
+            list: Lista de tuplas (start, end) no formato 'YYYY-MM-DD'.
+        """
+        inicio, fim = _para_dia(start_date), _para_dia(end_date)
+        # Datas futuras nunca têm dados; limita o fim ao dia seguinte ao atual
+        agora = agora.astimezone(B3_TZ) if agora else datetime.now(B3_TZ)
+        hoje = agora.date()
+        fim = min(fim, _para_dia(hoje) + 1)
+        if fim <= inicio:
+            return []
+
+        dados = self.ler(ticker)
+        if dados is None:
+            return [(_para_data(inicio), _para_data(fim))]
+
+        cob_inicio, cob_fim = (int(v) for v in dados['cobertura'])
+        consolidado_ate = int(dados['consolidado_ate'])
+        faltantes = []
+
+        # Os trechos partem das bordas da cobertura para mantê-la contígua
+        if inicio < cob_inicio:
+            faltantes.append((inicio, cob_inicio))
+
+        # Trecho final: definitivo até `consolidado_ate`; depois disso vale apenas o TTL
+        fim_definitivo = consolidado_ate + 1
+        if fim > fim_definitivo:
+            inicio_final = max(cob_inicio, min(fim_definitivo, cob_fim))
+            # Noites, fins de semana e feriados: sem pregão aberto no trecho, nada novo a baixar
+            proximo = b3_calendar.proximo_pregao(_para_data(inicio_final))
+            sem_pregao = _para_dia(proximo) >= fim or (proximo == hoje and agora.time() < B3_ABERTURA)
+            recente = time.time() - float(dados['atualizado_em']) < TTL_PREGAO_ABERTO
+            if not (sem_pregao or (recente and cob_fim >= fim)):
+                faltantes.append((inicio_final, fim))
+
+        return [(_para_data(a), _para_data(b)) for a, b in faltantes if b > a]
+
+    def mesclar(self, ticker: str, novo: pd.DataFrame, start_date: str, end_date: str,
+                agora: Optional[datetime] = None) -> None:
+        """
+        Incorpora ao cache um trecho recém-baixado e atualiza a cobertura.
+
+        Args:
+            ticker (str): Ticker normalizado.
+            novo (DataFrame): Índice datetime e colunas 'adj_close', 'dividends', 'volume'.
+            start_date (str): Início do trecho consultado.
+            end_date (str): Fim exclusivo do trecho consultado.
+            agora (datetime, optional): Momento de referência para a consolidação.
+        """
+        inicio, fim = _para_dia(start_date), _para_dia(end_date)
+        ultimo_fechado = _para_dia(ultimo_pregao_fechado(agora))
+
+        novo = novo.dropna(subset=['adj_close'])
+        novos_dias = para_dias(novo.index)
+
+        with self._lock:
+            atual = self.ler(ticker)
+            if atual is not None:
+                cob_inicio, cob_fim = (int(v) for v in atual['cobertura'])
+                # Linhas do trecho re-baixado são substituídas pelos valores novos
+                manter = (atual['dias'] < inicio) | (atual['dias'] >= fim)
+                dias = np.concatenate([atual['dias'][manter], novos_dias])
+                colunas = {
+                    c: np.concatenate([atual[c][manter], novo[c].to_numpy(dtype=np.float64, na_value=0.0)])
+                    for c in COLUNAS
+                }
+                cob_inicio, cob_fim = min(cob_inicio, inicio), max(cob_fim, fim)
+                consolidado_ate = max(int(atual['consolidado_ate']), min(fim - 1, ultimo_fechado))
+            else:
+                dias = novos_dias
+                colunas = {c: novo[c].to_numpy(dtype=np.float64, na_value=0.0) for c in COLUNAS}
+                cob_inicio, cob_fim = inicio, fim
+                consolidado_ate = min(fim - 1, ultimo_fechado)
+
+            ordem = np.argsort(dias, kind='stable')
+            self.gravar(ticker, {
+                'dias': dias[ordem],
+                **{c: v[ordem] for c, v in colunas.items()},
+                'cobertura': np.array([cob_inicio, cob_fim], dtype=np.int32),
+                'consolidado_ate': np.int32(consolidado_ate),
+                'atualizado_em': np.float64(time.time()),
+            })
+
+    def carregar(self, ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        Retorna o histórico em cache no intervalo [start_date, end_date).
+
+        Returns:
+            DataFrame: Índice datetime e colunas 'adj_close', 'dividends', 'volume' (vazio se não houver dados).
+        """
+        dados = self.ler(ticker)
+        if dados is None or len(dados['dias']) == 0:
+            return pd.DataFrame(columns=list(COLUNAS), index=pd.DatetimeIndex([]))
+        dias = dados['dias']
+        a, b = np.searchsorted(dias, [_para_dia(start_date), _para_dia(end_date)])
+        indice = para_datetime(dias[a:b])
+        return pd.DataFrame({c: dados[c][a:b] for c in COLUNAS}, index=indice)
+
+    def versao(self, tickers: List[str], start_date: str, end_date: str,
+               agora: Optional[datetime] = None) -> Optional[str]:
+        """
+        Identifica a versão dos dados em cache dos tickers no intervalo, para chaves de memoização.
+
+        Trechos consolidados nunca mudam, então só o trecho do pregão em andamento entra na
+        versão (pelo instante da última atualização). Se algum trecho ainda precisar ser
+        baixado, a versão é desconhecida e o resultado não deve ser reaproveitado.
+
+        Args:
+            tickers (list): Tickers normalizados.
+            start_date (str): Data inicial (formato 'YYYY-MM-DD').
+            end_date (str): Data final exclusiva (formato 'YYYY-MM-DD').
+            agora (datetime, optional): Momento de referência para o cálculo do TTL.
+
+        Returns:
+            str: Identificador estável da versão, ou None se faltarem dados.
+        """
+        partes = []
+        fim = _para_dia(end_date)
+        for ticker in sorted(tickers):
+            if self.intervalos_faltantes(ticker, start_date, end_date, agora):
+                return None
+            dados = self.ler(ticker)
+            if dados is None:
+                partes.append(f"{ticker}:vazio")
+            elif fim - 1 <= int(dados['consolidado_ate']):
+                partes.append(f"{ticker}:consolidado")
+            else:
+                partes.append(f"{ticker}:{float(dados['atualizado_em']):.3f}")
+        return '|'.join(partes)
+
+    def obter(self, tickers: List[str], start_date: str, end_date: str,
+              baixar: Callable[[List[str], str, str], Dict[str, pd.DataFrame]],
+              status: Optional[Dict[str, str]] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Retorna o histórico de cada ticker, baixando apenas os trechos ausentes do cache.
+
+        Tickers com o mesmo trecho faltante são agrupados numa única chamada a `baixar`.
+
+        Args:
+            tickers (list): Tickers normalizados.
+            start_date (str): Data inicial (formato 'YYYY-MM-DD').
+            end_date (str): Data final exclusiva (formato 'YYYY-MM-DD').
+            baixar (callable): Função (tickers, start, end) -> {ticker: DataFrame} que consulta o provedor.
+            status (dict, optional): Se informado, recebe {ticker: 'ok' | 'sem_dados' | 'erro'};
+                'erro' indica que algum trecho faltante não pôde ser baixado.
+
+        Returns:
+            dict: {ticker: DataFrame} com colunas 'adj_close', 'dividends', 'volume'.
+        """
+        pendentes: Dict[Tuple[str, str], List[str]] = {}
+        falhas = set()
+        for ticker in tickers:
+            for intervalo in self.intervalos_faltantes(ticker, start_date, end_date):
+                pendentes.setdefault(intervalo, []).append(ticker)
+
+        for (inicio, fim), grupo in pendentes.items():
+            logger.info(f"[PriceStore] Baixando {inicio} → {fim} para {grupo}")
+            try:
+                baixados = baixar(grupo, inicio, fim)
+            except Exception as e:
+                logger.error(f"[PriceStore] Falha ao baixar {grupo} ({inicio} → {fim}): {e}")
+                baixados = {}
+            # Tickers ausentes do retorno falharam no provedor e não têm a cobertura registrada
+            for ticker, df in baixados.items():
+                self.mesclar(ticker, df, inicio, fim)
+            falhas.update(t for t in grupo if t not in baixados)
+
+        contar('findash_cache_total', cache='precos', resultado='misses' if pendentes else 'hits')
+        if not pendentes:
+            logger.info(f"[PriceStore] Cache completo para {tickers} ({start_date} → {end_date})")
+
+        historico = {ticker: self.carregar(ticker, start_date, end_date) for ticker in tickers}
+        if status is not None:
+            status.update({
+                ticker: 'erro' if ticker in falhas else 'sem_dados' if historico[ticker].empty else 'ok'
+                for ticker in tickers
+            })
+        return historico
+
+
+price_store = PriceStore()
@@ -0,0 +1,93 @@
+import os
+from functools import partial
+from typing import Any, Dict, Optional, Sequence
+import numpy as np
+import pandas as pd
+from .simulacao import normal_multivariada, raiz_covariancia, simular
+from .trading_calendar import b3_calendar, para_datetime
+from .utils import measure_time
+from .var import matriz_retornos
+
+METODOS_PROJECAO = ('gbm', 'bootstrap')
+N_TRAJETORIAS = int(os.getenv('FINDASH_PROJECAO_TRAJETORIAS', 5_000))
+# Percentis das faixas do gráfico de leque (o 50 é a mediana)
+PERCENTIS = (5, 25, 50, 75, 95)
+
+
+def _trajetorias_gbm(rng: np.random.Generator, n: int, media_log: np.ndarray, raiz: np.ndarray,
+                     valores: np.ndarray, horizonte: int) -> np.ndarray:
+    """Valor da carteira em cada pregão, com os log-retornos dos ativos normais multivariados."""
+    log_retornos = normal_multivariada(rng, n, media_log, raiz, horizonte)
+    return np.exp(np.cumsum(log_retornos, axis=1)) @ valores
+
+
+def _trajetorias_bootstrap(rng: np.random.Generator, n: int, historico: np.ndarray, valores: np.ndarray,
+                           horizonte: int) -> np.ndarray:
+    """Valor da carteira em cada pregão, sorteando (com reposição) dias inteiros do histórico."""
+    dias = rng.integers(0, len(historico), size=(n, horizonte))
+    return np.cumprod(1 + historico[dias], axis=1) @ valores
+
+
+def datas_futuras(ultima_data, horizonte: int) -> pd.DatetimeIndex:
+    """Os `horizonte` pregões seguintes a `ultima_data`."""
+    inicio = int(np.atleast_1d(b3_calendar.offsets(ultima_data, anterior=True))[0]) + 1
+    return para_datetime(b3_calendar.dias(np.arange(inicio, inicio + horizonte)))
+
+
+@measure_time
+def projetar_carteira(retornos: pd.DataFrame, valores_atuais: Sequence[float], horizonte: int = 252,
+                      metodo: str = 'gbm', alvo: Optional[float] = None, n_trajetorias: int = N_TRAJETORIAS,
+                      seed: Optional[int] = None, processos: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Projeta o valor futuro da carteira por Monte Carlo, mantendo as quantidades atuais.
+
+    Com 'gbm', os preços seguem um movimento browniano geométrico com média e covariância dos
+    log-retornos históricos; com 'bootstrap', cada pregão futuro repete os retornos de um dia
+    histórico sorteado (preservando a correlação e as caudas observadas). As trajetórias são
+    geradas em blocos (ver `simular`).
+
+    Args:
+        retornos (pd.DataFrame): Retornos diários (decimais), datas × tickers.
+        valores_atuais (list): Valor atual da posição em cada ticker, na ordem das colunas.
+        horizonte (int): Pregões projetados.
+        metodo (str): 'gbm' ou 'bootstrap'.
+        alvo (float, optional): Valor da carteira cuja probabilidade de ser atingido é calculada.
+        n_trajetorias (int): Trajetórias simuladas.
+        seed (int, optional): Semente, para resultados reprodutíveis.
+        processos (bool, optional): Uso do pool de processos (ver `simular`).
+
+    Returns:
+        dict: 'datas' (pregões projetados), 'faixas' ({percentil: valores por pregão}),
+            'valor_inicial', 'valor_final' ({percentil: valor}) e, com `alvo`,
+            'prob_alvo_final' (fração das trajetórias que terminam acima do alvo) e
+            'prob_alvo_trajetoria' (fração que o atinge em algum pregão). Vazio se não houver retornos.
+    """
+    if metodo not in METODOS_PROJECAO:
+        raise ValueError(f"Método de projeção inválido: {metodo}")
+    historico = matriz_retornos(retornos)
+    if len(historico) < 2 or not retornos.shape[1] or horizonte < 1:
+        return {}
+
+    valores = np.asarray(valores_atuais, dtype=np.float64)
+    if metodo == 'gbm':
+        log_retornos = np.log1p(historico)
+        gerador = partial(
+            _trajetorias_gbm, media_log=log_retornos.mean(axis=0),
+            raiz=raiz_covariancia(np.atleast_2d(np.cov(log_retornos, rowvar=False))),
+            valores=valores, horizonte=horizonte,
+        )
+    else:
+        gerador = partial(_trajetorias_bootstrap, historico=historico, valores=valores, horizonte=horizonte)
+    trajetorias = simular(gerador, n_trajetorias, horizonte * len(valores), seed=seed, processos=processos)
+
+    faixas = np.percentile(trajetorias, PERCENTIS, axis=0)
+    resultado = {
+        'datas': datas_futuras(retornos.index[-1], horizonte),
+        'faixas': dict(zip(PERCENTIS, faixas)),
+        'valor_inicial': float(valores.sum()),
+        'valor_final': {p: float(v) for p, v in zip(PERCENTIS, faixas[:, -1])},
+    }
+    if alvo is not None:
+        resultado['prob_alvo_final'] = float(np.mean(trajetorias[:, -1] >= alvo))
+        resultado['prob_alvo_trajetoria'] = float(np.mean(trajetorias.max(axis=1) >= alvo))
+    return resultado
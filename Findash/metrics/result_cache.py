@@ -0,0 +1,186 @@
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+import pandas as pd
+from redis import Redis
+from redis.exceptions import RedisError
+from utils.serialization import orjson_dumps, orjson_loads
+from Findash.utils.logging_tools import logger
+from Findash.utils.instrumentation import contar
+from .data_fetch import versao_precos
+from .single_flight import SingleFlight
+
+# Limite de resultados guardados (os menos usados recentemente saem primeiro)
+MAX_RESULTADOS = int(os.getenv('FINDASH_RESULTADOS_MAX', 1000))
+
+
+def _serializar(resultado: Dict[str, Any]) -> bytes:
+    return orjson_dumps({
+        chave: {'__dataframe__': valor.to_dict(orient='split')} if isinstance(valor, pd.DataFrame) else valor
+        for chave, valor in resultado.items()
+    })
+
+
+def _desserializar(bruto: bytes) -> Dict[str, Any]:
+    resultado = orjson_loads(bruto)
+    for chave, valor in resultado.items():
+        if isinstance(valor, dict) and '__dataframe__' in valor:
+            tabela = valor['__dataframe__']
+            resultado[chave] = pd.DataFrame(tabela['data'], index=tabela['index'], columns=tabela['columns'], dtype=float)
+    return resultado
+
+
+class ResultCache:
+    """
+    Memoiza no Redis os resultados de `calcular_metricas`, compartilhados entre sessões e workers.
+
+    A chave é um hash canônico de (tickers ordenados com suas quantidades, período, tipo de
+    período dos KPIs e versão dos preços em cache); portfólios idênticos enviados por usuários
+    diferentes são calculados uma única vez. Cada resultado expira após `ttl` segundos e, acima
+    de `max_entradas`, os menos usados recentemente são removidos.
+
+    Contadores em `{prefixo}:stats`:
+        - hits: resultados reaproveitados.
+        - misses: resultados calculados (inclusive quando a versão dos preços era desconhecida).
+        - evictions: resultados removidos pelo limite de entradas.
+    """
+
+    def __init__(self, redis_client: Redis, prefixo: str = 'metricas', ttl: int = 3600,
+                 max_entradas: int = MAX_RESULTADOS):
+        self.redis = redis_client
+        self.prefixo = prefixo
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+
+    @staticmethod
+    def gerar_chave(tickers: List[str], quantities: List[float], start_date: str, end_date: str,
+                    period: str, versao: str) -> str:
+        """Hash independente da ordem dos tickers e da grafia ('PETR4' ou 'PETR4.SA')."""
+        carteira = sorted((t.replace('.SA', '').upper(), float(q)) for t, q in zip(tickers, quantities))
+        return SingleFlight.gerar_chave(carteira, start_date, end_date, period, versao)
+
+    def _contar(self, campo: str, quantidade: int = 1) -> None:
+        contar('findash_cache_total', quantidade, cache='resultado', resultado=campo)
+        try:
+            self.redis.hincrby(f"{self.prefixo}:stats", campo, quantidade)
+        except RedisError:
+            pass
+
+    def estatisticas(self) -> Dict[str, int]:
+        """Retorna os contadores acumulados de hits, misses e evictions."""
+        try:
+            brutos = self.redis.hgetall(f"{self.prefixo}:stats")
+        except RedisError as e:
+            logger.warning(f"[ResultCache] Erro ao ler estatísticas: {e}")
+            return {}
+        return {k.decode() if isinstance(k, bytes) else k: int(v) for k, v in brutos.items()}
+
+    def ler(self, chave: str) -> Optional[Dict[str, Any]]:
+        try:
+            bruto = self.redis.get(f"{self.prefixo}:{chave}")
+            if bruto is None:
+                return None
+            self.redis.zadd(f"{self.prefixo}:lru", {chave: time.time()})
+        except RedisError as e:
+            logger.warning(f"[ResultCache] Erro ao ler resultado {chave}: {e}")
+            return None
+        return _desserializar(bruto)
+
+    def gravar(self, chave: str, resultado: Dict[str, Any]) -> None:
+        """Grava o resultado e remove os menos usados recentemente além de `max_entradas`."""
+        agora = time.time()
+        lru = f"{self.prefixo}:lru"
+        try:
+            pipe = self.redis.pipeline()
+            pipe.setex(f"{self.prefixo}:{chave}", self.ttl, _serializar(resultado))
+            pipe.zadd(lru, {chave: agora})
+            # Entradas já expiradas pelo TTL saem do índice sem contar como eviction
+            pipe.zremrangebyscore(lru, '-inf', agora - self.ttl)
+            pipe.zcard(lru)
+            total = pipe.execute()[-1]
+            excesso = total - self.max_entradas
+            if excesso > 0:
+                removidas = [c.decode() if isinstance(c, bytes) else c for c, _ in self.redis.zpopmin(lru, excesso)]
+                if removidas:
+                    self.redis.delete(*(f"{self.prefixo}:{c}" for c in removidas))
+                    self._contar('evictions', len(removidas))
+        except RedisError as e:
+            logger.warning(f"[ResultCache] Erro ao gravar resultado {chave}: {e}")
+
+    @staticmethod
+    def _ordenar_tabela(resultado: Dict[str, Any], tickers: List[str]) -> Dict[str, Any]:
+        """Reaproveitamentos de portfólios com outra ordem de tickers mantêm a ordem pedida na tabela."""
+        posicao = {t.replace('.SA', ''): i for i, t in enumerate(tickers)}
+        resultado['table_data'] = sorted(
+            resultado.get('table_data', []),
+            key=lambda row: posicao.get(row.get('ticker'), len(posicao))
+        )
+        return resultado
+
+    def obter(self, tickers: List[str], quantities: List[float], start_date: str, end_date: str,
+              period: str, calcular: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Retorna o resultado memoizado do portfólio, calculando-o com `calcular` se necessário.
+
+        Args:
+            tickers (list): Tickers do portfólio.
+            quantities (list): Quantidades correspondentes.
+            start_date (str): Data inicial (formato 'YYYY-MM-DD').
+            end_date (str): Data final (formato 'YYYY-MM-DD').
+            period (str): Período dos KPIs ('mensal', 'trimestral', 'semestral', 'anual').
+            calcular (callable): Função sem argumentos que produz o resultado de `calcular_metricas`.
+
+        Returns:
+            dict: Resultado de `calcular_metricas`.
+        """
+        versao = versao_precos(tickers, start_date, end_date)
+        if versao is not None:
+            chave = self.gerar_chave(tickers, quantities, start_date, end_date, period, versao)
+            resultado = self.ler(chave)
+            if resultado is not None:
+                self._contar('hits')
+                logger.info(f"[ResultCache] Resultado reaproveitado para {tickers} ({start_date} → {end_date})")
+                return self._ordenar_tabela(resultado, tickers)
+
+        self._contar('misses')
+        resultado = calcular()
+        # Preços ainda não baixados antes do cálculo já estão em cache agora. Benchmarks com falha
+        # no download não entram na versão, então o resultado incompleto não é gravado.
+        versao = versao or versao_precos(tickers, start_date, end_date)
+        if versao is not None and resultado.get('table_data') and not resultado.get('benchmarks_com_falha'):
+            self.gravar(self.gerar_chave(tickers, quantities, start_date, end_date, period, versao), resultado)
+        return resultado
+
+
+_result_cache: Optional[ResultCache] = None
+
+
+def configurar_result_cache(redis_client: Optional[Redis], **kwargs) -> Optional[ResultCache]:
+    """
+    Ativa (ou desativa, com None) a memoização dos resultados de `calcular_metricas`.
+
+    Args:
+        redis_client (redis.Redis): Conexão Redis compartilhada entre os workers.
+        **kwargs: Parâmetros repassados para ResultCache.
+
+    Returns:
+        ResultCache: Instância configurada, ou None se desativado.
+    """
+    global _result_cache
+    _result_cache = ResultCache(redis_client, **kwargs) if redis_client is not None else None
+    return _result_cache
+
+
+def obter_result_cache() -> Optional[ResultCache]:
+    return _result_cache
+
+
+def memoizar_metricas(tickers: List[str], quantities: List[float], start_date: str, end_date: str,
+                      period: str, calcular: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Resultado de `calcular`, via ResultCache quando configurado; senão calculado diretamente.
+    """
+    if _result_cache is None:
+        return calcular()
+    return _result_cache.obter(tickers, quantities, start_date, end_date, period, calcular)
+
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 from .utils import measure_time
+from .trading_calendar import indice_datetime
 
 @measure_time
 def calcular_retornos_individuais(tickers: list[str], precos_df: pd.DataFrame) -> tuple[dict[str, dict], dict[str, dict]]:
@@ -63,18 +64,18 @@ def calcular_retornos_portfolio(tickers: list[str], quantities: list[float], por
     return portfolio_return_dict, portfolio_daily_return_dict
 
 @measure_time
-def calcular_retorno_ibov(ibov: dict) -> dict:
+def calcular_retorno_ibov(ibov) -> dict:
     """
     Calcula o retorno acumulado do IBOV.
     
     Args:
-        ibov (dict): Dicionário de preços do IBOV {data: preço}.
+        ibov (dict | pd.Series): Preços do IBOV {data: preço}.
     
     Returns:
         dict: Retorno acumulado do IBOV (ibov_return_dict).
     """
     ibov_return_dict = {}
-    if ibov:
+    if ibov is not None and len(ibov) > 0:
         try:
             df_ibov = pd.Series(ibov)
             if df_ibov.empty or df_ibov.isna().all() or pd.isna(df_ibov.iloc[0]):
@@ -88,22 +89,22 @@ def calcular_retorno_ibov(ibov: dict) -> dict:
 
     return ibov_return_dict
 
-def calcular_retorno_diario_ibov(ibov: dict) -> pd.Series:
+def calcular_retorno_diario_ibov(ibov) -> pd.Series:
     """
     Calcula os retornos diários do IBOV em formato decimal, com índice datetime.
 
     Args:
-        ibov (dict): Dicionário de preços do IBOV {data: preço}.
+        ibov (dict | pd.Series): Preços do IBOV {data: preço}.
 
     Returns:
         pd.Series: Série de retornos diários do IBOV com índice datetime.
     """
-    if not ibov:
+    if ibov is None or len(ibov) == 0:
         return pd.Series(dtype=float)
 
     try:
         df_ibov = pd.Series(ibov)
-        df_ibov.index = pd.to_datetime(df_ibov.index)
+        df_ibov.index = indice_datetime(df_ibov.index)
         df_ibov = df_ibov.sort_index()
         
         if df_ibov.empty or df_ibov.isna().all() or pd.isna(df_ibov.iloc[0]):
@@ -0,0 +1,107 @@
+from typing import Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+from .kpis_calc import ensure_datetime_index
+from .utils import measure_time
+
+# Janelas (em pregões) oferecidas na aba Risco: ~1 mês, ~1 trimestre, ~1 ano
+JANELAS = (21, 63, 252)
+
+# Métricas móveis, com as mesmas definições (anualizadas) de calcular_kpis
+METRICAS_ROLANTES = ('sharpe', 'sortino', 'volatilidade', 'retorno_medio_anual', 'alpha', 'beta')
+
+
+def _somar_janela(valores: np.ndarray, janela: int) -> np.ndarray:
+    """
+    Soma móvel das últimas `janela` linhas de cada coluna em O(n), por diferença de somas acumuladas.
+
+    Args:
+        valores (np.ndarray): Matriz dias × colunas, já sem NaN (ausentes como zero).
+        janela (int): Tamanho da janela em linhas.
+    """
+    acumulado = np.cumsum(np.vstack([np.zeros((1, valores.shape[1])), valores]), axis=0)
+    inicio = np.maximum(np.arange(1, len(valores) + 1) - janela, 0)
+    return acumulado[1:] - acumulado[inicio]
+
+
+def _centralizar(valores: np.ndarray, validos: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Subtrai a média de cada coluna antes das somas acumuladas, evitando o cancelamento
+    numérico de var = (Σx² - (Σx)²/n) em séries longas. Retorna (centralizados com zeros
+    nos ausentes, médias).
+    """
+    zerados = np.where(validos, valores, 0.0)
+    medias = zerados.sum(axis=0) / np.maximum(validos.sum(axis=0), 1)
+    return np.where(validos, valores - medias, 0.0), medias
+
+
+@measure_time
+def calcular_metricas_rolantes(retornos: pd.DataFrame, janela: int, benchmark: Optional[pd.Series] = None,
+                               min_periodos: Optional[int] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Calcula Sharpe, Sortino, volatilidade, retorno médio e alpha/beta em janelas móveis.
+
+    Cada estatística sai de somas móveis (Σr, Σr², Σr²⁻, Σrb, Σb, Σb²) obtidas por somas
+    acumuladas, então o custo é O(dias × colunas) independentemente do tamanho da janela,
+    em vez do O(dias × janela) de `rolling().apply`.
+
+    Args:
+        retornos (pd.DataFrame): Retornos diários em decimal (datas × séries); NaN = sem pregão.
+        janela (int): Tamanho da janela em dias do índice (e.g., 21, 63, 252).
+        benchmark (pd.Series, optional): Retornos diários do benchmark em decimal (para alpha/beta).
+        min_periodos (int, optional): Mínimo de observações na janela; padrão: a janela inteira.
+
+    Returns:
+        dict: {métrica: DataFrame datas × séries}, com as chaves de METRICAS_ROLANTES.
+              alpha e beta são NaN sem benchmark.
+    """
+    if janela < 2:
+        raise ValueError("A janela deve ter ao menos 2 dias")
+    retornos = ensure_datetime_index(retornos.copy()).sort_index()
+    min_periodos = max(2, min_periodos or janela)
+
+    valores = retornos.to_numpy(dtype=float)
+    validos = ~np.isnan(valores)
+    centrados, medias = _centralizar(valores, validos)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        n = _somar_janela(validos.astype(float), janela)
+        soma = _somar_janela(centrados, janela)
+        soma_quadrados = _somar_janela(centrados ** 2, janela)
+        negativos = np.where(validos & (valores < 0), valores, 0.0)
+        soma_negativos = _somar_janela(negativos ** 2, janela)
+
+        media = soma / n + medias
+        variancia = np.maximum(soma_quadrados - soma ** 2 / n, 0.0) / (n - 1)
+
+        retorno_medio_anual = media * 252
+        volatilidade = np.sqrt(variancia) * np.sqrt(252)
+        sharpe = np.where(np.isclose(volatilidade, 0), np.nan, retorno_medio_anual / volatilidade)
+        downside = np.sqrt(soma_negativos / n) * np.sqrt(252)
+        sortino = np.where(np.isclose(downside, 0), np.nan, retorno_medio_anual / downside)
+
+        alpha = np.full_like(valores, np.nan)
+        beta = np.full_like(valores, np.nan)
+        if benchmark is not None and not benchmark.empty:
+            bench = ensure_datetime_index(benchmark.copy()).reindex(retornos.index).to_numpy(dtype=float)[:, None]
+            pares = validos & ~np.isnan(bench)
+            p_centrado, media_p_global = _centralizar(valores, pares)
+            b_centrado, media_b_global = _centralizar(np.broadcast_to(bench, valores.shape), pares)
+            n_pares = _somar_janela(pares.astype(float), janela)
+            soma_p = _somar_janela(p_centrado, janela)
+            soma_b = _somar_janela(b_centrado, janela)
+            covariancia = (_somar_janela(p_centrado * b_centrado, janela) - soma_p * soma_b / n_pares) / (n_pares - 1)
+            variancia_b = np.maximum(_somar_janela(b_centrado ** 2, janela) - soma_b ** 2 / n_pares, 0.0) / (n_pares - 1)
+            beta = np.where(np.isclose(variancia_b, 0), np.nan, covariancia / variancia_b)
+            alpha = (soma_p / n_pares + media_p_global - beta * (soma_b / n_pares + media_b_global)) * 252
+            insuficiente_pares = n_pares < min_periodos
+            alpha[insuficiente_pares] = np.nan
+            beta[insuficiente_pares] = np.nan
+
+    insuficiente = n < min_periodos
+    resultado = {}
+    for nome, matriz in (('sharpe', sharpe), ('sortino', sortino), ('volatilidade', volatilidade),
+                         ('retorno_medio_anual', retorno_medio_anual), ('alpha', alpha), ('beta', beta)):
+        matriz = np.where(insuficiente, np.nan, matriz)
+        resultado[nome] = pd.DataFrame(matriz, index=retornos.index, columns=retornos.columns)
+    return resultado
@@ -0,0 +1,91 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Callable, List, Optional
+import numpy as np
+
+# Máximo de números aleatórios por bloco (~32 MB em float64); limita a memória de qualquer simulação
+MAX_ELEMENTOS_BLOCO = int(os.getenv('FINDASH_SIM_MAX_ELEMENTOS', 4_000_000))
+# A partir dessa quantidade de simulações os blocos são distribuídos num pool de processos
+LIMIAR_PROCESSOS = int(os.getenv('FINDASH_SIM_LIMIAR_PROCESSOS', 200_000))
+MAX_PROCESSOS = int(os.getenv('FINDASH_SIM_PROCESSOS', os.cpu_count() or 1))
+
+# Gera `n` simulações com o gerador recebido; precisa ser picklable (função de módulo ou partial)
+GeradorBloco = Callable[[np.random.Generator, int], np.ndarray]
+
+
+def dividir_simulacoes(n_simulacoes: int, elementos_por_simulacao: int) -> List[int]:
+    """
+    Divide as simulações em blocos de até MAX_ELEMENTOS_BLOCO números aleatórios.
+
+    Args:
+        n_simulacoes (int): Total de simulações.
+        elementos_por_simulacao (int): Números aleatórios por simulação (e.g., horizonte × ativos).
+
+    Returns:
+        list: Tamanho de cada bloco (a soma é `n_simulacoes`).
+    """
+    bloco = max(1, MAX_ELEMENTOS_BLOCO // max(1, elementos_por_simulacao))
+    completos, resto = divmod(n_simulacoes, bloco)
+    return [bloco] * completos + ([resto] if resto else [])
+
+
+def _executar_bloco(gerador: GeradorBloco, semente: np.random.SeedSequence, n: int) -> np.ndarray:
+    return gerador(np.random.default_rng(semente), n)
+
+
+def simular(gerador: GeradorBloco, n_simulacoes: int, elementos_por_simulacao: int,
+            seed: Optional[int] = None, processos: Optional[bool] = None) -> np.ndarray:
+    """
+    Executa uma simulação de Monte Carlo em blocos, em série ou num pool de processos.
+
+    Cada bloco recebe um gerador próprio derivado de `seed` (SeedSequence.spawn), de modo que
+    o resultado é o mesmo em série ou em processos.
+
+    Args:
+        gerador (callable): Função (rng, n) -> array com `n` simulações no primeiro eixo.
+        n_simulacoes (int): Total de simulações.
+        elementos_por_simulacao (int): Números aleatórios por simulação, para dimensionar os blocos.
+        seed (int, optional): Semente; None gera resultados diferentes a cada chamada.
+        processos (bool, optional): Força (True) ou impede (False) o uso do pool de processos.
+            Padrão: usa o pool a partir de LIMIAR_PROCESSOS simulações, se houver mais de um núcleo.
+
+    Returns:
+        np.ndarray: Resultados dos blocos concatenados no primeiro eixo.
+    """
+    tamanhos = dividir_simulacoes(n_simulacoes, elementos_por_simulacao)
+    sementes = np.random.SeedSequence(seed).spawn(len(tamanhos))
+    if processos is None:
+        processos = n_simulacoes >= LIMIAR_PROCESSOS and MAX_PROCESSOS > 1
+    if processos and len(tamanhos) > 1:
+        with ProcessPoolExecutor(max_workers=min(MAX_PROCESSOS, len(tamanhos))) as pool:
+            partes = list(pool.map(_executar_bloco, repeat(gerador), sementes, tamanhos))
+    else:
+        partes = [_executar_bloco(gerador, semente, n) for semente, n in zip(sementes, tamanhos)]
+    return np.concatenate(partes) if partes else np.empty(0)
+
+
+def raiz_covariancia(covariancia: np.ndarray) -> np.ndarray:
+    """
+    Matriz L com L @ L.T = covariância, para gerar choques correlacionados.
+
+    Usa Cholesky e, se a matriz não for positiva definida (ativos colineares, histórico curto),
+    a decomposição espectral com autovalores negativos zerados.
+    """
+    try:
+        return np.linalg.cholesky(covariancia)
+    except np.linalg.LinAlgError:
+        autovalores, autovetores = np.linalg.eigh(covariancia)
+        return autovetores * np.sqrt(np.clip(autovalores, 0, None))
+
+
+def normal_multivariada(rng: np.random.Generator, n: int, media: np.ndarray, raiz: np.ndarray,
+                        horizonte: int) -> np.ndarray:
+    """
+    Retornos diários simulados de vários ativos com distribuição normal multivariada.
+
+    Returns:
+        np.ndarray: Shape (n, horizonte, ativos).
+    """
+    choques = rng.standard_normal((n, horizonte, len(media)))
+    return media + choques @ raiz.T
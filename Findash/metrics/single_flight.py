@@ -0,0 +1,150 @@
+import hashlib
+import time
+from uuid import uuid4
+from typing import Any, Callable, Dict, Optional
+from redis import Redis
+from redis.exceptions import RedisError
+from utils.serialization import orjson_dumps, orjson_loads
+from Findash.utils.logging_tools import logger
+from Findash.utils.instrumentation import contar
+
+# Libera o lock apenas se ele ainda pertencer a quem o adquiriu
+_LIBERAR_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """
+    Garante que chamadas idênticas e simultâneas (em qualquer processo) executem a função uma única vez.
+
+    O primeiro chamador adquire um lock no Redis, executa a função e publica o resultado numa
+    chave com TTL curto. Os demais aguardam essa chave e reutilizam o resultado; se o líder
+    falhar ou demorar mais que `espera_max`, executam a função por conta própria.
+
+    Contadores em `{prefixo}:stats`:
+        - lider: execuções feitas pelo detentor do lock.
+        - deduplicadas: chamadas atendidas com o resultado de outro chamador.
+        - fallback: chamadas que desistiram de esperar e executaram a função.
+        - erros_redis: chamadas em que o Redis falhou (executadas sem coordenação).
+    """
+
+    def __init__(self, redis_client: Redis, prefixo: str = 'singleflight', lock_ttl: int = 30,
+                 resultado_ttl: int = 60, espera_max: float = 15.0, intervalo: float = 0.05):
+        self.redis = redis_client
+        self.prefixo = prefixo
+        self.lock_ttl = lock_ttl
+        self.resultado_ttl = resultado_ttl
+        self.espera_max = espera_max
+        self.intervalo = intervalo
+
+    @staticmethod
+    def gerar_chave(*partes: Any) -> str:
+        """Gera um hash estável a partir das partes que identificam a chamada."""
+        return hashlib.sha1(orjson_dumps(partes)).hexdigest()
+
+    def _contar(self, campo: str) -> None:
+        contar('findash_single_flight_total', desfecho=campo)
+        try:
+            self.redis.hincrby(f"{self.prefixo}:stats", campo, 1)
+        except RedisError:
+            pass
+
+    def estatisticas(self) -> Dict[str, int]:
+        """Retorna os contadores acumulados de execuções e deduplicações."""
+        try:
+            brutos = self.redis.hgetall(f"{self.prefixo}:stats")
+        except RedisError as e:
+            logger.warning(f"[SingleFlight] Erro ao ler estatísticas: {e}")
+            return {}
+        return {k.decode() if isinstance(k, bytes) else k: int(v) for k, v in brutos.items()}
+
+    def executar(self, chave: str, func: Callable[[], Any],
+                 serializar: Callable[[Any], bytes] = orjson_dumps,
+                 desserializar: Callable[[bytes], Any] = orjson_loads) -> Any:
+        """
+        Executa `func` uma única vez para a chave informada, compartilhando o resultado.
+
+        Args:
+            chave (str): Identificador da chamada (ver `gerar_chave`).
+            func (callable): Função sem argumentos que produz o resultado.
+            serializar (callable): Converte o resultado em bytes para o Redis.
+            desserializar (callable): Reconstrói o resultado a partir dos bytes.
+
+        Returns:
+            Resultado de `func`, calculado localmente ou por outro chamador.
+        """
+        chave_lock = f"{self.prefixo}:lock:{chave}"
+        chave_resultado = f"{self.prefixo}:resultado:{chave}"
+        token = uuid4().hex
+
+        try:
+            bruto = self.redis.get(chave_resultado)
+            if bruto is not None:
+                self._contar('deduplicadas')
+                return desserializar(bruto)
+            lider = self.redis.set(chave_lock, token, nx=True, ex=self.lock_ttl)
+        except RedisError as e:
+            logger.warning(f"[SingleFlight] Redis indisponível, executando sem coordenação: {e}")
+            self._contar('erros_redis')
+            return func()
+
+        if lider:
+            try:
+                resultado = func()
+                try:
+                    self.redis.set(chave_resultado, serializar(resultado), ex=self.resultado_ttl)
+                except RedisError as e:
+                    logger.warning(f"[SingleFlight] Falha ao publicar resultado de {chave}: {e}")
+                self._contar('lider')
+                return resultado
+            finally:
+                try:
+                    self.redis.eval(_LIBERAR_LOCK, 1, chave_lock, token)
+                except RedisError:
+                    pass
+
+        # Seguidor: aguarda o resultado do líder enquanto o lock existir
+        limite = time.monotonic() + self.espera_max
+        while time.monotonic() < limite:
+            time.sleep(self.intervalo)
+            try:
+                bruto = self.redis.get(chave_resultado)
+                if bruto is not None:
+                    self._contar('deduplicadas')
+                    logger.info(f"[SingleFlight] Resultado reutilizado para {chave}")
+                    return desserializar(bruto)
+                if not self.redis.exists(chave_lock):
+                    break
+            except RedisError:
+                break
+
+        logger.warning(f"[SingleFlight] Líder não publicou resultado para {chave}; executando localmente")
+        self._contar('fallback')
+        return func()
+
+
+_single_flight: Optional[SingleFlight] = None
+
+
+def configurar_single_flight(redis_client: Optional[Redis], **kwargs) -> Optional[SingleFlight]:
+    """
+    Ativa (ou desativa, com None) o single-flight usado pelos downloads de dados de mercado.
+
+    Args:
+        redis_client (redis.Redis): Conexão Redis compartilhada entre os workers.
+        **kwargs: Parâmetros repassados para SingleFlight.
+
+    Returns:
+        SingleFlight: Instância configurada, ou None se desativado.
+    """
+    global _single_flight
+    _single_flight = SingleFlight(redis_client, **kwargs) if redis_client is not None else None
+    return _single_flight
+
+
+def obter_single_flight() -> Optional[SingleFlight]:
+    return _single_flight
@@ -0,0 +1,210 @@
+from datetime import date, timedelta
+from typing import List, Tuple, Union
+import numpy as np
+import pandas as pd
+
+# Intervalo de anos pré-calculado; datas fora dele são tratadas como sem pregão
+ANO_INICIAL = 1990
+ANO_FINAL = 2040
+
+PERIODOS = ('mensal', 'trimestral', 'semestral', 'anual')
+
+Datas = Union[str, date, pd.Timestamp, pd.DatetimeIndex, np.ndarray, list, pd.Index]
+
+
+def _pascoa(ano: int) -> date:
+    """Domingo de Páscoa (algoritmo de Meeus/Jones/Butcher)."""
+    a, b, c = ano % 19, ano // 100, ano % 100
+    d, e = b // 4, b % 4
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 19 * l) // 433
+    mes = (h + l - 7 * m + 90) // 25
+    dia = (h + l - 7 * m + 33 * mes + 19) % 32
+    return date(ano, mes, dia)
+
+
+def feriados_b3(ano: int) -> List[date]:
+    """
+    Dias sem pregão na B3 no ano (além de sábados e domingos).
+
+    Inclui feriados nacionais, Carnaval, Sexta-feira Santa, Corpus Christi, véspera de Natal e
+    último dia do ano. Os feriados municipais de São Paulo (25/01, 09/07 e 20/11) fecharam a
+    bolsa até 2021; o 20/11 voltou a fechar em 2024, como feriado nacional.
+    """
+    pascoa = _pascoa(ano)
+    dias = [
+        date(ano, 1, 1), date(ano, 4, 21), date(ano, 5, 1), date(ano, 9, 7), date(ano, 10, 12),
+        date(ano, 11, 2), date(ano, 11, 15), date(ano, 12, 24), date(ano, 12, 25), date(ano, 12, 31),
+        pascoa - timedelta(days=48),  # Carnaval (segunda)
+        pascoa - timedelta(days=47),  # Carnaval (terça)
+        pascoa - timedelta(days=2),   # Sexta-feira Santa
+        pascoa + timedelta(days=60),  # Corpus Christi
+    ]
+    if ano <= 2021:
+        dias += [date(ano, 1, 25), date(ano, 7, 9)]
+    if ano <= 2021 or ano >= 2024:
+        dias.append(date(ano, 11, 20))
+    return sorted(set(dias))
+
+
+def para_dias(datas: Datas) -> np.ndarray:
+    """
+    Converte datas em dias desde 1970-01-01 (int32). Caminho único de conversão do projeto.
+
+    Aceita 'YYYY-MM-DD' (escalar ou lista), date, Timestamp, DatetimeIndex ou datetime64.
+    """
+    if isinstance(datas, pd.DatetimeIndex):
+        valores = datas.tz_localize(None) if datas.tz is not None else datas
+        return valores.values.astype('datetime64[D]').astype(np.int32)
+    try:
+        return np.asarray(datas, dtype='datetime64[D]').astype(np.int32)
+    except (ValueError, TypeError):
+        # Formatos menos comuns (e.g., '2024-01-02 00:00:00', Timestamps com fuso)
+        indice = pd.DatetimeIndex(np.atleast_1d(np.asarray(datas, dtype=object)))
+        dias = para_dias(indice)
+        return dias if np.ndim(datas) else dias[0]
+
+
+def para_iso(dias: np.ndarray) -> np.ndarray:
+    """Converte dias desde 1970-01-01 em strings 'YYYY-MM-DD' (vetorizado)."""
+    return np.datetime_as_string(np.asarray(dias).astype('datetime64[D]'), unit='D')
+
+
+def para_datetime(dias: np.ndarray) -> pd.DatetimeIndex:
+    """Converte dias desde 1970-01-01 em DatetimeIndex."""
+    return pd.DatetimeIndex(np.asarray(dias).astype('datetime64[D]').astype('datetime64[ns]'))
+
+
+def indice_datetime(indice) -> pd.DatetimeIndex:
+    """Normaliza um índice de datas (strings ISO, Timestamps...) para DatetimeIndex sem fuso."""
+    if isinstance(indice, pd.DatetimeIndex) and indice.tz is None:
+        return indice
+    return para_datetime(para_dias(indice))
+
+
+def codigos_periodo(dias: np.ndarray, tipo: str) -> np.ndarray:
+    """
+    Código inteiro e crescente do período de cada dia (e.g., ano * 12 + mês - 1 para 'mensal').
+
+    Args:
+        dias (np.ndarray): Dias desde 1970-01-01.
+        tipo (str): 'mensal', 'trimestral', 'semestral' ou 'anual'.
+    """
+    meses = np.asarray(dias).astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)  # meses desde 1970-01
+    if tipo == 'mensal':
+        return meses
+    if tipo == 'trimestral':
+        return meses // 3
+    if tipo == 'semestral':
+        return meses // 6
+    if tipo == 'anual':
+        return meses // 12
+    raise ValueError("Período deve ser 'mensal', 'trimestral', 'semestral' ou 'anual'")
+
+
+def rotulo_periodo(codigo: int, tipo: str) -> str:
+    """Rótulo legível de um código de período: '2024-01', '2024-Q1', '2024-S1' ou '2024'."""
+    if tipo == 'mensal':
+        return f"{1970 + codigo // 12}-{codigo % 12 + 1:02d}"
+    if tipo == 'trimestral':
+        return f"{1970 + codigo // 4}-Q{codigo % 4 + 1}"
+    if tipo == 'semestral':
+        return f"{1970 + codigo // 2}-S{codigo % 2 + 1}"
+    if tipo == 'anual':
+        return str(1970 + codigo)
+    raise ValueError("Período deve ser 'mensal', 'trimestral', 'semestral' ou 'anual'")
+
+
+def agrupar_por_periodo(dias: np.ndarray, tipo: str) -> Tuple[np.ndarray, List[str]]:
+    """
+    Agrupa dias em períodos de calendário (vetorizado).
+
+    Args:
+        dias (np.ndarray): Dias desde 1970-01-01, em ordem crescente.
+        tipo (str): 'mensal', 'trimestral', 'semestral' ou 'anual'.
+
+    Returns:
+        tuple: (grupo, rotulos) — `grupo[i]` é o índice em `rotulos` do período do dia `i`.
+    """
+    codigos, grupo = np.unique(codigos_periodo(dias, tipo), return_inverse=True)
+    return grupo.astype(np.int32), [rotulo_periodo(int(c), tipo) for c in codigos]
+
+
+def fatiar(dias: np.ndarray, inicio=None, fim=None) -> slice:
+    """
+    Fatia de um eixo de dias ordenado com as datas em [inicio, fim] (ambos inclusivos).
+
+    Args:
+        dias (np.ndarray): Dias desde 1970-01-01, em ordem crescente.
+        inicio, fim: Limites (qualquer formato aceito por `para_dias`); None = sem limite.
+    """
+    i = int(np.searchsorted(dias, para_dias(inicio), side='left')) if inicio is not None else 0
+    j = int(np.searchsorted(dias, para_dias(fim), side='right')) if fim is not None else len(dias)
+    return slice(i, max(i, j))
+
+
+class B3Calendar:
+    """
+    Calendário de pregões da B3 pré-calculado, com deslocamentos inteiros densos.
+
+    O pregão de número `k` é `pregoes[k]` (dias desde 1970-01-01); `offsets` faz o caminho
+    inverso com uma busca binária vetorizada. Diferenças de offsets contam pregões.
+    """
+
+    def __init__(self, ano_inicial: int = ANO_INICIAL, ano_final: int = ANO_FINAL):
+        inicio = para_dias(f"{ano_inicial}-01-01")
+        fim = para_dias(f"{ano_final + 1}-01-01")
+        dias = np.arange(inicio, fim, dtype=np.int32)
+        # 1970-01-01 foi quinta-feira: (dia + 3) % 7 dá 0 para segunda
+        uteis = (dias + 3) % 7 < 5
+        feriados = para_dias([d for ano in range(ano_inicial, ano_final + 1) for d in feriados_b3(ano)])
+        uteis &= ~np.isin(dias, feriados)
+        self.inicio, self.fim = int(inicio), int(fim)
+        self.pregoes = dias[uteis]
+        self._eh_pregao = uteis
+
+    def eh_pregao(self, datas: Datas):
+        """Indica se cada data é dia de pregão (bool ou array de bool)."""
+        dias = para_dias(datas)
+        vetor = np.atleast_1d(dias)
+        dentro = (vetor >= self.inicio) & (vetor < self.fim)
+        resultado = np.zeros(len(vetor), dtype=bool)
+        resultado[dentro] = self._eh_pregao[vetor[dentro] - self.inicio]
+        return bool(resultado[0]) if np.ndim(dias) == 0 else resultado
+
+    def offsets(self, datas: Datas, anterior: bool = False) -> np.ndarray:
+        """
+        Número do pregão de cada data. Datas sem pregão vão para o pregão seguinte
+        (ou para o anterior, com `anterior=True`).
+        """
+        dias = para_dias(datas)
+        if anterior:
+            return np.searchsorted(self.pregoes, dias, side='right') - 1
+        return np.searchsorted(self.pregoes, dias, side='left')
+
+    def dias(self, offsets: np.ndarray) -> np.ndarray:
+        """Dias (desde 1970-01-01) dos pregões de número `offsets`."""
+        return self.pregoes[np.clip(offsets, 0, len(self.pregoes) - 1)]
+
+    def pregoes_entre(self, inicio, fim) -> np.ndarray:
+        """Pregões em [inicio, fim] (inclusivos), como dias desde 1970-01-01."""
+        return self.pregoes[fatiar(self.pregoes, inicio, fim)]
+
+    def contar_pregoes(self, inicio, fim) -> int:
+        """Quantidade de pregões em [inicio, fim]."""
+        fatia = fatiar(self.pregoes, inicio, fim)
+        return fatia.stop - fatia.start
+
+    def ultimo_pregao(self, ate) -> date:
+        """Último pregão em ou antes de `ate`."""
+        return para_datetime(self.dias(np.atleast_1d(self.offsets(ate, anterior=True))))[0].date()
+
+    def proximo_pregao(self, desde) -> date:
+        """Primeiro pregão em ou depois de `desde`."""
+        return para_datetime(self.dias(np.atleast_1d(self.offsets(desde))))[0].date()
+
+
+b3_calendar = B3Calendar()
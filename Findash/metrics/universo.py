@@ -0,0 +1,352 @@
+import argparse
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+from Findash.utils.logging_tools import logger
+from Findash.utils.setors_bv import SETORIAL_B3, raiz_ticker
+from .batch_kpis import calcular_kpis_lote
+from .data_fetch import obter_historico
+from .panel import PricePanel
+from .price_store import B3_TZ
+from .trading_calendar import para_dias, para_iso
+from .utils import measure_time
+
+LISTA_B3 = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'docs', 'acoes-listadas-b3.csv')
+UNIVERSO_DB = os.getenv(
+    'FINDASH_UNIVERSO_DB',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'universo.sqlite')
+)
+
+# Retorno acumulado até o último pregão, em pregões
+JANELAS_RETORNO = {'retorno_1m': 21, 'retorno_3m': 63, 'retorno_6m': 126, 'retorno_12m': 252}
+# Pregões usados em volatilidade, alpha/beta (vs IBOV), Sharpe e drawdown
+JANELA_RISCO = 252
+# Pregões da média de volume financeiro (liquidez)
+JANELA_LIQUIDEZ = 21
+# Histórico carregado (dias corridos): cobre a maior janela com folga para feriados
+DIAS_HISTORICO = 400
+
+# Colunas da tabela, na ordem de gravação (além de 'ticker')
+COLUNAS_UNIVERSO = (
+    'setor', 'subsetor', 'segmento', 'data', 'preco',
+    *JANELAS_RETORNO, 'retorno_medio_anual', 'volatilidade', 'sharpe', 'max_drawdown',
+    'alpha', 'beta', 'dividend_yield', 'liquidez', 'pregoes', 'atualizado_em',
+)
+# Colunas com índice secundário (filtros e ordenação sem varrer a tabela)
+COLUNAS_INDEXADAS = ('setor', 'subsetor', 'segmento', 'retorno_12m', 'volatilidade', 'beta',
+                     'dividend_yield', 'liquidez')
+# Screener: colunas aceitas em filtros de faixa e na ordenação (os nomes entram no SQL, os valores não)
+COLUNAS_CLASSIFICACAO = ('setor', 'subsetor', 'segmento')
+COLUNAS_FAIXA = (
+    'preco', *JANELAS_RETORNO, 'retorno_medio_anual', 'volatilidade', 'sharpe', 'max_drawdown',
+    'alpha', 'beta', 'dividend_yield', 'liquidez',
+)
+COLUNAS_ORDENAVEIS = ('ticker', *COLUNAS_CLASSIFICACAO, *COLUNAS_FAIXA)
+MAX_POR_PAGINA = 100
+
+
+def tickers_universo(caminho: str = LISTA_B3) -> List[str]:
+    """Tickers listados na B3 (Findash/docs/acoes-listadas-b3.csv), sem repetições."""
+    tickers = pd.read_csv(caminho)['Ticker'].dropna().astype(str).str.strip()
+    # A lista da B3 repete alguns códigos
+    return list(dict.fromkeys(t for t in tickers if t))
+
+
+def _classificacao(ticker: str) -> Dict[str, str]:
+    info = SETORIAL_B3.get(raiz_ticker(ticker), {})
+    setor = info.get('setor', 'Outros')
+    subsetor = info.get('subsetor', setor)
+    return {'setor': setor, 'subsetor': subsetor, 'segmento': info.get('segmento', subsetor)}
+
+
+def _preencher_adiante(precos: np.ndarray) -> np.ndarray:
+    """Último índice de coluna com preço em cada posição (-1 antes do primeiro preço)."""
+    indice = np.where(~np.isnan(precos), np.arange(precos.shape[1]), -1)
+    return np.maximum.accumulate(indice, axis=1)
+
+
+@measure_time
+def calcular_estatisticas_universo(painel: PricePanel, volumes: np.ndarray) -> pd.DataFrame:
+    """
+    Estatísticas de todos os tickers do painel numa única passada vetorizada sobre a matriz
+    tickers × pregões.
+
+    Retornos nas janelas de JANELAS_RETORNO (até o último pregão do painel, com o último preço
+    de cada ticker); retorno médio anual, volatilidade, Sharpe, drawdown máximo e alpha/beta vs
+    IBOV nos últimos JANELA_RISCO pregões (via `calcular_kpis_lote`, com cada ticker como
+    carteira de uma ação); dividend yield dos últimos 12 meses sobre o último preço; e liquidez
+    como o volume financeiro médio (preço × volume) dos últimos JANELA_LIQUIDEZ pregões.
+
+    Args:
+        painel (PricePanel): Painel do universo, com o IBOV como benchmark.
+        volumes (np.ndarray): Volume negociado alinhado a `painel.precos` (NaN = sem dado).
+
+    Returns:
+        pd.DataFrame: Uma linha por ticker (índice) e as colunas de COLUNAS_UNIVERSO, exceto
+            'atualizado_em'. Tickers sem nenhum preço ficam de fora.
+    """
+    precos = painel.precos
+    n_tickers, n_dias = precos.shape
+    if not n_dias:
+        return pd.DataFrame(columns=list(COLUNAS_UNIVERSO[:-1]), index=pd.Index([], name='ticker'))
+
+    ultimos = _preencher_adiante(precos)
+    com_preco = ultimos[:, -1] >= 0
+    linhas = np.arange(n_tickers)
+    ultimo_indice = np.maximum(ultimos[:, -1], 0)
+    ultimo_preco = np.where(com_preco, precos[linhas, ultimo_indice], np.nan)
+    estatisticas = {'data': para_iso(painel.dias[ultimo_indice]), 'preco': ultimo_preco}
+
+    # Retornos por janela: último preço até a data-base de cada janela vs último preço
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for nome, pregoes in JANELAS_RETORNO.items():
+            if n_dias <= pregoes:
+                estatisticas[nome] = np.full(n_tickers, np.nan)
+                continue
+            base_indice = ultimos[:, n_dias - 1 - pregoes]
+            base = np.where(base_indice >= 0, precos[linhas, np.maximum(base_indice, 0)], np.nan)
+            estatisticas[nome] = ultimo_preco / base - 1
+
+    inicio_risco = max(0, n_dias - JANELA_RISCO - 1)
+    recorte = PricePanel(
+        dias=painel.dias[inicio_risco:], tickers=painel.tickers,
+        precos=precos[:, inicio_risco:], benchmark=painel.benchmark[inicio_risco:]
+    )
+    kpis = calcular_kpis_lote(np.eye(n_tickers), recorte, ids=painel.tickers, tamanho_lote=None)
+    for nome in ('retorno_medio_anual', 'volatilidade', 'sharpe', 'max_drawdown', 'alpha', 'beta'):
+        estatisticas[nome] = kpis[nome].to_numpy()
+    estatisticas['pregoes'] = (~np.isnan(recorte.precos)).sum(axis=1)
+
+    # Dividendos por ação dos últimos 12 meses (dias corridos) sobre o último preço
+    if len(painel.div_valor):
+        recentes = painel.dias[painel.div_dia] > painel.dias[-1] - 365
+        dividendos = np.bincount(painel.div_ticker[recentes], weights=painel.div_valor[recentes], minlength=n_tickers)
+    else:
+        dividendos = np.zeros(n_tickers)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        estatisticas['dividend_yield'] = np.where(ultimo_preco > 0, dividendos / ultimo_preco, np.nan)
+
+    financeiro = precos[:, -JANELA_LIQUIDEZ:] * volumes[:, -JANELA_LIQUIDEZ:]
+    pregoes_liquidez = (~np.isnan(financeiro)).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        estatisticas['liquidez'] = np.where(pregoes_liquidez > 0, np.nansum(financeiro, axis=1) / pregoes_liquidez, np.nan)
+
+    resultado = pd.DataFrame(estatisticas, index=pd.Index(painel.tickers, name='ticker'))
+    classificacao = pd.DataFrame([_classificacao(t) for t in painel.tickers], index=resultado.index)
+    resultado = pd.concat([classificacao, resultado], axis=1)[list(COLUNAS_UNIVERSO[:-1])]
+    return resultado[com_preco]
+
+
+def carregar_universo(tickers: Sequence[str], start_date: str, end_date: str) -> tuple:
+    """
+    Painel do universo (com o IBOV) e a matriz de volumes alinhada, a partir do PriceStore.
+
+    Returns:
+        tuple: (PricePanel, volumes tickers × pregões, status por ticker).
+    """
+    normalizados = [f"{t}.SA" if not t.endswith('.SA') else t for t in tickers]
+    historico, status = obter_historico(normalizados + ['^BVSP'], start_date, end_date)
+    painel = PricePanel.from_historico(
+        historico, normalizados, nomes={t: t.replace('.SA', '') for t in normalizados}, benchmark='^BVSP'
+    )
+    volumes = np.full(painel.precos.shape, np.nan)
+    for i, ticker in enumerate(normalizados):
+        df = historico.get(ticker)
+        if df is not None and not df.empty:
+            volumes[i, np.searchsorted(painel.dias, para_dias(df.index))] = df['volume'].to_numpy(dtype=np.float64)
+    return painel, volumes, status
+
+
+class EstatisticasUniverso:
+    """
+    Tabela SQLite com as estatísticas pré-calculadas de cada ticker listado (uma linha por
+    ticker), para consultas pontuais em tooltips, cards e na prévia de inclusão de tickers, e
+    para o screener (filtros e ordenação pelas colunas indexadas).
+
+    Cada atualização substitui a tabela inteira numa única transação; com o journal em WAL,
+    leitores continuam vendo a versão anterior até o commit.
+    """
+
+    def __init__(self, caminho: str = UNIVERSO_DB):
+        self.caminho = caminho
+
+    def conectar(self) -> sqlite3.Connection:
+        conexao = sqlite3.connect(self.caminho)
+        conexao.row_factory = sqlite3.Row
+        return conexao
+
+    def criar(self, conexao: sqlite3.Connection) -> None:
+        texto = {'setor', 'subsetor', 'segmento', 'data', 'atualizado_em'}
+        colunas = ', '.join(f"{c} {'TEXT' if c in texto else 'INTEGER' if c == 'pregoes' else 'REAL'}"
+                            for c in COLUNAS_UNIVERSO)
+        conexao.execute('PRAGMA journal_mode=WAL')
+        conexao.execute(f"CREATE TABLE IF NOT EXISTS estatisticas (ticker TEXT PRIMARY KEY, {colunas})")
+        for coluna in COLUNAS_INDEXADAS:
+            conexao.execute(f"CREATE INDEX IF NOT EXISTS idx_estatisticas_{coluna} ON estatisticas ({coluna})")
+
+    def gravar(self, estatisticas: pd.DataFrame, atualizado_em: Optional[str] = None) -> int:
+        """
+        Substitui o conteúdo da tabela pelas estatísticas recebidas.
+
+        Returns:
+            int: Linhas gravadas.
+        """
+        atualizado_em = atualizado_em or datetime.now(B3_TZ).isoformat(timespec='seconds')
+        dados = estatisticas.assign(atualizado_em=atualizado_em)[list(COLUNAS_UNIVERSO)]
+        dados = dados.astype(object).where(dados.notna(), None)
+        linhas = [(ticker, *valores) for ticker, valores in zip(dados.index, dados.itertuples(index=False, name=None))]
+        os.makedirs(os.path.dirname(os.path.abspath(self.caminho)), exist_ok=True)
+        with self.conectar() as conexao:
+            self.criar(conexao)
+            conexao.execute('DELETE FROM estatisticas')
+            conexao.executemany(
+                f"INSERT INTO estatisticas (ticker, {', '.join(COLUNAS_UNIVERSO)}) "
+                f"VALUES ({', '.join('?' * (len(COLUNAS_UNIVERSO) + 1))})",
+                linhas
+            )
+        return len(linhas)
+
+    def obter(self, tickers: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Estatísticas dos tickers pedidos (busca pela chave primária).
+
+        Returns:
+            dict: {ticker: {coluna: valor}}; tickers sem estatísticas ficam de fora.
+        """
+        tickers = [t.replace('.SA', '').upper() for t in tickers]
+        if not tickers or not os.path.exists(self.caminho):
+            return {}
+        try:
+            with self.conectar() as conexao:
+                linhas = conexao.execute(
+                    f"SELECT * FROM estatisticas WHERE ticker IN ({', '.join('?' * len(tickers))})", tickers
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"[EstatisticasUniverso] Erro ao ler {tickers}: {e}")
+            return {}
+        return {linha['ticker']: dict(linha) for linha in linhas}
+
+    def classificacoes(self) -> List[Dict[str, str]]:
+        """Combinações de setor, subsetor e segmento presentes na tabela (opções do screener)."""
+        if not os.path.exists(self.caminho):
+            return []
+        try:
+            with self.conectar() as conexao:
+                linhas = conexao.execute(
+                    f"SELECT DISTINCT {', '.join(COLUNAS_CLASSIFICACAO)} FROM estatisticas ORDER BY 1, 2, 3"
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"[EstatisticasUniverso] Erro ao ler classificações: {e}")
+            return []
+        return [dict(linha) for linha in linhas]
+
+    def filtrar(self, classificacao: Optional[Dict[str, str]] = None,
+                faixas: Optional[Dict[str, tuple]] = None, ordenar_por: str = 'liquidez',
+                descendente: bool = True, pagina: int = 1, por_pagina: int = 20) -> Dict[str, Any]:
+        """
+        Screener: tickers que atendem a todos os filtros, ordenados e paginados.
+
+        Os filtros viram uma cláusula WHERE parametrizada sobre as colunas indexadas; tickers sem
+        valor numa coluna filtrada ficam de fora e, na ordenação, vão para o fim.
+
+        Args:
+            classificacao (dict, optional): Valores exigidos de 'setor', 'subsetor' e/ou 'segmento'.
+            faixas (dict, optional): {coluna de COLUNAS_FAIXA: (mínimo, máximo)}; None = sem limite.
+            ordenar_por (str): Coluna de COLUNAS_ORDENAVEIS.
+            descendente (bool): Ordem decrescente.
+            pagina (int): Página, a partir de 1.
+            por_pagina (int): Linhas por página (até MAX_POR_PAGINA).
+
+        Returns:
+            dict: 'total' (tickers que atendem aos filtros), 'pagina', 'por_pagina' e 'linhas'
+                (lista de {coluna: valor}).
+
+        Raises:
+            ValueError: Coluna de filtro ou de ordenação não permitida.
+        """
+        condicoes, parametros = [], []
+        for coluna, valor in (classificacao or {}).items():
+            if coluna not in COLUNAS_CLASSIFICACAO:
+                raise ValueError(f"Filtro inválido: {coluna}")
+            if valor:
+                condicoes.append(f"{coluna} = ?")
+                parametros.append(valor)
+        for coluna, (minimo, maximo) in (faixas or {}).items():
+            if coluna not in COLUNAS_FAIXA:
+                raise ValueError(f"Filtro inválido: {coluna}")
+            if minimo is not None:
+                condicoes.append(f"{coluna} >= ?")
+                parametros.append(float(minimo))
+            if maximo is not None:
+                condicoes.append(f"{coluna} <= ?")
+                parametros.append(float(maximo))
+        if ordenar_por not in COLUNAS_ORDENAVEIS:
+            raise ValueError(f"Ordenação inválida: {ordenar_por}")
+
+        pagina = max(int(pagina), 1)
+        por_pagina = min(max(int(por_pagina), 1), MAX_POR_PAGINA)
+        resultado = {'total': 0, 'pagina': pagina, 'por_pagina': por_pagina, 'linhas': []}
+        if not os.path.exists(self.caminho):
+            return resultado
+
+        onde = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        # Desempate pelo ticker: a paginação fica estável entre consultas
+        ordem = f"{ordenar_por} IS NULL, {ordenar_por} {'DESC' if descendente else 'ASC'}, ticker"
+        try:
+            with self.conectar() as conexao:
+                resultado['total'] = conexao.execute(f"SELECT COUNT(*) FROM estatisticas {onde}", parametros).fetchone()[0]
+                linhas = conexao.execute(
+                    f"SELECT * FROM estatisticas {onde} ORDER BY {ordem} LIMIT ? OFFSET ?",
+                    [*parametros, por_pagina, (pagina - 1) * por_pagina]
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"[EstatisticasUniverso] Erro no screener: {e}")
+            return resultado
+        resultado['linhas'] = [dict(linha) for linha in linhas]
+        return resultado
+
+
+@measure_time
+def atualizar_universo(caminho: str = UNIVERSO_DB, tickers: Optional[Sequence[str]] = None,
+                       dias_historico: int = DIAS_HISTORICO) -> int:
+    """
+    Recalcula e grava as estatísticas de todos os tickers listados (job noturno).
+
+    Os preços vêm do PriceStore, então execuções seguidas só baixam os pregões novos.
+
+    Args:
+        caminho (str): Arquivo SQLite de destino.
+        tickers (list, optional): Universo; padrão: `tickers_universo()`.
+        dias_historico (int): Dias corridos de histórico carregados.
+
+    Returns:
+        int: Tickers gravados.
+    """
+    tickers = list(tickers) if tickers is not None else tickers_universo()
+    hoje = datetime.now(B3_TZ).date()
+    start_date = (hoje - timedelta(days=dias_historico)).strftime('%Y-%m-%d')
+    end_date = (hoje + timedelta(days=1)).strftime('%Y-%m-%d')
+
+    inicio = time.perf_counter()
+    painel, volumes, status = carregar_universo(tickers, start_date, end_date)
+    estatisticas = calcular_estatisticas_universo(painel, volumes)
+    gravados = EstatisticasUniverso(caminho).gravar(estatisticas)
+    falhas = sorted(t for t, s in status.items() if s == 'erro')
+    logger.info(
+        f"[Universo] {gravados}/{len(tickers)} tickers gravados em {time.perf_counter() - inicio:.2f}s; "
+        f"falhas: {falhas or 'nenhuma'}"
+    )
+    return gravados
+
+
+if __name__ == '__main__':
+    # Execução agendada (e.g., cron após o fechamento): python -m Findash.metrics.universo
+    parser = argparse.ArgumentParser(description='Pré-calcula as estatísticas de todos os tickers listados na B3.')
+    parser.add_argument('--db', default=UNIVERSO_DB, help='Arquivo SQLite de destino.')
+    parser.add_argument('--dias', type=int, default=DIAS_HISTORICO, help='Dias corridos de histórico.')
+    args = parser.parse_args()
+    atualizar_universo(args.db, dias_historico=args.dias)
@@ -1,13 +1,6 @@
-import time
-import functools
+from Findash.utils.instrumentation import cronometrar
+
 
 def measure_time(func):
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        start_time = time.time()
-        result = func(*args, **kwargs)
-        end_time = time.time()
-        execution_time = end_time - start_time
-        print(f"{func.__name__}: Tempo de execução = {execution_time:.4f}s")
-        return result
-    return wrapper
\ No newline at end of file
+    """Registra o tempo de cada chamada de `func` no histograma findash_funcao_segundos."""
+    return cronometrar(func)
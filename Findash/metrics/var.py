@@ -0,0 +1,167 @@
+import os
+from functools import partial
+from statistics import NormalDist
+from typing import List, Optional, Sequence
+import numpy as np
+import pandas as pd
+from .simulacao import normal_multivariada, raiz_covariancia, simular
+from .utils import measure_time
+
+NIVEIS_CONFIANCA = (0.95, 0.99)
+# Horizontes em pregões (1 dia, ~2 semanas, ~1 mês)
+HORIZONTES = (1, 10, 21)
+N_SIMULACOES = int(os.getenv('FINDASH_VAR_SIMULACOES', 10_000))
+# Abaixo disso, dias sem preço de algum ticker contam como retorno zero em vez de serem descartados
+MIN_DIAS_COMUNS = 60
+
+
+def retornos_carteira(retornos: pd.DataFrame, pesos: Sequence[float]) -> np.ndarray:
+    """
+    Retornos diários da carteira com os pesos atuais aplicados ao histórico dos ativos.
+
+    Args:
+        retornos (pd.DataFrame): Retornos diários (decimais), datas × tickers.
+        pesos (list): Pesos de cada ticker (somam 1), na ordem das colunas.
+
+    Returns:
+        np.ndarray: Retorno da carteira em cada dia.
+    """
+    return matriz_retornos(retornos) @ np.asarray(pesos, dtype=np.float64)
+
+
+def matriz_retornos(retornos: pd.DataFrame) -> np.ndarray:
+    """Matriz dias × tickers dos retornos nos dias em que todos os tickers têm cotação (ver MIN_DIAS_COMUNS)."""
+    comuns = retornos.dropna()
+    if len(comuns) < MIN_DIAS_COMUNS:
+        comuns = retornos.dropna(how='all').fillna(0.0)
+    return comuns.to_numpy(dtype=np.float64)
+
+
+def retornos_horizonte(retornos: np.ndarray, horizonte: int) -> np.ndarray:
+    """Retornos compostos em janelas sobrepostas de `horizonte` pregões."""
+    if horizonte == 1:
+        return retornos
+    log_acumulado = np.concatenate([[0.0], np.cumsum(np.log1p(retornos))])
+    return np.expm1(log_acumulado[horizonte:] - log_acumulado[:-horizonte])
+
+
+def _var_cvar(amostras: np.ndarray, niveis: Sequence[float]) -> np.ndarray:
+    """
+    VaR e CVaR (perdas positivas) de cada coluna de `amostras` em cada nível de confiança.
+
+    Returns:
+        np.ndarray: Shape (níveis, colunas, 2) com (VaR, CVaR).
+    """
+    ordenadas = np.sort(amostras, axis=0)
+    n = len(ordenadas)
+    soma_cauda = np.cumsum(ordenadas, axis=0)
+    resultado = np.empty((len(niveis), ordenadas.shape[1], 2))
+    for i, nivel in enumerate(niveis):
+        resultado[i, :, 0] = -np.quantile(ordenadas, 1 - nivel, axis=0)
+        k = max(1, int(np.ceil((1 - nivel) * n)))
+        resultado[i, :, 1] = -soma_cauda[k - 1] / k
+    return resultado
+
+
+def _linhas(metodo: str, valores: np.ndarray, niveis: Sequence[float], horizontes: Sequence[int]) -> List[dict]:
+    return [
+        {'metodo': metodo, 'horizonte': h, 'nivel': nivel, 'var': valores[i, j, 0], 'cvar': valores[i, j, 1]}
+        for j, h in enumerate(horizontes)
+        for i, nivel in enumerate(niveis)
+    ]
+
+
+def var_historico(carteira: np.ndarray, niveis: Sequence[float] = NIVEIS_CONFIANCA,
+                  horizontes: Sequence[int] = HORIZONTES) -> List[dict]:
+    """
+    VaR/CVaR históricos: quantis dos retornos observados da carteira, compostos em janelas
+    sobrepostas para horizontes maiores que um dia.
+    """
+    valores = np.full((len(niveis), len(horizontes), 2), np.nan)
+    for j, h in enumerate(horizontes):
+        amostras = retornos_horizonte(carteira, h)
+        if len(amostras):
+            valores[:, j:j + 1, :] = _var_cvar(amostras[:, None], niveis)
+    return _linhas('historico', valores, niveis, horizontes)
+
+
+def var_parametrico(media: float, desvio: float, niveis: Sequence[float] = NIVEIS_CONFIANCA,
+                    horizontes: Sequence[int] = HORIZONTES) -> List[dict]:
+    """
+    VaR/CVaR paramétricos (variância-covariância): retorno normal com média `media * h` e
+    desvio `desvio * sqrt(h)` no horizonte de h pregões.
+    """
+    normal = NormalDist()
+    valores = np.empty((len(niveis), len(horizontes), 2))
+    for i, nivel in enumerate(niveis):
+        z = normal.inv_cdf(1 - nivel)
+        cauda = normal.pdf(z) / (1 - nivel)
+        for j, h in enumerate(horizontes):
+            media_h, desvio_h = media * h, desvio * np.sqrt(h)
+            valores[i, j] = (-(media_h + z * desvio_h), -(media_h - cauda * desvio_h))
+    return _linhas('parametrico', valores, niveis, horizontes)
+
+
+def _simular_carteira(rng: np.random.Generator, n: int, media: np.ndarray, raiz: np.ndarray,
+                      pesos: np.ndarray, horizontes: tuple) -> np.ndarray:
+    """Retorno da carteira (comprada e mantida) em cada horizonte, para `n` cenários."""
+    diarios = normal_multivariada(rng, n, media, raiz, max(horizontes))
+    crescimento = np.cumprod(1 + diarios, axis=1)[:, [h - 1 for h in horizontes], :]
+    return crescimento @ pesos - 1
+
+
+def var_monte_carlo(media: np.ndarray, covariancia: np.ndarray, pesos: np.ndarray,
+                    niveis: Sequence[float] = NIVEIS_CONFIANCA, horizontes: Sequence[int] = HORIZONTES,
+                    n_simulacoes: int = N_SIMULACOES, seed: Optional[int] = None,
+                    processos: Optional[bool] = None) -> List[dict]:
+    """
+    VaR/CVaR por Monte Carlo: trajetórias diárias dos ativos com distribuição normal
+    multivariada (média e covariância históricas), compostas até cada horizonte.
+
+    Ao contrário do paramétrico, captura a composição dos retornos e a mudança dos pesos ao
+    longo do horizonte. A simulação é gerada em blocos (ver `simular`).
+    """
+    horizontes = tuple(horizontes)
+    gerador = partial(_simular_carteira, media=media, raiz=raiz_covariancia(covariancia),
+                      pesos=pesos, horizontes=horizontes)
+    amostras = simular(gerador, n_simulacoes, max(horizontes) * len(media), seed=seed, processos=processos)
+    return _linhas('monte_carlo', _var_cvar(amostras, niveis), niveis, horizontes)
+
+
+@measure_time
+def calcular_var(retornos: pd.DataFrame, pesos: Sequence[float], niveis: Sequence[float] = NIVEIS_CONFIANCA,
+                 horizontes: Sequence[int] = HORIZONTES, n_simulacoes: int = N_SIMULACOES,
+                 seed: Optional[int] = None, processos: Optional[bool] = None) -> pd.DataFrame:
+    """
+    Calcula VaR e CVaR da carteira pelos métodos histórico, paramétrico e Monte Carlo.
+
+    Os três métodos partem da mesma matriz de retornos diários (a de `calcular_retornos_individuais`),
+    com os pesos atuais da carteira.
+
+    Args:
+        retornos (pd.DataFrame): Retornos diários (decimais), datas × tickers.
+        pesos (list): Peso de cada ticker na carteira (somam 1), na ordem das colunas.
+        niveis (list): Níveis de confiança (e.g., 0.95, 0.99).
+        horizontes (list): Horizontes em pregões.
+        n_simulacoes (int): Cenários do Monte Carlo.
+        seed (int, optional): Semente do Monte Carlo.
+        processos (bool, optional): Uso do pool de processos no Monte Carlo (ver `simular`).
+
+    Returns:
+        pd.DataFrame: Colunas 'metodo', 'horizonte', 'nivel', 'var' e 'cvar' (perdas como
+            frações positivas do valor da carteira); vazio se não houver retornos.
+    """
+    colunas = ['metodo', 'horizonte', 'nivel', 'var', 'cvar']
+    matriz = matriz_retornos(retornos)
+    if len(matriz) < 2 or not retornos.shape[1]:
+        return pd.DataFrame(columns=colunas)
+
+    pesos = np.asarray(pesos, dtype=np.float64)
+    carteira = matriz @ pesos
+    media = matriz.mean(axis=0)
+    covariancia = np.atleast_2d(np.cov(matriz, rowvar=False))
+
+    linhas = var_historico(carteira, niveis, horizontes)
+    linhas += var_parametrico(float(pesos @ media), float(np.sqrt(pesos @ covariancia @ pesos)), niveis, horizontes)
+    linhas += var_monte_carlo(media, covariancia, pesos, niveis, horizontes, n_simulacoes, seed, processos)
+    return pd.DataFrame(linhas, columns=colunas)
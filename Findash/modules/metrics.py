@@ -4,22 +4,11 @@ import yfinance as yf
 import pandas as pd
 import numpy as np
 import time
-import functools
 from datetime import datetime
 from Findash.services.ticker_service import manage_ticker_data, get_all_sectors, get_sector, DATABASE_PATH
 from Findash.utils.logging_tools import logger 
-
-# Decorador para medir tempo de execução
-def measure_time(func):
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        start_time = time.time()
-        result = func(*args, **kwargs)
-        end_time = time.time()
-        execution_time = end_time - start_time
-        print(f"{func.__name__}: Tempo de execução = {execution_time:.4f}s")
-        return result
-    return wrapper
+from Findash.utils.instrumentation import observar
+from Findash.metrics.utils import measure_time
 
 
 @measure_time
@@ -48,7 +37,7 @@ def obter_dados(tickers: List[str], start_date: str, end_date: str, include_ibov
 
     if tickers_to_download:
         try:
-            start_time = time.time()
+            inicio = time.perf_counter()
             data = yf.download(
                 tickers_to_download, 
                 start=start_date, 
@@ -58,10 +47,10 @@ def obter_dados(tickers: List[str], start_date: str, end_date: str, include_ibov
                 progress=False,
                 timeout=10
             )
-            print(f"yf.download took {time.time() - start_time}s")
+            observar('findash_download_segundos', time.perf_counter() - inicio, origem='modules.metrics')
             
             if data.empty:
-                print(f"Nenhum dado retornado para {tickers_to_download}")
+                logger.warning(f"Nenhum dado retornado para {tickers_to_download}")
                 return result
 
             available_columns = data.columns.get_level_values(0).unique()
@@ -79,20 +68,20 @@ def obter_dados(tickers: List[str], start_date: str, end_date: str, include_ibov
             valid_tickers = [t for t in normalized_tickers if t in adj_close.columns and not adj_close[t].isna().all()]
             if valid_tickers:
                 adj_close_portfolio = adj_close[valid_tickers]
-                print(f"Portfolio: {len(adj_close_portfolio)} linhas para {valid_tickers}")
+                logger.info(f"Portfolio: {len(adj_close_portfolio)} linhas para {valid_tickers}")
                 adj_close_portfolio.index = adj_close_portfolio.index.map(lambda x: x.strftime('%Y-%m-%d'))
                 # Remover .SA das chaves ao preencher result['portfolio']
                 result['portfolio'].update({ticker_map.get(ticker, ticker): adj_close_portfolio[ticker].to_dict() for ticker in valid_tickers})
             else:
-                print(f"Nenhum dado válido para {normalized_tickers}")
+                logger.warning(f"Nenhum dado válido para {normalized_tickers}")
 
             if include_ibov and '^BVSP' in adj_close.columns:
                 ibov_adj_close = adj_close['^BVSP'].dropna()
-                print(f"IBOV: {len(ibov_adj_close)} linhas")
+                logger.info(f"IBOV: {len(ibov_adj_close)} linhas")
                 ibov_adj_close.index = ibov_adj_close.index.map(lambda x: x.strftime('%Y-%m-%d'))
                 result['ibov'] = ibov_adj_close.to_dict()
             elif include_ibov:
-                print("Nenhum dado para IBOV (^BVSP)")
+                logger.warning("Nenhum dado para IBOV (^BVSP)")
 
             if dividends_data is not None:
                 for ticker in valid_tickers:
@@ -109,7 +98,7 @@ def obter_dados(tickers: List[str], start_date: str, end_date: str, include_ibov
                     result['dividends'][ticker] = {}
 
         except Exception as e:
-            print(f"Erro ao obter dados do yfinance: {e}")
+            logger.error(f"Erro ao obter dados do yfinance: {e}")
             for ticker in normalized_tickers:
                 result['portfolio'][ticker] = {}
                 result['dividends'][ticker] = {}
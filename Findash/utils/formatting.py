@@ -18,4 +18,21 @@ def format_kpi(kpi_name: str, value: float | None) -> str:
         return f"{value:.2f}%"
     
     # Outros KPIs (ex.: Sharpe, Sortino, Retorno) usam formato decimal
-    return f"{value:.2f}"
\ No newline at end of file
+    return f"{value:.2f}"
+
+
+def format_br(value: float | None, fmt: str = "{:,.2f}", empty: str = "-") -> str:
+    """
+    Formata um número com separadores no padrão brasileiro.
+
+    Args:
+        value (float | None): Valor bruto ou None/NaN.
+        fmt (str): Formato do str.format (ex.: "{:,.2f}", "{:.1%}").
+        empty (str): Texto para valores ausentes.
+
+    Returns:
+        str: Valor formatado (ex.: "1.234,56", "12,3%").
+    """
+    if value is None or value != value:
+        return empty
+    return fmt.format(value).replace(',', '_').replace('.', ',').replace('_', '.')
\ No newline at end of file
@@ -0,0 +1,213 @@
+import functools
+import logging
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Com FINDASH_METRICAS=0 nada é registrado e `cronometrar` devolve a própria função (custo zero)
+INSTRUMENTACAO_ATIVA = os.getenv('FINDASH_METRICAS', '1') == '1'
+
+# Limites (em segundos) dos histogramas de tempo
+BUCKETS_TEMPO = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Limites (em bytes) dos histogramas de tamanho de payload
+BUCKETS_BYTES = (1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7)
+
+# Texto de ajuda das métricas conhecidas, exibido no /metrics
+DESCRICOES = {
+    'findash_funcao_segundos': 'Tempo de execução das funções instrumentadas com measure_time.',
+    'findash_callback_segundos': 'Tempo de execução dos callbacks do Dash.',
+    'findash_callback_total': 'Execuções de callbacks do Dash, por resultado.',
+    'findash_cache_total': 'Consultas aos caches (precos, painel, resultado, benchmarks, covariancia), por resultado.',
+    'findash_single_flight_total': 'Chamadas coordenadas pelo single-flight, por desfecho.',
+    'findash_downloads_total': 'Chamadas ao provedor de dados de mercado, por resultado.',
+    'findash_download_segundos': 'Tempo das chamadas yf.download ao provedor de dados de mercado.',
+    'findash_batcher_lotes_total': 'Lotes executados pelo PriceBatcher.',
+    'findash_batcher_pedidos_total': 'Pedidos atendidos pelo PriceBatcher.',
+    'findash_circuito_aberto': 'Estado do circuit breaker do provedor (1 = aberto).',
+    'findash_store_bytes': 'Tamanho do data-store serializado enviado ao navegador.',
+}
+
+Rotulos = Tuple[Tuple[str, str], ...]
+
+
+class Registro:
+    """
+    Contadores, gauges e histogramas em memória, seguros para uso em várias threads.
+
+    Cada métrica é identificada pelo nome e pelos rótulos (e.g., funcao='calcular_kpis').
+    Os valores são do processo: com vários workers, cada um expõe os próprios números.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contadores: Dict[str, Dict[Rotulos, float]] = {}
+        self._gauges: Dict[str, Dict[Rotulos, float]] = {}
+        # {nome: (limites, {rótulos: [contagem por faixa..., soma, total]})}
+        self._histogramas: Dict[str, Tuple[Tuple[float, ...], Dict[Rotulos, list]]] = {}
+
+    def contar(self, nome: str, valor: float = 1, **rotulos) -> None:
+        chave = tuple(sorted(rotulos.items()))
+        with self._lock:
+            serie = self._contadores.setdefault(nome, {})
+            serie[chave] = serie.get(chave, 0) + valor
+
+    def definir(self, nome: str, valor: float, **rotulos) -> None:
+        chave = tuple(sorted(rotulos.items()))
+        with self._lock:
+            self._gauges.setdefault(nome, {})[chave] = valor
+
+    def observar(self, nome: str, valor: float, buckets: Tuple[float, ...] = BUCKETS_TEMPO, **rotulos) -> None:
+        """Registra uma observação no histograma `nome` (os limites da primeira observação valem)."""
+        chave = tuple(sorted(rotulos.items()))
+        with self._lock:
+            limites, series = self._histogramas.setdefault(nome, (tuple(buckets), {}))
+            contagens = series.get(chave)
+            if contagens is None:
+                contagens = series[chave] = [0] * (len(limites) + 1) + [0.0, 0]
+            contagens[bisect_left(limites, valor)] += 1
+            contagens[-2] += valor
+            contagens[-1] += 1
+
+    def valor(self, nome: str, **rotulos) -> float:
+        """Valor atual de um contador ou gauge (0 se não existir)."""
+        chave = tuple(sorted(rotulos.items()))
+        with self._lock:
+            serie = self._contadores.get(nome) or self._gauges.get(nome) or {}
+            return serie.get(chave, 0)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._contadores.clear()
+            self._gauges.clear()
+            self._histogramas.clear()
+
+    def exportar(self) -> str:
+        """Todas as métricas no formato de texto do Prometheus (versão 0.0.4)."""
+        with self._lock:
+            contadores = {n: dict(s) for n, s in self._contadores.items()}
+            gauges = {n: dict(s) for n, s in self._gauges.items()}
+            histogramas = {n: (l, {c: list(v) for c, v in s.items()}) for n, (l, s) in self._histogramas.items()}
+
+        linhas = []
+        for tipo, metricas in (('counter', contadores), ('gauge', gauges)):
+            for nome in sorted(metricas):
+                _cabecalho(linhas, nome, tipo)
+                for rotulos, valor in sorted(metricas[nome].items()):
+                    linhas.append(f"{nome}{_formatar_rotulos(rotulos)} {_formatar_numero(valor)}")
+
+        for nome in sorted(histogramas):
+            limites, series = histogramas[nome]
+            _cabecalho(linhas, nome, 'histogram')
+            for rotulos, contagens in sorted(series.items()):
+                acumulado = 0
+                for limite, quantidade in zip(limites + (math.inf,), contagens):
+                    acumulado += quantidade
+                    le = '+Inf' if math.isinf(limite) else _formatar_numero(limite)
+                    linhas.append(f"{nome}_bucket{_formatar_rotulos(rotulos + (('le', le),))} {acumulado}")
+                linhas.append(f"{nome}_sum{_formatar_rotulos(rotulos)} {_formatar_numero(contagens[-2])}")
+                linhas.append(f"{nome}_count{_formatar_rotulos(rotulos)} {contagens[-1]}")
+        return '\n'.join(linhas) + '\n'
+
+
+def _cabecalho(linhas: list, nome: str, tipo: str) -> None:
+    if nome in DESCRICOES:
+        linhas.append(f"# HELP {nome} {DESCRICOES[nome]}")
+    linhas.append(f"# TYPE {nome} {tipo}")
+
+
+def _formatar_rotulos(rotulos: Rotulos) -> str:
+    if not rotulos:
+        return ''
+    pares = ','.join(
+        f'{k}="' + str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for k, v in rotulos
+    )
+    return '{' + pares + '}'
+
+
+def _formatar_numero(valor: float) -> str:
+    if isinstance(valor, int) or float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+registro = Registro()
+_ativa = INSTRUMENTACAO_ATIVA
+
+
+def configurar_instrumentacao(ativa: bool) -> None:
+    """
+    Liga ou desliga o registro de métricas em tempo de execução.
+
+    Funções decoradas com `cronometrar` enquanto FINDASH_METRICAS=0 não são instrumentadas
+    mesmo que a instrumentação seja ligada depois.
+    """
+    global _ativa
+    _ativa = ativa
+
+
+def instrumentacao_ativa() -> bool:
+    return _ativa
+
+
+def contar(nome: str, valor: float = 1, **rotulos) -> None:
+    """Incrementa o contador `nome` (sem efeito com a instrumentação desligada)."""
+    if _ativa:
+        registro.contar(nome, valor, **rotulos)
+
+
+def definir(nome: str, valor: float, **rotulos) -> None:
+    """Define o valor do gauge `nome` (sem efeito com a instrumentação desligada)."""
+    if _ativa:
+        registro.definir(nome, valor, **rotulos)
+
+
+def observar(nome: str, valor: float, buckets: Tuple[float, ...] = BUCKETS_TEMPO, **rotulos) -> None:
+    """Registra `valor` no histograma `nome` (sem efeito com a instrumentação desligada)."""
+    if _ativa:
+        registro.observar(nome, valor, buckets, **rotulos)
+
+
+def exportar_metricas() -> str:
+    """Conteúdo do endpoint /metrics."""
+    return registro.exportar()
+
+
+def cronometrar(func: Optional[Callable] = None, *, nome: Optional[str] = None,
+                metrica: str = 'findash_funcao_segundos') -> Callable:
+    """
+    Decorador que registra o tempo de cada chamada (time.perf_counter) num histograma por função.
+
+    Pode ser usado como `@cronometrar` ou `@cronometrar(nome='...')`. O tempo também vai para
+    o log em nível DEBUG.
+
+    Args:
+        func (callable): Função decorada.
+        nome (str, optional): Valor do rótulo 'funcao'. Padrão: nome da função.
+        metrica (str): Nome do histograma.
+    """
+    def decorador(f: Callable) -> Callable:
+        if not INSTRUMENTACAO_ATIVA:
+            return f
+        rotulo = nome or f.__name__
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            if not _ativa:
+                return f(*args, **kwargs)
+            inicio = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                duracao = time.perf_counter() - inicio
+                registro.observar(metrica, duracao, funcao=rotulo)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"{rotulo}: Tempo de execução = {duracao:.4f}s")
+        return wrapper
+
+    return decorador(func) if func is not None else decorador
@@ -1,6 +1,9 @@
 import logging
+import threading
+import time
 from functools import wraps
 from datetime import datetime
+from .instrumentation import contar, observar
 
 # ============================
 # Configuração global do logger
@@ -36,6 +39,8 @@ werkzeug_logger.addFilter(DashRequestFilter())
 # Decorador para logar callbacks
 # ============================
 callback_counter = {}
+# Callbacks do Dash rodam em várias threads do servidor; o contador é protegido por lock
+_callback_lock = threading.Lock()
 
 def log_callback(callback_name=None):
     def decorator(func):
@@ -43,18 +48,22 @@ def log_callback(callback_name=None):
 
         @wraps(func)
         def wrapper(*args, **kwargs):
-            count = callback_counter.get(name, 0) + 1
-            callback_counter[name] = count
+            with _callback_lock:
+                count = callback_counter.get(name, 0) + 1
+                callback_counter[name] = count
             start_time = datetime.now()
+            inicio = time.perf_counter()
             logger.info(f"[{start_time.strftime('%H:%M:%S')}][CALLBACK:{name}] ▶ Início (execução #{count})")
 
             try:
                 result = func(*args, **kwargs)
-                end_time = datetime.now()
-                duration = (end_time - start_time).total_seconds()
-                logger.info(f"[{end_time.strftime('%H:%M:%S')}][CALLBACK:{name}] ✅ Fim (duração: {duration:.2f}s)")
+                duration = time.perf_counter() - inicio
+                observar('findash_callback_segundos', duration, callback=name)
+                contar('findash_callback_total', callback=name, resultado='ok')
+                logger.info(f"[{datetime.now().strftime('%H:%M:%S')}][CALLBACK:{name}] ✅ Fim (duração: {duration:.2f}s)")
                 return result
             except Exception as e:
+                contar('findash_callback_total', callback=name, resultado='erro')
                 logger.error(f"[CALLBACK:{name}] ❌ Erro durante execução: {e}", exc_info=True)
                 raise e  # Relevante para manter comportamento esperado no Dash
 
@@ -0,0 +1,230 @@
+import os
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from utils.serialization import orjson_dumps, orjson_loads
+from .instrumentation import BUCKETS_BYTES, observar
+
+# Séries do data-store convertidas para o formato colunar e o formato legado de cada uma:
+#   'dict'       {série: {data: valor}}          'xy'        {série: [{'x': data, 'y': valor}]}
+#   'dict_serie' {data: valor}                   'xy_serie'  [{'x': data, 'y': valor}]
+#   'esparso'    {série: {data: valor}}, guardando só os valores diferentes de zero (proventos)
+SERIES_STORE = {
+    'portfolio_values': 'dict',
+    'individual_daily_returns': 'dict',
+    'individual_returns': 'xy',
+    'portfolio_return': 'xy_serie',
+    'portfolio_daily_return': 'dict_serie',
+    'ibov_return': 'xy_serie',
+    'portfolio': 'dict',
+    'ibov': 'dict_serie',
+    'dividends': 'esparso',
+    'drawdowns.underwater': 'dict',
+    'benchmark_returns': 'dict',
+}
+
+# float32 reduz pela metade os dígitos de cada valor no JSON (precisão de ~7 dígitos significativos)
+STORE_FLOAT32 = os.getenv('FINDASH_STORE_FLOAT32', '1') == '1'
+# Entradas dos recálculos incrementais (incluir/remover ticker): sempre em float64 e sem
+# arredondamento, para que os números exibidos não mudem ao remover um ticker não relacionado
+SERIES_EXATAS = ('portfolio', 'portfolio_values', 'dividends', 'ibov', 'benchmark_returns')
+STORE_CASAS = int(os.getenv('FINDASH_STORE_CASAS')) if os.getenv('FINDASH_STORE_CASAS') else None
+
+
+def _obter(dados: Dict[str, Any], caminho: str) -> Any:
+    for parte in caminho.split('.'):
+        if not isinstance(dados, dict) or parte not in dados:
+            return None
+        dados = dados[parte]
+    return dados
+
+
+def _definir(dados: Dict[str, Any], caminho: str, valor: Any) -> None:
+    *pais, ultimo = caminho.split('.')
+    for parte in pais:
+        dados[parte] = dict(dados.get(parte) or {})
+        dados = dados[parte]
+    dados[ultimo] = valor
+
+
+def _remover(dados: Dict[str, Any], caminho: str) -> None:
+    *pais, ultimo = caminho.split('.')
+    for parte in pais:
+        dados[parte] = dict(dados.get(parte) or {})
+        dados = dados[parte]
+    dados.pop(ultimo, None)
+
+
+def _como_series(valor: Any, formato: str) -> Dict[str, Dict[str, Any]]:
+    """Normaliza qualquer formato legado para {série: {data: valor}}."""
+    if formato in ('dict_serie', 'xy_serie'):
+        valor = {'': valor}
+    if formato in ('xy', 'xy_serie'):
+        return {s: {p['x']: p['y'] for p in pontos or []} for s, pontos in valor.items()}
+    return {s: serie or {} for s, serie in valor.items()}
+
+
+def eh_colunar(dados: Optional[Dict[str, Any]]) -> bool:
+    return bool(dados) and 'colunar' in dados
+
+
+def codificar_store(dados: Dict[str, Any], float32: bool = STORE_FLOAT32, casas: Optional[int] = STORE_CASAS) -> Dict[str, Any]:
+    """
+    Converte as séries do data-store para o formato colunar.
+
+    Todas as séries passam a compartilhar um único vetor de datas ('colunar.datas'), e cada chave
+    de SERIES_STORE vira uma matriz séries × datas (NaN = sem valor), em vez de repetir as
+    datas em cada ponto de cada série. Os demais campos do store não mudam.
+
+    Args:
+        dados (dict): Conteúdo do store no formato legado (ou já colunar, devolvido como está).
+        float32 (bool): Se True, os valores são gravados em float32 (exceto SERIES_EXATAS).
+        casas (int, optional): Casas decimais para arredondamento dos valores (exceto SERIES_EXATAS).
+
+    Returns:
+        dict: Cópia do store com as séries em 'colunar'.
+    """
+    if not dados or eh_colunar(dados):
+        return dados
+
+    normalizadas = {}
+    for chave, formato in SERIES_STORE.items():
+        valor = _obter(dados, chave)
+        if valor is not None:
+            normalizadas[chave] = _como_series(valor, formato)
+
+    datas = sorted({d for series in normalizadas.values() for serie in series.values() for d in serie})
+    posicao = {d: i for i, d in enumerate(datas)}
+    tipo = np.float32 if float32 else np.float64
+
+    codificado = dict(dados)
+    colunar = {'datas': datas, 'series': {}}
+    for chave, series in normalizadas.items():
+        nomes = list(series)
+        if SERIES_STORE[chave] == 'esparso':
+            pontos = [(j, posicao[d], v) for j, s in enumerate(nomes) for d, v in series[s].items() if v]
+            coluna = np.array([p[0] for p in pontos], dtype=np.int32)
+            indices = np.array([p[1] for p in pontos], dtype=np.int32)
+            valores = np.array([p[2] for p in pontos], dtype=np.float64)
+            bloco = {'nomes': nomes, 'serie': coluna, 'indices': indices}
+        else:
+            valores = np.full((len(nomes), len(datas)), np.nan)
+            for j, s in enumerate(nomes):
+                if series[s]:
+                    valores[j, [posicao[d] for d in series[s]]] = np.array(list(series[s].values()), dtype=np.float64)
+            bloco = {'nomes': nomes}
+        if chave in SERIES_EXATAS:
+            bloco['valores'] = valores
+        else:
+            if casas is not None:
+                valores = np.round(valores, casas)
+            bloco['valores'] = valores.astype(tipo)
+        colunar['series'][chave] = bloco
+        _remover(codificado, chave)
+    codificado['colunar'] = colunar
+    return codificado
+
+
+def decodificar_store(dados: Optional[Dict[str, Any]], chaves: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Restaura o formato legado das séries (dicionários por data / listas de {x, y}).
+
+    Usado antes de passar o store para código que espera o formato legado (atualizações
+    incrementais, PortfolioService). Stores já no formato legado são devolvidos como estão.
+
+    Args:
+        dados (dict): Conteúdo do store.
+        chaves (list, optional): Decodifica apenas estas séries (o resultado deixa de ser colunar).
+    """
+    if not eh_colunar(dados):
+        return dados
+
+    decodificado = dict(dados)
+    colunar = decodificado.pop('colunar')
+    datas = np.asarray(colunar['datas'], dtype=object)
+    for chave, bloco in colunar['series'].items():
+        if chaves is not None and chave not in chaves:
+            continue
+        formato = SERIES_STORE.get(chave, 'dict')
+        nomes = bloco['nomes']
+        if formato == 'esparso':
+            series = {s: {} for s in nomes}
+            for j, i, v in zip(bloco['serie'], bloco['indices'], bloco['valores']):
+                series[nomes[j]][datas[i]] = v
+        else:
+            valores = np.asarray(bloco['valores'], dtype=np.float64).reshape(len(nomes), len(datas))
+            series = {}
+            for j, s in enumerate(nomes):
+                presentes = ~np.isnan(valores[j])
+                series[s] = dict(zip(datas[presentes].tolist(), valores[j, presentes].tolist()))
+        if formato in ('xy', 'xy_serie'):
+            series = {s: [{'x': d, 'y': v} for d, v in serie.items()] for s, serie in series.items()}
+        _definir(decodificado, chave, series.get('') if formato.endswith('_serie') else series)
+    return decodificado
+
+
+def quadro_store(dados: Dict[str, Any], chave: str, series: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Série do store como DataFrame (datas 'YYYY-MM-DD' × séries), em qualquer um dos formatos.
+
+    No formato colunar a matriz é usada diretamente, sem montar dicionários por data.
+
+    Args:
+        dados (dict): Conteúdo do store (colunar ou legado).
+        chave (str): Chave de SERIES_STORE (e.g., 'portfolio_values', 'drawdowns.underwater').
+        series (list, optional): Subconjunto/ordem das colunas (ausentes ficam de fora).
+
+    Returns:
+        pd.DataFrame: Valores em float64, com NaN onde a série não tem valor; vazio se a chave não existir.
+    """
+    formato = SERIES_STORE[chave]
+    if eh_colunar(dados):
+        bloco = dados['colunar']['series'].get(chave)
+        if bloco is None:
+            return pd.DataFrame()
+        datas = dados['colunar']['datas']
+        nomes = bloco['nomes']
+        if formato == 'esparso':
+            valores = np.zeros((len(nomes), len(datas)))
+            valores[np.asarray(bloco['serie'], dtype=int), np.asarray(bloco['indices'], dtype=int)] = bloco['valores']
+        else:
+            valores = np.asarray(bloco['valores'], dtype=np.float64).reshape(len(nomes), len(datas))
+        quadro = pd.DataFrame(valores.T, index=pd.Index(datas), columns=nomes)
+        if formato != 'esparso':
+            quadro = quadro.dropna(how='all')
+    else:
+        valor = _obter(dados or {}, chave)
+        if valor is None:
+            return pd.DataFrame()
+        quadro = pd.DataFrame(_como_series(valor, formato), dtype=float).sort_index()
+    if series is not None:
+        quadro = quadro[[s for s in series if s in quadro.columns]]
+    return quadro
+
+
+def serie_store(dados: Dict[str, Any], chave: str) -> pd.Series:
+    """Série única do store ('portfolio_return', 'portfolio_daily_return', 'ibov_return', 'ibov')."""
+    quadro = quadro_store(dados, chave)
+    return quadro.iloc[:, 0].dropna() if not quadro.empty else pd.Series(dtype=float)
+
+
+def posicoes_store(dados: Dict[str, Any]) -> pd.Series:
+    """Valor atual da posição em cada ticker: último valor de cada série em 'portfolio_values'."""
+    valores = quadro_store(dados, 'portfolio_values', dados.get('tickers', []))
+    if valores.empty:
+        return pd.Series(dtype=float)
+    return valores.sort_index().ffill().iloc[-1].fillna(0.0)
+
+
+def carregar_store(store_data) -> Dict[str, Any]:
+    """Desserializa o conteúdo do dcc.Store (string JSON ou dict), mantendo o formato em que foi gravado."""
+    if not store_data:
+        return {}
+    return orjson_loads(store_data) if isinstance(store_data, (str, bytes)) else store_data
+
+
+def serializar_store(dados: Dict[str, Any]) -> str:
+    """Serializa o store no formato colunar para o dcc.Store."""
+    serializado = orjson_dumps(codificar_store(dados))
+    observar('findash_store_bytes', len(serializado), buckets=BUCKETS_BYTES)
+    return serializado.decode('utf-8')
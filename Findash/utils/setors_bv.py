@@ -1,3 +1,5 @@
+import re
+
 # Mapeamento manual inicial baseado na B3 (50 tickers populares como exemplo)
 SETOR_MAP = {
     "AZTE": "Petróleo, Gás e Biocombustíveis",
@@ -805,4 +807,12 @@ SETORIAL_B3 = {
     "PRPT": {"setor": "Outros", "subsetor": "Outros", "segmento": "Outros"},
     "OPSE": {"setor": "Outros", "subsetor": "Outros", "segmento": "Outros"},
     "OPTS": {"setor": "Outros", "subsetor": "Outros", "segmento": "Outros"},
-}
\ No newline at end of file
+}
+
+
+def raiz_ticker(ticker: str) -> str:
+    """
+    Código da empresa usado como chave em SETOR_MAP e SETORIAL_B3: sem '.SA' e sem o sufixo de
+    classe no final (e.g., 'PETR4' -> 'PETR', 'B3SA3' -> 'B3SA', 'MRSA3B.SA' -> 'MRSA').
+    """
+    return re.sub(r'\d+[A-Z]?$', '', ticker.replace('.SA', '').upper())
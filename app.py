@@ -13,6 +13,16 @@ from datetime import timedelta, datetime
 from Findash.app_dash import init_dash
 from Findash.services.portfolio_services import PortfolioService
 from Findash.services.ticker_service import manage_ticker_data, DATABASE_PATH
+from Findash.metrics.single_flight import configurar_single_flight
+from Findash.metrics.cache_warmer import iniciar_cache_warmer, registrar_popularidade
+from Findash.metrics.panel_cache import configurar_panel_cache
+from Findash.metrics.result_cache import configurar_result_cache
+from Findash.metrics.incremental import criar_portfolio
+from Findash.metrics.indices import configurar_cache_benchmarks
+from Findash.metrics.otimizacao import configurar_cache_covariancia
+from Findash.metrics.universo import EstatisticasUniverso, COLUNAS_CLASSIFICACAO, COLUNAS_FAIXA
+from Findash.utils.payload import serializar_store
+from Findash.utils.instrumentation import exportar_metricas
 from utils.serialization import orjson_dumps, orjson_loads
 from werkzeug.security import generate_password_hash, check_password_hash
 
@@ -72,6 +82,21 @@ def create_app():
         logger.error(f"Erro ao conectar no Redis: {str(e)}")
         raise RuntimeError("Redis não está disponível.")
 
+    # Downloads idênticos de dados de mercado são deduplicados entre workers via Redis (DB1)
+    configurar_single_flight(data_redis)
+    # Histórico completo por portfólio (DB1): mudanças de período recortam o painel em cache
+    configurar_panel_cache(data_redis)
+    # Resultados de portfólios idênticos (mesmos tickers, quantidades e período) compartilhados entre sessões (DB1)
+    configurar_result_cache(data_redis)
+    # Séries de retorno dos benchmarks por período, compartilhadas entre usuários (DB1)
+    configurar_cache_benchmarks(data_redis)
+    # Retorno médio e covariância por (tickers, período) para o otimizador da aba Avançado (DB1)
+    configurar_cache_covariancia(data_redis)
+    # Aquecimento do cache de preços (IBOV + tickers populares) em segundo plano
+    iniciar_cache_warmer(data_redis)
+    # Estatísticas de todos os tickers listados, gravadas pelo job noturno (python -m Findash.metrics.universo)
+    estatisticas_universo = EstatisticasUniverso()
+
     # Middleware: tratamento de sessão e criação de user_id
     @app.before_request
     def ensure_user_id():
@@ -231,6 +256,41 @@ def create_app():
                 status=500
             )
         
+    @app.route('/ticker-stats', methods=['GET'])
+    def ticker_stats():
+        """Estatísticas pré-calculadas (job noturno) dos tickers em ?tickers=PETR4,VALE3."""
+        tickers = [t.strip() for t in request.args.get('tickers', '').split(',') if t.strip()]
+        return Response(
+            orjson_dumps(estatisticas_universo.obter(tickers)),
+            mimetype='application/json'
+        )
+
+    @app.route('/screener', methods=['GET'])
+    def screener():
+        """
+        Screener sobre as estatísticas pré-calculadas, sem acessar o histórico de preços.
+
+        Parâmetros: setor, subsetor, segmento; <coluna>_min e <coluna>_max para as colunas
+        numéricas (e.g., volatilidade_max=0.3, dividend_yield_min=0.06); ordenar, ordem (asc|desc),
+        pagina e por_pagina.
+        """
+        try:
+            classificacao = {c: request.args.get(c) for c in COLUNAS_CLASSIFICACAO if request.args.get(c)}
+            faixas = {
+                c: (request.args.get(f"{c}_min", type=float), request.args.get(f"{c}_max", type=float))
+                for c in COLUNAS_FAIXA if f"{c}_min" in request.args or f"{c}_max" in request.args
+            }
+            resultado = estatisticas_universo.filtrar(
+                classificacao, faixas,
+                ordenar_por=request.args.get('ordenar', 'liquidez'),
+                descendente=request.args.get('ordem', 'desc') != 'asc',
+                pagina=request.args.get('pagina', 1, type=int),
+                por_pagina=request.args.get('por_pagina', 20, type=int),
+            )
+            return Response(orjson_dumps(resultado), mimetype='application/json')
+        except ValueError as e:
+            return Response(orjson_dumps({"erro": str(e)}), mimetype='application/json', status=400)
+
     @app.route('/dashboard', methods=['POST'])
     def dashboard():
         logger.info("/dashboard | Recebendo dados do formulário para criação de portfólio em dash_entry/")
@@ -265,6 +325,8 @@ def create_app():
                 if not ticker_data:
                     logger.error(f"Ticker {ticker} inválido | user_id={user_id}")
                     raise ValueError(f"Ticker {ticker} não encontrado.")
+
+            registrar_popularidade(data_redis, tickers)
                                         
             essencials = {
                 'tickers': tickers,
@@ -293,15 +355,14 @@ def create_app():
             essentials_raw = session.pop('initial_portfolio_essentials', None)
             if essentials_raw:
                 essentials = orjson_loads(essentials_raw)
-                portfolio = portfolio_service.create_portfolio(
-                    user_id=user_id,
+                # Métricas via ResultCache: portfólios idênticos de outras sessões não são recalculados
+                portfolio = criar_portfolio(
                     tickers=essentials['tickers'],
                     quantities=essentials['quantities'],
                     start_date=essentials['start_date'],
                     end_date=essentials['end_date'],
-                    is_registered=session.get('is_registered', False),
-                    tickers_limit=session.get('tickers_limit', 5),
-                    plan_type=session.get('plan_type', 'free')
+                    empresas_redis=empresas_redis,
+                    tickers_limit=session.get('tickers_limit', 5)
                 )
                 logger.info(f"Portfólio criado com base nos dados essenciais | user_id={user_id}")
 
@@ -327,8 +388,8 @@ def create_app():
                 'tickers_limit': session.get('tickers_limit', 5)
             })
 
-            # Serializar com orjson e salvar na sessão
-            session['initial_portfolio'] = orjson_dumps(portfolio).decode('utf-8')
+            # Serializar (séries no formato colunar do data-store) e salvar na sessão
+            session['initial_portfolio'] = serializar_store(portfolio)
             session.modified = True
             logger.info(f"Portfólio salvo na sessão para Dash | user_id={user_id} | tickers={portfolio['tickers']}")
 
@@ -461,6 +522,14 @@ def create_app():
             })
         except RedisError as e:
             return jsonify({'status': 'erro', 'mensagem': str(e)}), 500
+
+    @app.route('/metrics')
+    def metrics():
+        """
+        Métricas do processo (tempos por função/callback, caches, downloads) no formato do Prometheus.
+        Com vários workers, cada um responde com os próprios números.
+        """
+        return Response(exportar_metricas(), mimetype='text/plain; version=0.0.4; charset=utf-8')
         
 
     @app.route('/blog', methods=['GET'])
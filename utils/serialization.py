@@ -27,7 +27,9 @@ def orjson_dumps(obj, *, default=None):
             return default(obj)
         raise TypeError(f"Tipo não serializável: {type(obj)}")
 
-    return orjson.dumps(obj, default=_default)
+    # Arrays numpy (e.g., payload colunar do data-store) são serializados nativamente pelo orjson,
+    # inclusive float32 com a menor representação decimal
+    return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
 
 def orjson_loads(data):
     """